@@ -0,0 +1,358 @@
+"""Benchmark every route of the app and report latency as JSON.
+
+    python benchmarks/bench.py --generate 1k --requests 200 --output results.json
+    python benchmarks/bench.py --server --concurrency 16 --output server.json
+    python benchmarks/bench.py --url http://127.0.0.1:8000 --concurrency 16
+    python benchmarks/bench.py --compare before.json after.json
+
+The /venues listing at two scales (100 and 100k venues):
+
+    python benchmarks/bench.py --generate 100k --venues 100 --routes venues --output small.json
+    python benchmarks/bench.py --generate 100k --venues 100000 --routes venues --output large.json
+    python benchmarks/bench.py --compare small.json large.json
+
+The database comes from DATABASE_URL (a throwaway SQLite file by default).
+--generate rebuilds it with `flask fyyur generate` data first. Each route
+is requested --requests times through the Flask test client, over HTTP
+against a threaded WSGI server with --server, or against a running server
+with --url. The report holds p50/p95/p99
+latency in milliseconds, throughput and queries per request (read from the
+Server-Timing header) for each route.
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(ROOT, 'bench.db'))
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+#----------------------------------------------------------------------------#
+# Routes.
+#----------------------------------------------------------------------------#
+
+
+def show_form(venue_id, artist_id, index):
+    # Past the generated year and three hours apart, so the bookings
+    # never conflict.
+    start = datetime.now().replace(microsecond=0) + timedelta(days=400, hours=3 * index)
+    return {'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': start.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def entity_form(name, kind):
+    data = {'name': name, 'city': 'Austin', 'state': 'TX', 'phone': '512-555-0100',
+            'genres': ['Jazz', 'Blues'], 'image_link': '', 'facebook_link': '',
+            'website_link': '', 'seeking_description': ''}
+    if kind == 'venue':
+        data['address'] = '1 Bench St'
+    return data
+
+
+def build_routes(venue, artist):
+    # (name, method, path, form data or None) for the (id, name) `venue`
+    # and `artist`. Every route of routes.py is covered; writes create
+    # their own rows and delete_venue removes them. Searches run with a
+    # broad term, matching about one row in eight, and with a name.
+    venue_id, artist_id = venue[0], artist[0]
+    counter = iter(range(10 ** 9))
+    created = []
+
+    def create_venue():
+        return entity_form(f'Bench Venue {next(counter)}', 'venue')
+
+    def delete_path():
+        return f'/venues/{created.pop()}' if created else f'/venues/{10 ** 9}'
+
+    return created, [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('venues_page', 'GET', '/venues?per_page=50', None),
+        ('search_venues', 'POST', '/venues/search', lambda: {'search_term': 'hall'}),
+        ('search_venues_name', 'POST', '/venues/search', lambda: {'search_term': venue[1]}),
+        ('show_venue', 'GET', f'/venues/{venue_id}', None),
+        ('show_venue_all', 'GET', f'/venues/{venue_id}?all_shows=1', None),
+        ('create_venue_form', 'GET', '/venues/create', None),
+        ('create_venue_submission', 'POST', '/venues/create', create_venue),
+        ('edit_venue', 'GET', f'/venues/{venue_id}/edit', None),
+        ('edit_venue_submission', 'POST', f'/venues/{venue_id}/edit',
+         lambda: entity_form('Bench Edited Venue', 'venue')),
+        ('delete_venue', 'DELETE', delete_path, None),
+        ('artists', 'GET', '/artists', None),
+        ('search_artists', 'POST', '/artists/search', lambda: {'search_term': 'band'}),
+        ('search_artists_name', 'POST', '/artists/search', lambda: {'search_term': artist[1]}),
+        ('show_artist', 'GET', f'/artists/{artist_id}', None),
+        ('edit_artist', 'GET', f'/artists/{artist_id}/edit', None),
+        ('edit_artist_submission', 'POST', f'/artists/{artist_id}/edit',
+         lambda: entity_form('Bench Edited Artist', 'artist')),
+        ('create_artist_form', 'GET', '/artists/create', None),
+        ('create_artist_submission', 'POST', '/artists/create',
+         lambda: entity_form(f'Bench Artist {next(counter)}', 'artist')),
+        ('shows', 'GET', '/shows', None),
+        ('create_shows', 'GET', '/shows/create', None),
+        ('create_show_submission', 'POST', '/shows/create',
+         lambda: show_form(venue_id, artist_id, next(counter))),
+        ('not_found', 'GET', '/venues/999999999', None),
+    ]
+
+
+#----------------------------------------------------------------------------#
+# Drivers.
+#----------------------------------------------------------------------------#
+
+
+class TestClientDriver:
+
+    def __init__(self, app):
+        self.local = threading.local()
+        self.app = app
+
+    def request(self, method, path, data):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    # Sends requests over keep-alive HTTP connections, one per thread.
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.local = threading.local()
+
+    def request(self, method, path, data):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(
+                self.host, self.port)
+        body = urlencode(data, doseq=True) if data else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if data else {}
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # The server closed the connection (e.g. a recycled worker).
+            connection.close()
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+        response.read()
+        return response.status, response.getheader('Server-Timing') or ''
+
+    def close(self):
+        pass
+
+
+class ServerDriver(HTTPDriver):
+    # Serves the app with Werkzeug's threaded WSGI server on a free port.
+
+    def __init__(self, app):
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        super().__init__('127.0.0.1', self.server.server_port)
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run_route(driver, method, path, data, requests, concurrency, record_created):
+    latencies, queries, statuses = [], [], {}
+
+    def one(_):
+        target = path() if callable(path) else path
+        form = data() if callable(data) else data
+        start = time.perf_counter()
+        status, timing = driver.request(method, target, form)
+        latencies.append(time.perf_counter() - start)
+        match = QUERIES.search(timing)
+        if match:
+            queries.append(int(match.group(1)))
+        statuses[status] = statuses.get(status, 0) + 1
+        if record_created:
+            record_created()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'method': method,
+        'requests': requests,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, .50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, .95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, .99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+#----------------------------------------------------------------------------#
+# Main.
+#----------------------------------------------------------------------------#
+
+
+def benchmark(args):
+    from sqlalchemy.engine import make_url
+    from fyyurapp import create_app, db
+    from fyyurapp.models import Venue, Artist
+    from fyyurapp.synthetic import SCALES, generate
+
+    app = create_app({'WTF_CSRF_ENABLED': False, 'REQUEST_LOG': args.log_requests,
+                      'QUERY_BUDGET_STRICT': False})
+    with app.app_context():
+        if args.generate:
+            db.drop_all()
+            db.create_all()
+            generate(SCALES.get(args.generate) or int(args.generate), seed=args.seed,
+                     venues=args.venues)
+        venue = db.session.query(Venue.id, Venue.name).order_by(
+            Venue.upcoming_shows_count.desc()).first()
+        artist = db.session.query(Artist.id, Artist.name).order_by(
+            Artist.upcoming_shows_count.desc()).first()
+        counts = {name: db.session.query(model).count() for name, model in
+                  (('venues', Venue), ('artists', Artist))}
+        db.session.remove()
+    if venue is None or artist is None:
+        sys.exit('The database is empty; run with --generate 1k first.')
+
+    if args.url:
+        url = urlsplit(args.url)
+        driver = HTTPDriver(url.hostname, url.port or 80)
+    elif args.server:
+        driver = ServerDriver(app)
+    else:
+        driver = TestClientDriver(app)
+    created, routes = build_routes(venue, artist)
+
+    def record_created():
+        with app.app_context():
+            newest = db.session.query(db.func.max(Venue.id)).scalar()
+            db.session.remove()
+        if newest and newest not in created and newest != venue[0]:
+            created.append(newest)
+
+    results = {}
+    try:
+        for name, method, path, data in routes:
+            if args.routes and name not in args.routes:
+                continue
+            run_route(driver, method, path, data, min(args.warmup, args.requests), 1,
+                      record_created if name == 'create_venue_submission' else None)
+            results[name] = run_route(
+                driver, method, path, data, args.requests, args.concurrency,
+                record_created if name == 'create_venue_submission' else None)
+            print(f"{name:28} p50 {results[name]['p50_ms']:8.2f}ms  "
+                  f"p95 {results[name]['p95_ms']:8.2f}ms  "
+                  f"{results[name]['throughput_rps']:8.1f} req/s  "
+                  f"{results[name]['queries_per_request']} queries", file=sys.stderr)
+    finally:
+        driver.close()
+
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'driver': args.url or ('server' if args.server else 'test_client'),
+        'database': make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name(),
+        'data': counts,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'routes': results,
+    }
+
+
+def compare(before_path, after_path, threshold):
+    # Prints p95 and query-count changes; exits 1 if a route got slower
+    # than `threshold` (a fraction) or runs more queries.
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file)['routes'], json.load(after_file)['routes']
+    regressed = False
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0
+        more_queries = (new['max_queries'] or 0) > (old['max_queries'] or 0)
+        flag = change > threshold or more_queries
+        regressed = regressed or flag
+        print(f"{'!' if flag else ' '} {name:28} p95 {old['p95_ms']:8.2f} -> {new['p95_ms']:8.2f}ms "
+              f"({change:+.0%})  queries {old['max_queries']} -> {new['max_queries']}")
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--generate', metavar='SCALE',
+                        help='Rebuild the database with 1k, 100k, 10m or N shows first.')
+    parser.add_argument('--venues', type=int,
+                        help='Venues to generate with --generate (one per 50 shows by default).')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route.')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per route.')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--server', action='store_true',
+                        help='Drive a threaded WSGI server over HTTP instead of the test client.')
+    parser.add_argument('--url', help='Drive an already running server, e.g. gunicorn, at this '
+                                      'URL. It must use the same DATABASE_URL.')
+    parser.add_argument('--routes', nargs='*', help='Only run these routes.')
+    parser.add_argument('--log-requests', action='store_true',
+                        help='Keep the per-request JSON log on while measuring.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Compare two reports instead of running.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='p95 slowdown counted as a regression by --compare.')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    report = benchmark(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Measure the per-tile cost of formatting show times on a 10k-show page.
+
+    python benchmarks/datetime_filter.py
+    python benchmarks/datetime_filter.py --tiles 10000 --repeat 5 --output dates.json
+
+Compares the pipeline the views used before, where start times were
+turned into strings and parsed back with dateutil by the `datetime`
+filter, with passing datetimes to the memoized filter. Both the filter
+alone and a full render of pages/shows.html with --tiles tiles are timed;
+start times follow the synthetic data generator (evening slots). No
+database is needed.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+Tile = namedtuple('Tile', ['id', 'start_time', 'venue_id', 'venue_name',
+                           'artist_id', 'artist_name', 'artist_image_link'])
+
+
+def legacy_format_datetime(value, format='medium'):
+    # The filter as it was: parse the string, then format with a pattern
+    # Babel resolves on every call.
+    import babel.dates
+    import dateutil.parser
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def best_of(repeat, run):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def per_tile(seconds, tiles):
+    return round(seconds / tiles * 1e6, 2)
+
+
+def benchmark(args):
+    from flask import render_template
+    from fyyurapp import create_app, datetime_formatter, format_datetime
+    from fyyurapp.synthetic import show_slots
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REQUEST_LOG': False})
+    starts = [start for start, count in show_slots(args.tiles, datetime(2026, 1, 1))
+              for _ in range(count)]
+    random.Random(args.seed).shuffle(starts)
+    tiles = [Tile(index, start, 1, 'The Musical Hop', 1, 'Guns N Petals',
+                  'https://images.example.com/artist/1.jpg') for index, start in enumerate(starts)]
+    # What the old shows view passed to the template.
+    legacy_tiles = [tile._replace(start_time=tile.start_time.strftime('%m/%d/%Y, %H:%M:%S'))
+                    for tile in tiles]
+    distinct = len({tile.start_time for tile in tiles})
+
+    results = {}
+    with app.test_request_context('/shows'):
+        datetime_formatter.cache_clear()
+        start = time.perf_counter()
+        for tile in tiles:
+            format_datetime(tile.start_time, 'full')
+        results['filter_cold_us'] = per_tile(time.perf_counter() - start, args.tiles)
+        results['filter_warm_us'] = per_tile(best_of(args.repeat, lambda: [
+            format_datetime(tile.start_time, 'full') for tile in tiles]), args.tiles)
+        results['filter_legacy_us'] = per_tile(best_of(args.repeat, lambda: [
+            legacy_format_datetime(tile.start_time, 'full') for tile in legacy_tiles]), args.tiles)
+
+        render_template('pages/shows.html', shows=tiles[:10], page=None)
+        results['render_us'] = per_tile(best_of(args.repeat, lambda: render_template(
+            'pages/shows.html', shows=tiles, page=None)), args.tiles)
+        filters = app.jinja_env.filters
+        current, filters['datetime'] = filters['datetime'], legacy_format_datetime
+        try:
+            results['render_legacy_us'] = per_tile(best_of(args.repeat, lambda: render_template(
+                'pages/shows.html', shows=legacy_tiles, page=None)), args.tiles)
+        finally:
+            filters['datetime'] = current
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'tiles': args.tiles,
+        'distinct_start_times': distinct,
+        'repeat': args.repeat,
+        'per_tile': results,
+        'render_ms': round(results['render_us'] * args.tiles / 1000, 1),
+        'render_legacy_ms': round(results['render_legacy_us'] * args.tiles / 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tiles', type=int, default=10000, help='Shows on the page.')
+    parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    output = json.dumps(benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
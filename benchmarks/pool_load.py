@@ -0,0 +1,151 @@
+"""Saturate the database connection pool and report how checkouts fared.
+
+    DATABASE_URL=postgresql://... python benchmarks/pool_load.py
+    python benchmarks/pool_load.py --threads 90 --seconds 20 --output pool.json
+    python benchmarks/pool_load.py --hold-ms 50 --pool-size 10 --max-overflow 20
+    python benchmarks/pool_load.py --routes /venues/1 /api/v1/shows
+
+One process, like one gunicorn worker, with more threads than its pool
+has connections (twice DB_POOL_SIZE + DB_MAX_OVERFLOW by default), so
+checkouts must queue. Each thread requests --routes through the Flask
+test client for --seconds; with --hold-ms it instead checks out a
+connection and keeps it that long, the worst case for the pool. The
+report holds latency percentiles, statuses and pool timeouts, the
+checkout wait times from the pool and the most connections seen checked
+out at once. Needs a server database (SQLite does not use the pool) with
+data, e.g. from `python benchmarks/bench.py --generate 1k`.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import git_revision, percentile  # noqa: E402
+
+
+def pool_config(args):
+    config = {'WTF_CSRF_ENABLED': False, 'REQUEST_LOG': False, 'QUERY_BUDGET_STRICT': False}
+    for key, value in (('DB_POOL_SIZE', args.pool_size), ('DB_MAX_OVERFLOW', args.max_overflow),
+                       ('DB_POOL_TIMEOUT', args.pool_timeout)):
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def benchmark(args):
+    from sqlalchemy import exc
+    from fyyurapp import create_app, db
+    from fyyurapp.pool import TimedQueuePool, pool_stats
+
+    app = create_app(pool_config(args))
+    with app.app_context():
+        engine = db.get_engine()
+    if not isinstance(engine.pool, TimedQueuePool):
+        sys.exit(f'{engine.url.get_backend_name()} does not use the connection pool; '
+                 'set DATABASE_URL to a server database.')
+    capacity = engine.pool.size() + engine.pool._max_overflow
+    threads = args.threads or 2 * capacity
+    hold = args.hold_ms / 1000
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    peak = {'checked_out': 0, 'overflow': 0}
+    deadline = time.monotonic() + args.seconds
+    done = threading.Event()
+
+    def one(client, index):
+        if hold:
+            try:
+                with engine.connect() as connection:
+                    connection.exec_driver_sql('SELECT 1')
+                    time.sleep(hold)
+                return 'ok'
+            except exc.TimeoutError:
+                return 'pool timeout'
+        return client.get(args.routes[index % len(args.routes)]).status_code
+
+    def work():
+        client = app.test_client()
+        index = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = one(client, index)
+            elapsed = time.perf_counter() - start
+            index += 1
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def sample():
+        # the most connections in use at once
+        while not done.wait(.005):
+            peak['checked_out'] = max(peak['checked_out'], engine.pool.checkedout())
+            peak['overflow'] = max(peak['overflow'], engine.pool.overflow())
+
+    pool_stats.reset()
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'database': engine.url.get_backend_name(),
+        'pool_size': engine.pool.size(),
+        'max_overflow': engine.pool._max_overflow,
+        'pool_timeout': engine.pool._timeout,
+        'threads': threads,
+        'workload': f'hold {args.hold_ms}ms' if hold else args.routes,
+        'requests': len(latencies),
+        'statuses': statuses,
+        'p50_ms': round(percentile(latencies, .50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, .99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'peak_checked_out': peak['checked_out'],
+        'peak_overflow': max(peak['overflow'], 0),
+        'saturated': peak['checked_out'] >= capacity,
+        'pool': pool_stats.snapshot(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int,
+                        help='Client threads (twice the pool capacity by default).')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--routes', nargs='*', default=['/venues', '/api/v1/shows', '/shows'],
+                        help='Paths requested in turn by each thread.')
+    parser.add_argument('--hold-ms', type=float, default=0,
+                        help='Hold a bare connection this long per request instead.')
+    parser.add_argument('--pool-size', type=int, help='Overrides DB_POOL_SIZE.')
+    parser.add_argument('--max-overflow', type=int, help='Overrides DB_MAX_OVERFLOW.')
+    parser.add_argument('--pool-timeout', type=int, help='Overrides DB_POOL_TIMEOUT.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    output = json.dumps(benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Measure search latency per backend and kind of term.
+
+    DATABASE_URL=postgresql://... python benchmarks/search.py
+    python benchmarks/search.py --repeat 300 --backends simple --output search.json
+
+Runs each search backend (trigram only on PostgreSQL) directly, without
+HTTP, for venues and artists with a short term (under MIN_TRIGRAM_TERM
+characters), a broad term (`hall` / `band`, about one row in eight of
+generated data) and the name of the busiest venue or artist. Each
+search is run --repeat times after one unmeasured run. The report holds
+p50/p99 in milliseconds and the number of matches. Generate data first,
+e.g. with `python benchmarks/bench.py --generate 100k`.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(ROOT, 'bench.db'))
+
+from bench import git_revision, percentile  # noqa: E402
+
+BROAD_TERMS = {'Venue': 'hall', 'Artist': 'band'}
+
+
+def benchmark(args):
+    from fyyurapp import create_app, db
+    from fyyurapp.models import Venue, Artist
+    from fyyurapp.search import SEARCH_BACKENDS
+
+    app = create_app({'REQUEST_LOG': False})
+    results = {}
+    with app.app_context():
+        dialect = db.get_engine().dialect.name
+        backends = args.backends or [name for name in SEARCH_BACKENDS
+                                     if name != 'trigram' or dialect == 'postgresql']
+        for model in (Venue, Artist):
+            busiest = db.session.query(model.name).order_by(
+                model.upcoming_shows_count.desc()).limit(1).scalar()
+            if busiest is None:
+                sys.exit('The database is empty; run benchmarks/bench.py --generate 1k first.')
+            terms = {'short': BROAD_TERMS[model.__name__][:2],
+                     'broad': BROAD_TERMS[model.__name__], 'name': busiest}
+            for name in backends:
+                backend = SEARCH_BACKENDS[name]()
+                for kind, term in terms.items():
+                    backend.search(model, term)
+                    timings = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        page = backend.search(model, term)
+                        timings.append(time.perf_counter() - start)
+                        db.session.rollback()
+                    results[f'{model.__name__.lower()}/{name}/{kind}'] = {
+                        'term': term,
+                        'matches': page.count,
+                        'p50_ms': round(percentile(timings, .50) * 1000, 3),
+                        'p99_ms': round(percentile(timings, .99) * 1000, 3),
+                    }
+                    print(f"{model.__name__:7} {name:8} {kind:6} p99 "
+                          f"{results[f'{model.__name__.lower()}/{name}/{kind}']['p99_ms']:8.2f}ms "
+                          f"{page.count} matches", file=sys.stderr)
+        counts = {model.__name__.lower(): db.session.query(model).count()
+                  for model in (Venue, Artist)}
+
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'database': dialect,
+        'data': counts,
+        'repeat': args.repeat,
+        'searches': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=100, help='Runs of each search.')
+    parser.add_argument('--backends', nargs='*', help='Only these backends (trigram, simple).')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    output = json.dumps(benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
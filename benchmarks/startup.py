@@ -0,0 +1,149 @@
+"""Measure how long the app takes to import and start, as JSON.
+
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --targets worker --repeat 10
+    python benchmarks/startup.py --compare before.json after.json
+
+Each target runs in a fresh interpreter under `python -X importtime`,
+--repeat times. For every target the report holds the wall time of the
+whole process, the import time summed from -X importtime, the number of
+modules loaded, the packages that took longest to import (their own
+modules' time, summed) and any CLI-only module (migrations, bulk and
+generator commands) that a serving process loaded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: code run by the interpreter
+TARGETS = {
+    'python': 'pass',
+    'package': 'import fyyurapp',
+    'models': 'import fyyurapp.models',
+    'app': 'from fyyurapp import create_app; create_app()',
+    'worker': 'import wsgi',
+}
+
+# Modules a process that only serves requests should not need.
+CLI_ONLY = ('flask_migrate', 'alembic', 'dateutil', 'flask_moment',
+            'fyyurapp.bulk', 'fyyurapp.synthetic', 'fyyurapp.partitions')
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_importtime(output):
+    # Returns [(module, depth, self_us, cumulative_us)] from -X importtime
+    # lines: "import time: self [us] | cumulative | imported package".
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(own.split(':')[1]), int(cumulative)))
+    return imports
+
+
+def run_once(code):
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             text=True)
+    wall = time.perf_counter() - start
+    if process.returncode:
+        sys.exit(process.stderr)
+    return wall, parse_importtime(process.stderr)
+
+
+def measure(code, repeat, top):
+    walls, totals = [], []
+    for _ in range(repeat):
+        wall, imports = run_once(code)
+        walls.append(wall * 1000)
+        totals.append(sum(cumulative for _, depth, _, cumulative in imports if depth == 0) / 1000)
+    # Packages and loaded modules come from the last run.
+    names = {name for name, _, _, _ in imports}
+    packages = {}
+    for name, _, own, _ in imports:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + own
+    slowest = sorted(packages.items(), key=lambda item: -item[1])
+    return {
+        'wall_ms': round(statistics.median(walls), 1),
+        'wall_min_ms': round(min(walls), 1),
+        'import_ms': round(statistics.median(totals), 1),
+        'modules': len(names),
+        'slowest_packages_ms': {name: round(own / 1000, 1) for name, own in slowest[:top]},
+        'cli_only_loaded': sorted(name for name in CLI_ONLY if name in names),
+    }
+
+
+def compare(before_path, after_path, threshold):
+    # Prints the import time change per target; exits 1 if one got slower
+    # than `threshold` (a fraction) or loads a CLI-only module it did not.
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file)['targets'], json.load(after_file)['targets']
+    regressed = False
+    for name in [name for name in TARGETS if name in before and name in after]:
+        old, new = before[name], after[name]
+        change = (new['import_ms'] - old['import_ms']) / old['import_ms'] if old['import_ms'] else 0
+        added = set(new['cli_only_loaded']) - set(old['cli_only_loaded'])
+        flag = change > threshold or bool(added)
+        regressed = regressed or flag
+        print(f"{'!' if flag else ' '} {name:10} import {old['import_ms']:8.1f} -> "
+              f"{new['import_ms']:8.1f}ms ({change:+.0%})  wall {old['wall_ms']:8.1f} -> "
+              f"{new['wall_ms']:8.1f}ms  modules {old['modules']} -> {new['modules']}"
+              + (f"  now loads {', '.join(sorted(added))}" if added else ''))
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--targets', nargs='*', choices=sorted(TARGETS),
+                        help='Only measure these targets.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per target.')
+    parser.add_argument('--top', type=int, default=10, help='Slowest packages listed per target.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Compare two reports instead of running.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Import slowdown counted as a regression by --compare.')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    # Nothing connects at startup, but the config needs a URL.
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'repeat': args.repeat,
+        'targets': {name: measure(TARGETS[name], args.repeat, args.top)
+                    for name in TARGETS if not args.targets or name in args.targets},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
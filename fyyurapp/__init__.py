@@ -3,14 +3,13 @@
 #----------------------------------------------------------------------------#
 
 
+import logging
+import os
 from datetime import datetime
-import json
-import dateutil.parser
-import babel
-from flask import Flask
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from functools import lru_cache
+from logging import FileHandler
+from flask import Flask, current_app
+from fyyurapp.replicas import RoutingSQLAlchemy
 
 
 
@@ -18,26 +17,96 @@ from flask_migrate import Migrate
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
-from fyyurapp import routes
+# Bound to an app by create_app; models and queries only need the object.
+db = RoutingSQLAlchemy()
+
+
+def create_app(config=None):
+    # Builds the app. `config` overrides config.py: a mapping, or an object
+    # or import path as taken by app.config.from_object. View modules are
+    # imported here rather than at package import, and CLI-only
+    # dependencies (Flask-Migrate, Alembic, the bulk and generator
+    # commands) only when a command needs them.
+    from fyyurapp import jobs, metrics, profiling, templating
+    from fyyurapp.cache import cache
+    from fyyurapp.cli import register_commands
+    from fyyurapp.pagination import page_url
+    from fyyurapp.routes import main
+    from fyyurapp.venues import venues
+    from fyyurapp.artists import artists
+    from fyyurapp.shows import shows
+    from fyyurapp.api import api
+
+    app = Flask(__name__)
+    app.config.from_object('config')
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    db.init_app(app)
+    cache.init_app(app)
+    profiling.init_app(app)
+    metrics.init_app(app)
+    jobs.init_app(app)
+    templating.configure_templates(app)
+    app.jinja_env.filters['datetime'] = format_datetime
+    app.jinja_env.globals['page_url'] = page_url
+
+    for blueprint in (main, venues, artists, shows, api):
+        app.register_blueprint(blueprint)
+    register_commands(app)
+    configure_logging(app)
+    return app
+
+
+def configure_logging(app):
+    from fyyurapp.profiling import JSONFormatter
+    if not app.debug:
+        path = app.config['LOG_FILE'] or os.path.join(app.instance_path, 'fyyur.log')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_handler = FileHandler(path)
+        file_handler.setFormatter(JSONFormatter())
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
 
-migrate = Migrate(app, db)
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+# Named patterns for the `datetime` filter; other values are used as Babel
+# patterns as they are.
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def datetime_formatter(format, locale):
+    # Returns a function formatting datetimes with the Babel pattern parsed,
+    # and the locale data loaded, once per (format, locale). Show times
+    # repeat (a few evening slots a day), so results are memoized as well;
+    # tzinfo is part of the key because aware datetimes for the same
+    # instant compare equal.
+    from babel.core import Locale
+    from babel.dates import parse_pattern
+    pattern = parse_pattern(DATETIME_FORMATS.get(format, format))
+    locale = Locale.parse(locale)
+
+    @lru_cache(maxsize=16384)
+    def format_value(value, tzinfo):
+        return pattern.apply(value, locale)
+
+    return lambda value: format_value(value, value.tzinfo)
 
 
-app.jinja_env.filters['datetime'] = format_datetime
\ No newline at end of file
+def format_datetime(value, format='medium', locale=None):
+    # Takes datetimes; ISO strings (e.g. detail pages cached before
+    # datetimes were passed through) are still accepted.
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return datetime_formatter(format, locale or current_app.config['DATETIME_LOCALE'])(value)
@@ -0,0 +1,218 @@
+import json
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from fyyurapp.queries import (venue_detail, artist_detail, venue_areas_query,
+                              artist_listing_query, show_listing_query,
+                              VENUE_LISTING_ORDER, ARTIST_LISTING_ORDER, SHOW_LISTING_ORDER)
+from fyyurapp.pagination import iter_keyset, paginate_request
+from fyyurapp.search import search_results
+from fyyurapp.cache import cache, venue_key, artist_key, detail_ttl
+from fyyurapp.conditional import (conditional, listing_sources, show_listing_sources,
+                                  venue_page_sources, artist_page_sources)
+from fyyurapp.pool import pool_stats
+from fyyurapp.replicas import get_replicas
+from fyyurapp.profiling import query_budget
+from fyyurapp.bookings import free_slots
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Fields each listing item can be narrowed to with ?fields=.
+LISTING_FIELDS = {
+    'venues': ('id', 'name', 'city', 'state', 'num_upcoming_shows'),
+    'artists': ('id', 'name'),
+    'shows': ('id', 'start_time', 'end_time', 'venue_id', 'venue_name',
+              'artist_id', 'artist_name', 'artist_image_link'),
+}
+
+
+def to_json(value):
+    return json.dumps(value, default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+
+
+def selected_fields(kind):
+    fields = request.args.get('fields')
+    if not fields:
+        return LISTING_FIELDS[kind]
+    fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = set(fields) - set(LISTING_FIELDS[kind])
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def paged():
+    return any(arg in request.args for arg in ('after', 'before', 'per_page'))
+
+
+def listing_version(page_sources, *models):
+    # A single keyset page only depends on its own rows; a streamed
+    # collection on every row of its tables.
+    return lambda: page_sources() if paged() else list(models)
+
+
+def listing_response(kind, query, columns):
+    # With ?after=, ?before= or ?per_page= a single keyset page is returned
+    # with its cursors. Otherwise the whole collection is streamed, read in
+    # keyset chunks and written item by item, as a JSON array or as NDJSON
+    # when ?format=ndjson or `Accept: application/x-ndjson` is sent.
+    fields = selected_fields(kind)
+
+    def item(row):
+        return {field: getattr(row, field) for field in fields}
+
+    if paged():
+        page = paginate_request(query, columns)
+        return Response(to_json({
+            'data': [item(row) for row in page.items],
+            'next': page.next,
+            'prev': page.prev,
+        }), mimetype='application/json')
+
+    rows = iter_keyset(query, columns, current_app.config['API_STREAM_CHUNK_SIZE'])
+    ndjson = request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+    def generate_ndjson():
+        for row in rows:
+            yield to_json(item(row)) + '\n'
+
+    def generate_array():
+        yield '['
+        for index, row in enumerate(rows):
+            yield (',' if index else '') + to_json(item(row))
+        yield ']'
+
+    if ndjson:
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_array()), mimetype='application/json')
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+    return jsonify({'error': error.description}), error.code
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+@conditional(listing_version(lambda: listing_sources(Venue, VENUE_LISTING_ORDER), Venue))
+def venues():
+    return listing_response('venues', venue_areas_query(
+        genre=request.args.get('genre')), VENUE_LISTING_ORDER)
+
+
+@api.route('/venues/<int:venue_id>')
+@query_budget(3)
+@conditional(venue_page_sources)
+def venue(venue_id):
+    data = cache.get_or_set(venue_key(venue_id), lambda: venue_detail(
+        venue_id, current_app.config['DETAIL_SHOWS_LIMIT']), ttl=detail_ttl)
+    if data is None:
+        abort(404, 'Venue not found')
+    return Response(to_json(data), mimetype='application/json')
+
+
+@api.route('/venues/search')
+@query_budget(2)
+def search_venues():
+    return jsonify(search_results(
+        Venue, request.args.get('q', ''), request.args.get('genre'),
+        request.args.get('page', 1, type=int)))
+
+
+def local_datetime(value):
+    # Shows are stored in naive local time; aware values are converted to it.
+    value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+@api.route('/venues/<int:venue_id>/availability')
+@query_budget(3)
+def venue_availability(venue_id):
+    # Free stretches of at least ?min_minutes= (default 120) between
+    # ?start= and ?end= (ISO dates or datetimes, with or without an offset).
+    try:
+        start = local_datetime(request.args['start'])
+        end = local_datetime(request.args['end'])
+    except (KeyError, ValueError):
+        abort(400, 'start and end must be ISO dates or datetimes')
+    try:
+        min_minutes = int(request.args.get('min_minutes', 120))
+    except ValueError:
+        abort(400, 'min_minutes must be an integer')
+    if not start < end <= start + timedelta(days=current_app.config['AVAILABILITY_MAX_DAYS']):
+        abort(400, f"end must be after start and at most {current_app.config['AVAILABILITY_MAX_DAYS']} days later")
+    if min_minutes <= 0:
+        abort(400, 'min_minutes must be positive')
+    if db.session.query(Venue.id).filter_by(id=venue_id).scalar() is None:
+        abort(404, 'Venue not found')
+    return jsonify({
+        'venue_id': venue_id,
+        'free': [{'start': slot_start.isoformat(), 'end': slot_end.isoformat()}
+                 for slot_start, slot_end in free_slots(
+                     venue_id, start, end, timedelta(minutes=min_minutes))],
+    })
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+@conditional(listing_version(lambda: listing_sources(Artist, ARTIST_LISTING_ORDER), Artist))
+def artists():
+    return listing_response('artists', artist_listing_query(
+        genre=request.args.get('genre')), ARTIST_LISTING_ORDER)
+
+
+@api.route('/artists/<int:artist_id>')
+@query_budget(3)
+@conditional(artist_page_sources)
+def artist(artist_id):
+    data = cache.get_or_set(artist_key(artist_id), lambda: artist_detail(
+        artist_id, current_app.config['DETAIL_SHOWS_LIMIT']), ttl=detail_ttl)
+    if data is None:
+        abort(404, 'Artist not found')
+    return Response(to_json(data), mimetype='application/json')
+
+
+@api.route('/artists/search')
+@query_budget(2)
+def search_artists():
+    return jsonify(search_results(
+        Artist, request.args.get('q', ''), request.args.get('genre'),
+        request.args.get('page', 1, type=int)))
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+@conditional(listing_version(show_listing_sources, Show, Venue, Artist))
+def shows():
+    return listing_response('shows', show_listing_query(), SHOW_LISTING_ORDER)
+
+
+#  Health
+#  ----------------------------------------------------------------
+
+@api.route('/health/pool')
+def pool_health():
+    # Connection pool state of this process: checked-out connections,
+    # overflow in use, checkout waits and timeouts.
+    return jsonify(pool_stats.snapshot(db.get_engine().pool))
+
+
+@api.route('/health/replicas')
+def replica_health():
+    return jsonify(get_replicas(db, current_app._get_current_object()).status())
+
@@ -0,0 +1,166 @@
+from datetime import datetime
+from flask import Blueprint, abort, current_app, render_template, request, flash, redirect, url_for
+from fyyurapp import db
+from fyyurapp.models import Artist
+from fyyurapp.forms import ArtistForm
+from fyyurapp.queries import (with_shows, genres_by_name, artist_listing_query,
+                              artist_detail, ARTIST_LISTING_ORDER)
+from fyyurapp.pagination import paginate_request
+from fyyurapp.cache import cache, artist_key, detail_ttl
+from fyyurapp.jobs import after_commit, after_commit_audit, invalidate_partner_pages
+from fyyurapp.conditional import conditional, listing_sources, artist_page_sources
+from fyyurapp.search import search_results
+from fyyurapp.replicas import read_only
+from fyyurapp.profiling import query_budget
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+artists = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+
+
+@artists.route('/artists')
+@query_budget(2)
+@conditional(lambda: listing_sources(Artist, ARTIST_LISTING_ORDER))
+def index():
+    # TODO: replace with real data returned from querying the database
+    # solutions
+    page = paginate_request(artist_listing_query(
+        genre=request.args.get('genre')), ARTIST_LISTING_ORDER)
+    return render_template('pages/artists.html', artists=page.items, page=page)
+
+
+@artists.route('/artists/search', methods=['POST'])
+@query_budget(2)
+@read_only
+def search_artists():
+    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    search_term = request.form.get('search_term', '')
+    genre = request.form.get('genre')
+    page = request.form.get('page', 1, type=int)
+
+    response = search_results(Artist, search_term, genre, page)
+
+    return render_template('pages/search_artists.html', results=response, search_term=search_term, genre=genre)
+
+
+@artists.route('/artists/<int:artist_id>')
+@query_budget(3)
+@conditional(artist_page_sources)
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    # TODO: replace with real artist data from the artist table, using artist_id
+    # shows the venue page with the given venue_id
+    # TODO: replace with real venue data from the venues table, using venue_id
+    if request.args.get('all_shows'):
+        artist_data = artist_detail(artist_id, current_app.config['DETAIL_ALL_SHOWS_LIMIT'])
+    else:
+        artist_data = cache.get_or_set(artist_key(artist_id), lambda: artist_detail(
+            artist_id, current_app.config['DETAIL_SHOWS_LIMIT']), ttl=detail_ttl)
+    if artist_data is None:
+        abort(404)
+
+    return render_template('pages/show_artist.html', artist=artist_data)
+#  Update
+#  ----------------------------------------------------------------
+
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@query_budget(2)
+def edit_artist(artist_id):
+    form = ArtistForm()
+    # TODO: populate form with fields from artist with ID <artist_id>
+
+    artist = Artist.query.options(with_shows(Artist)).get(artist_id)
+    form.genres.data = artist.genre_names
+
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # TODO: take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+    try:
+        artist = Artist.query.options(with_shows(Artist)).get(artist_id)
+
+        artist.name = request.form['name']
+        artist.city = request.form['city']
+        artist.state = request.form['state']
+        artist.phone = request.form['phone']
+        artist.genres = genres_by_name(request.form.getlist('genres'))
+        # genres live in another table, so bump the version explicitly
+        artist.updated_at = datetime.utcnow()
+        artist.facebook_link = request.form['facebook_link']
+        artist.image_link = request.form['image_link']
+        artist.seeking_venue = request.form['seeking_venue']
+        artist.seeking_description = request.form['seeking_description']
+        artist.website_link = request.form['website_link']
+
+        db.session.add(artist)
+        after_commit(invalidate_partner_pages, Artist, artist_id)
+        after_commit_audit('edit', 'artist', artist_id)
+        db.session.commit()
+        cache.invalidate(artist_key(artist_id))
+        flash("Artist " + artist.name + " was successfully edited!")
+    except:
+        db.session.rollback()
+        flash("Artist was not edited successfully.")
+    finally:
+        db.session.close()
+    return redirect(url_for('.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@artists.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artists.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+
+    # on successful db insert, flash success
+    # flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+    try:
+        newArtist = Artist(
+            name=request.form['name'],
+            city=request.form['city'],
+            state=request.form['state'],
+            phone=request.form['phone'],
+            genres=genres_by_name(request.form.getlist('genres')),
+            image_link=request.form['image_link'],
+            facebook_link=request.form['facebook_link'],
+            website_link=request.form['website_link'],
+            seeking_venue=True if 'seeking_venue' in request.form else False,
+            seeking_description=request.form['seeking_description'],
+        )
+        db.session.add(newArtist)
+        db.session.flush()
+        after_commit_audit('create', 'artist', newArtist.id)
+        db.session.commit()
+        cache.invalidate(artist_key(newArtist.id))
+        flash("Artist " + request.form["name"] +
+              " was successfully listed!")
+    except Exception as e:
+        db.session.rollback()
+        print(e)
+        flash('An error occurred. Artist ' +
+              request.form['name'] + ' could not be added')
+    finally:
+        db.session.close()
+    return redirect(url_for("main.index"))
@@ -0,0 +1,197 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+import click
+from flask import current_app
+from sqlalchemy import exc, orm
+from fyyurapp import db
+from fyyurapp.models import Show, DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION
+from fyyurapp.cli import fyyur_cli
+
+#----------------------------------------------------------------------------#
+# Bookings.
+#----------------------------------------------------------------------------#
+
+# A show of the same venue or artist whose time overlaps a new booking.
+Conflict = namedtuple('Conflict', ['kind', 'show_id', 'start_time', 'end_time'])
+
+# Exclusion constraints created on PostgreSQL (see models.py), by the end
+# of their name: partitions carry their own, e.g.
+# "Show_p2026_01_venue_id_no_overlap" (see partitions.py).
+CONSTRAINTS = {'_venue_id_no_overlap': 'venue', '_artist_id_no_overlap': 'artist'}
+
+
+def show_end_time(start_time, end_time=None, duration=None):
+    # End of a show from an explicit end time, a duration in minutes, or
+    # the default duration.
+    if end_time is not None:
+        return end_time
+    if duration:
+        return start_time + timedelta(minutes=duration)
+    return start_time + DEFAULT_SHOW_DURATION
+
+
+class IntervalIndex:
+    # Half-open [start, end) intervals kept sorted by start. No interval is
+    # longer than `max_length`, so those overlapping [start, end) all
+    # start in (start - max_length, end): a bisect and a scan of that
+    # window, O(log n + k). Inserting keeps the order.
+
+    def __init__(self, intervals=(), max_length=MAX_SHOW_DURATION):
+        self.items = sorted(intervals)
+        self.starts = [item[0] for item in self.items]
+        self.max_length = max([end - start for start, end, _ in self.items] + [max_length])
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, start, end, key=None):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.items.insert(index, (start, end, key))
+        self.max_length = max(self.max_length, end - start)
+
+    def overlapping(self, start, end):
+        # (start, end, key) of the intervals overlapping [start, end), by start.
+        low = bisect_right(self.starts, start - self.max_length)
+        high = bisect_left(self.starts, end)
+        return [item for item in self.items[low:high] if item[1] > start]
+
+    def gaps(self, start, end, min_length=None):
+        # Free [from, to) stretches within [start, end).
+        free = []
+        cursor = start
+        for busy_start, busy_end, _ in self.overlapping(start, end):
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            free.append((cursor, end))
+        if min_length is not None:
+            free = [(gap_start, gap_end) for gap_start, gap_end in free
+                    if gap_end - gap_start >= min_length]
+        return free
+
+
+class BookingIndex:
+    # Per-process interval indexes of the shows of each venue and artist,
+    # used where the database has no exclusion constraints. An index is
+    # reused while the fingerprint of its shows (count, highest id, latest
+    # update, read with one aggregate query) stays the same, so bookings
+    # made by other processes are picked up on the next check.
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, column, entity_id):
+        fingerprint = tuple(db.session.query(
+            db.func.count(Show.id), db.func.max(Show.id), db.func.max(Show.updated_at)
+        ).filter(column == entity_id).one())
+        key = (column.key, entity_id)
+        with self.lock:
+            cached = self.indexes.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self.indexes.move_to_end(key)
+                return cached[1]
+        index = IntervalIndex(db.session.query(
+            Show.start_time, Show.end_time, Show.id).filter(column == entity_id))
+        with self.lock:
+            self.indexes[key] = (fingerprint, index)
+            while len(self.indexes) > self.maxsize:
+                self.indexes.popitem(last=False)
+        return index
+
+
+def get_booking_index(app):
+    if 'bookings' not in app.extensions:
+        app.extensions['bookings'] = BookingIndex(app.config['BOOKING_INDEX_SIZE'])
+    return app.extensions['bookings']
+
+
+def uses_constraints():
+    return db.get_engine().dialect.name == 'postgresql'
+
+
+def busy_intervals(column, entity_id, start, end):
+    # (start, end, show id) of the shows of one venue or artist overlapping
+    # [start, end). PostgreSQL answers from the GiST index behind the
+    # exclusion constraint, with start_time bounds so only the partitions
+    # of those months are read; elsewhere the in-memory index is used.
+    if uses_constraints():
+        return [tuple(row) for row in db.session.query(
+            Show.start_time, Show.end_time, Show.id
+        ).filter(
+            column == entity_id,
+            Show.start_time > start - MAX_SHOW_DURATION,
+            Show.start_time < end,
+            db.func.tsrange(Show.start_time, Show.end_time).op('&&')(db.func.tsrange(start, end))
+        ).order_by(Show.start_time)]
+    return get_booking_index(current_app._get_current_object()).get(
+        column, entity_id).overlapping(start, end)
+
+
+def find_conflicts(venue_id, artist_id, start_time, end_time, exclude_id=None):
+    conflicts = []
+    for kind, column, entity_id in (('venue', Show.venue_id, venue_id),
+                                    ('artist', Show.artist_id, artist_id)):
+        conflicts += [Conflict(kind, show_id, start, end)
+                      for start, end, show_id in busy_intervals(column, entity_id,
+                                                                start_time, end_time)
+                      if show_id != exclude_id]
+    return conflicts
+
+
+def booked_intervals(column, entity_ids, start, end):
+    # {venue (or artist) id: IntervalIndex of its shows within [start, end)}
+    # for many ids with one query, for checking a batch of bookings.
+    indexes = {entity_id: IntervalIndex() for entity_id in entity_ids}
+    if indexes:
+        for entity_id, show_start, show_end, show_id in db.session.query(
+                column, Show.start_time, Show.end_time, Show.id).filter(
+                column.in_(indexes), Show.start_time < end, Show.end_time > start):
+            indexes[entity_id].add(show_start, show_end, f'show {show_id}')
+    return indexes
+
+
+def constraint_conflict(error):
+    # 'venue' or 'artist' when an IntegrityError comes from an exclusion
+    # constraint, else None.
+    if isinstance(error, exc.IntegrityError):
+        for name, kind in CONSTRAINTS.items():
+            if name in str(error.orig):
+                return kind
+    return None
+
+
+def free_slots(venue_id, start, end, min_length=DEFAULT_SHOW_DURATION):
+    # Free stretches of a venue within [start, end) at least `min_length` long.
+    busy = IntervalIndex(busy_intervals(Show.venue_id, venue_id, start, end))
+    return busy.gaps(start, end, min_length)
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+def overlapping_pairs(column):
+    # Pairs of shows of the same venue (or artist) whose times overlap.
+    other = orm.aliased(Show)
+    return db.session.query(column, Show.id, other.id).join(
+        other, db.and_(getattr(other, column.key) == column, other.id > Show.id,
+                       other.start_time < Show.end_time, Show.start_time < other.end_time)
+    ).order_by(column, Show.id)
+
+
+@fyyur_cli.command('show-conflicts')
+def show_conflicts_command():
+    """List overlapping shows of the same venue or artist."""
+    found = 0
+    for kind, column in (('venue', Show.venue_id), ('artist', Show.artist_id)):
+        for entity_id, show_id, other_id in overlapping_pairs(column).yield_per(1000):
+            click.echo(f'{kind} {entity_id}: shows {show_id} and {other_id} overlap')
+            found += 1
+    click.echo(f'{found} overlapping pairs.', err=True)
@@ -0,0 +1,374 @@
+import csv
+import json
+import sys
+from datetime import datetime
+import click
+from flask import current_app
+from werkzeug.datastructures import MultiDict
+from wtforms import StringField
+from wtforms.validators import Optional, URL
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show, Genre, venue_genres, artist_genres
+from fyyurapp.forms import VenueForm, ArtistForm, ShowForm
+from fyyurapp.queries import genres_by_name
+from fyyurapp.counters import refresh_show_counts
+from fyyurapp.cache import cache
+from fyyurapp.cli import fyyur_cli
+from fyyurapp.bookings import show_end_time, booked_intervals
+
+#----------------------------------------------------------------------------#
+# Bulk import / export.
+#----------------------------------------------------------------------------#
+
+class BulkVenueForm(VenueForm):
+    # Exports leave unset links out, so they are optional on import.
+    image_link = StringField('image_link', validators=[Optional(), URL()])
+    website_link = StringField('website_link', validators=[Optional(), URL()])
+
+
+class BulkArtistForm(ArtistForm):
+    image_link = StringField('image_link', validators=[Optional(), URL()])
+    facebook_link = StringField('facebook_link', validators=[Optional(), URL()])
+    website_link = StringField('website_link', validators=[Optional(), URL()])
+
+
+# kind: (model, form validating a row, genre association table, its key)
+KINDS = {
+    'venues': (Venue, BulkVenueForm, venue_genres, 'venue_id'),
+    'artists': (Artist, BulkArtistForm, artist_genres, 'artist_id'),
+    'shows': (Show, ShowForm, None, None),
+}
+
+# Columns written by `flask fyyur export`, in order.
+EXPORT_FIELDS = {
+    'venues': ('id', 'name', 'city', 'state', 'address', 'phone', 'genres', 'image_link',
+               'facebook_link', 'website_link', 'seeking_talent', 'seeking_description'),
+    'artists': ('id', 'name', 'city', 'state', 'phone', 'genres', 'image_link',
+                'facebook_link', 'website_link', 'seeking_venue', 'seeking_description'),
+    'shows': ('id', 'artist_id', 'venue_id', 'start_time', 'end_time'),
+}
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def detect_format(path, format):
+    if format:
+        return format
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_rows(stream, format):
+    # Yields (line number, row dict, error) one row at a time.
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'expected a JSON object'
+            continue
+        yield line_no, row, None
+
+
+def to_formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key == 'genres' and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(',') if genre.strip()]
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, bool):
+                item = 'y' if item else 'false'
+            formdata.add(key, str(item))
+    return formdata
+
+
+def validate_row(form_class, row):
+    # Applies the same rules as the HTML forms; returns (data, error).
+    form = form_class(formdata=to_formdata(row), meta={'csrf': False})
+    if not form.validate():
+        return None, '; '.join(
+            f"{field}: {', '.join(messages)}" for field, messages in form.errors.items())
+    # fields left empty are stored as NULL, as they were exported
+    data = {name: None if value == '' else value for name, value in form.data.items()}
+    # exported rows keep their id, so shows still point at their venue
+    # and artist; rows without one get a new id
+    data['id'] = row.get('id')
+    if data['id'] in ('', None):
+        data['id'] = None
+    else:
+        try:
+            data['id'] = int(data['id'])
+        except (TypeError, ValueError):
+            return None, 'id: must be an integer'
+    if form_class is ShowForm:
+        try:
+            data['artist_id'] = int(data['artist_id'])
+            data['venue_id'] = int(data['venue_id'])
+        except (TypeError, ValueError):
+            return None, 'artist_id and venue_id must be integers'
+    return data, None
+
+
+def insert_returning_ids(table, rows):
+    # Inserts a batch and returns the ids in row order: multi-row
+    # INSERT ... RETURNING on PostgreSQL (one for the rows keeping their id,
+    # one for the others), one cheap insert per row elsewhere.
+    if db.get_engine().dialect.name != 'postgresql':
+        return [db.session.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+    ids = [None] * len(rows)
+    for keeps_id in (True, False):
+        positions = [index for index, row in enumerate(rows) if ('id' in row) == keeps_id]
+        if positions:
+            inserted = db.session.execute(table.insert().values(
+                [rows[index] for index in positions]).returning(table.c.id)).scalars().all()
+            for index, id in zip(positions, inserted):
+                ids[index] = id
+    return ids
+
+
+def table_row(table, data):
+    # The columns of `table` in `data`, leaving the id out when it is None.
+    return {column.name: data[column.name] for column in table.columns
+            if column.name in data and not (column.name == 'id' and data['id'] is None)}
+
+
+def taken_ids(model, batch):
+    # Rejects rows whose id is already used, in the database or earlier in
+    # the batch; returns (errors, remaining batch).
+    ids = [data['id'] for _, data in batch if data['id'] is not None]
+    taken = {row[0] for row in db.session.query(model.id).filter(model.id.in_(ids))} if ids else set()
+    errors, remaining = [], []
+    for line_no, data in batch:
+        if data['id'] is not None:
+            if data['id'] in taken:
+                errors.append((line_no, f"id: {data['id']} already exists"))
+                continue
+            taken.add(data['id'])
+        remaining.append((line_no, data))
+    return errors, remaining
+
+
+def reset_id_sequence(model):
+    # Moves the PostgreSQL id sequence past ids imported as they were, so
+    # rows created afterwards do not collide with them.
+    if db.get_engine().dialect.name == 'postgresql':
+        table = model.__table__.name
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f'coalesce(max(id), 0) + 1, false) FROM "{table}"'))
+
+
+def insert_entities(model, link, key, batch):
+    errors, batch = taken_ids(model, batch)
+    ids = insert_returning_ids(model.__table__, [
+        table_row(model.__table__, data) for _, data in batch])
+
+    genres = {genre.name: genre for genre in genres_by_name(
+        [name for _, data in batch for name in data['genres']])}
+    db.session.flush()
+    links = [
+        {key: entity_id, 'genre_id': genres[name].id}
+        for entity_id, (_, data) in zip(ids, batch)
+        for name in dict.fromkeys(data['genres'])
+    ]
+    if links:
+        db.session.execute(link.insert(), links)
+    return errors, ids
+
+
+def insert_shows(batch):
+    # Rows pointing at unknown venues or artists, or booking one of them
+    # while it already plays (in the database or earlier in the file), are
+    # rejected instead of failing the whole batch on the constraints.
+    errors, batch = taken_ids(Show, batch)
+    if not batch:
+        return errors, []
+    for _, data in batch:
+        data['end_time'] = show_end_time(data['start_time'], data['end_time'], data['duration'])
+    venue_ids = {data['venue_id'] for _, data in batch}
+    artist_ids = {data['artist_id'] for _, data in batch}
+    known_venues = {row[0] for row in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+    known_artists = {row[0] for row in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+    start = min(data['start_time'] for _, data in batch)
+    end = max(data['end_time'] for _, data in batch)
+    booked = {
+        'venue_id': booked_intervals(Show.venue_id, known_venues, start, end),
+        'artist_id': booked_intervals(Show.artist_id, known_artists, start, end),
+    }
+
+    rows = []
+    for line_no, data in batch:
+        if data['venue_id'] not in known_venues:
+            errors.append((line_no, f"venue_id: no venue {data['venue_id']}"))
+            continue
+        if data['artist_id'] not in known_artists:
+            errors.append((line_no, f"artist_id: no artist {data['artist_id']}"))
+            continue
+        clashes = []
+        for key, indexes in booked.items():
+            overlapping = indexes[data[key]].overlapping(data['start_time'], data['end_time'])
+            if overlapping:
+                clashes.append(f'{key}: {data[key]} is booked by {overlapping[0][2]}')
+        if clashes:
+            errors.append((line_no, '; '.join(clashes)))
+            continue
+        for key, indexes in booked.items():
+            indexes[data[key]].add(data['start_time'], data['end_time'], f'line {line_no}')
+        rows.append(table_row(Show.__table__, {
+            name: data[name] for name in ('id', 'artist_id', 'venue_id', 'start_time', 'end_time')}))
+
+    if rows:
+        insert_returning_ids(Show.__table__, rows)
+        db.session.flush()
+        refresh_show_counts(Venue, {row['venue_id'] for row in rows})
+        refresh_show_counts(Artist, {row['artist_id'] for row in rows})
+    return errors, rows
+
+
+def import_rows(kind, rows, batch_size=1000, report=None):
+    # Validates and inserts rows in batches, committing each batch.
+    # Returns (imported, rejected); `report(line_no, message)` receives
+    # every rejected row.
+    model, form_class, link, key = KINDS[kind]
+    report = report or (lambda line_no, message: None)
+    imported = rejected = 0
+
+    def flush(batch):
+        nonlocal imported, rejected
+        try:
+            if model is Show:
+                errors, inserted = insert_shows(batch)
+            else:
+                errors, inserted = insert_entities(model, link, key, batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            errors = [(line_no, f'batch failed: {e}') for line_no, _ in batch]
+            inserted = []
+        for line_no, message in errors:
+            report(line_no, message)
+        imported += len(inserted)
+        rejected += len(errors)
+
+    batch = []
+    for line_no, row, error in rows:
+        data = None
+        if error is None:
+            data, error = validate_row(form_class, row)
+        if error is not None:
+            report(line_no, error)
+            rejected += 1
+            continue
+        batch.append((line_no, data))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    reset_id_sequence(model)
+    db.session.commit()
+    # only reaches other processes (the web workers) with the Redis backend
+    cache.clear()
+    return imported, rejected
+
+
+def export_rows(kind, batch_size=1000):
+    # Yields export dicts, reading the table in id-ordered chunks so that
+    # memory use does not grow with the table.
+    model, _, link, key = KINDS[kind]
+    fields = [name for name in EXPORT_FIELDS[kind] if name != 'genres']
+    last_id = 0
+    while True:
+        rows = db.session.query(*[getattr(model, name) for name in fields]).filter(
+            model.id > last_id).order_by(model.id).limit(batch_size).all()
+        if not rows:
+            return
+        genres = {}
+        if link is not None:
+            for entity_id, name in db.session.query(link.c[key], Genre.name).join(
+                    Genre, Genre.id == link.c.genre_id).filter(
+                    link.c[key].in_([row.id for row in rows])).order_by(Genre.name):
+                genres.setdefault(entity_id, []).append(name)
+        for row in rows:
+            data = dict(zip(fields, row))
+            if link is not None:
+                data['genres'] = genres.get(row.id, [])
+            yield data
+        last_id = rows[-1].id
+
+
+def write_rows(rows, stream, kind, format):
+    count = 0
+    if format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS[kind])
+        writer.writeheader()
+    for data in rows:
+        for name in ('start_time', 'end_time'):
+            if isinstance(data.get(name), datetime):
+                data[name] = data[name].strftime(DATETIME_FORMAT)
+        if format == 'csv':
+            if 'genres' in data:
+                data['genres'] = ','.join(data['genres'])
+            # BooleanField reads 'False' as true but 'false' as false
+            writer.writerow({name: str(value).lower() if isinstance(value, bool) else value
+                             for name, value in data.items()})
+        else:
+            stream.write(json.dumps(data) + '\n')
+        count += 1
+    return count
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Input format; guessed from the file extension by default.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+def import_command(kind, path, format, batch_size):
+    """Import venues, artists or shows from a CSV or NDJSON file."""
+    format = detect_format(path, format)
+
+    def report(line_no, message):
+        click.echo(f'{path}:{line_no}: {message}', err=True)
+
+    with click.open_file(path, encoding='utf-8') as stream:
+        imported, rejected = import_rows(
+            kind, read_rows(stream, format), batch_size, report)
+    click.echo(f'Imported {imported} {kind}, rejected {rejected} rows.')
+    if not cache.shared():
+        click.echo("Running servers keep serving cached pages for up to "
+                   f"{current_app.config['CACHE_TTL']} seconds; with CACHE_BACKEND = 'redis' "
+                   "they are cleared on import.", err=True)
+    if rejected:
+        sys.exit(1)
+
+
+@fyyur_cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Output format; guessed from the file extension by default.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+def export_command(kind, path, format, batch_size):
+    """Export venues, artists or shows to a CSV or NDJSON file."""
+    format = detect_format(path, format)
+    with click.open_file(path, 'w', encoding='utf-8') as stream:
+        count = write_rows(export_rows(kind, batch_size), stream, kind, format)
+    click.echo(f'Exported {count} {kind}.', err=path == '-')
+
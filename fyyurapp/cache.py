@@ -0,0 +1,184 @@
+import math
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+#----------------------------------------------------------------------------#
+# Cache backends.
+#----------------------------------------------------------------------------#
+
+
+def entry_ttl(default, ttl):
+    # An entry lives `default` seconds, or less when set() asks for it.
+    return default if ttl is None else min(default, ttl)
+
+
+class MemoryBackend:
+    # In-process LRU cache whose entries expire after `ttl` seconds.
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + entry_ttl(self.ttl, ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisBackend:
+    # Backend for any client speaking the Redis get/set/delete commands,
+    # e.g. redis.Redis or a local fake in tests.
+
+    def __init__(self, client, ttl=300, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value),
+                        px=max(math.ceil(entry_ttl(self.ttl, ttl) * 1000), 1))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullBackend:
+    # Disables caching.
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def create_backend(config):
+    name = config['CACHE_BACKEND']
+    if name == 'memory':
+        return MemoryBackend(config['CACHE_MAXSIZE'], config['CACHE_TTL'])
+    if name == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "CACHE_BACKEND = 'redis' requires the redis package")
+        return RedisBackend(redis.Redis.from_url(config['CACHE_REDIS_URL']), config['CACHE_TTL'])
+    if name == 'null':
+        return NullBackend()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+#----------------------------------------------------------------------------#
+# Read-through cache.
+#----------------------------------------------------------------------------#
+
+
+class Cache:
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config)
+
+    def get_or_set(self, key, build, ttl=None):
+        # Returns the cached value for `key`, building and storing it on a
+        # miss. None results (e.g. unknown ids) are not cached. `ttl(value)`
+        # may shorten the entry's life below CACHE_TTL; entries it gives no
+        # time at all are not stored.
+        value = self.backend.get(key)
+        if value is not None:
+            with self.lock:
+                self.hits += 1
+            return value
+        with self.lock:
+            self.misses += 1
+        value = build()
+        if value is not None:
+            seconds = ttl(value) if ttl else None
+            if seconds is None or seconds > 0:
+                self.backend.set(key, value, seconds)
+        return value
+
+    def invalidate(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def shared(self):
+        # Whether invalidate() and clear() reach other processes, such as
+        # the web workers when a CLI command changes the data.
+        return isinstance(self.backend, RedisBackend)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def detail_ttl(data, now=None):
+    # Detail pages split shows into past and upcoming when they are built,
+    # so a cached page only lives until its next show starts.
+    if not data['upcoming_shows']:
+        return None
+    now = now or datetime.now()
+    return (data['upcoming_shows'][0]['start_time'] - now).total_seconds()
+
+
+def venue_key(venue_id):
+    return f'venue:{venue_id}'
+
+
+def artist_key(artist_id):
+    return f'artist:{artist_id}'
+
+
+cache = Cache()
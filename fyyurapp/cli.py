@@ -0,0 +1,48 @@
+import click
+from flask.cli import AppGroup, ScriptInfo
+from fyyurapp import db
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+@click.group('fyyur', cls=AppGroup)
+def fyyur_cli():
+    """Fyyur data tools."""
+
+
+class LazyGroup(click.Group):
+    # Stands in for a command group that is only imported when one of its
+    # commands runs or is listed, so processes that serve requests never
+    # load it. `load(app)` returns the real group.
+
+    def __init__(self, name, load, **attrs):
+        super().__init__(name, **attrs)
+        self.load = load
+
+    def loaded(self, ctx):
+        return self.load(ctx.ensure_object(ScriptInfo).load_app())
+
+    def list_commands(self, ctx):
+        return self.loaded(ctx).list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self.loaded(ctx).get_command(ctx, name)
+
+
+def load_fyyur_cli(app):
+    from fyyurapp import bookings, bulk, partitions, synthetic, templating  # add their commands to the group
+    return fyyur_cli
+
+
+def register_commands(app):
+    from fyyurapp.counters import refresh_show_counts_command
+    app.cli.add_command(refresh_show_counts_command)
+    app.cli.add_command(LazyGroup('fyyur', load_fyyur_cli,
+                                  help='Import, export and generate data; maintain partitions; compile templates.'))
+    # Flask-Migrate installs `flask db` as a plugin of the flask command; it
+    # only needs the extension when the app is built by that command.
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
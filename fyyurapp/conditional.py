@@ -0,0 +1,129 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, session, make_response
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from fyyurapp.queries import SHOW_LISTING_ORDER, has_genre
+from fyyurapp.pagination import seek, page_arguments
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+
+def version(*sources, now=None):
+    # Cheap fingerprint of the rows a page is built from. Each source is a
+    # model (or an alias of one) or a (model, criterion) pair and
+    # contributes max(updated_at), a row count and the sum of the ids (so a
+    # row replaced by another in a fixed-size range shows up); shows also
+    # contribute how many are still upcoming, so pages change when a show
+    # moves into the past. All of it is read in one statement. Returns
+    # (etag, last_modified).
+    if now is None:
+        now = datetime.now()
+
+    columns = []
+    for source in sources:
+        model, criterion = source if isinstance(source, tuple) else (source, None)
+        aggregates = [db.func.max(model.updated_at), db.func.count(model.id),
+                      db.func.sum(model.id)]
+        if db.inspect(model).mapper.class_ is Show:
+            aggregates.append(db.func.count(model.id).filter(model.start_time > now))
+        for aggregate in aggregates:
+            query = db.session.query(aggregate)
+            if criterion is not None:
+                query = query.filter(criterion)
+            columns.append(query.scalar_subquery())
+
+    values = db.session.query(*columns).one()
+    etag = hashlib.sha1(repr(tuple(values)).encode()).hexdigest()
+    timestamps = [value for value in values if isinstance(value, datetime)]
+    last_modified = max(timestamps).replace(tzinfo=timezone.utc, microsecond=0) \
+        if timestamps else None
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(get_sources):
+    # Adds ETag / Last-Modified validators to a GET view and answers
+    # If-None-Match / If-Modified-Since with 304 before rendering.
+    # `get_sources` receives the view arguments and returns the version()
+    # sources of the page.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            # Pages carrying flashed messages are never served from cache.
+            if '_flashes' in session:
+                return view(**kwargs)
+
+            etag, last_modified = version(*get_sources(**kwargs))
+            if not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def listing_sources(model, order):
+    # A /venues or /artists page lists one keyset range of rows (the ones
+    # seek() reads for it, ?genre= applied); rows elsewhere do not change
+    # it, so the check costs the same however many there are.
+    query = model.query
+    if request.args.get('genre'):
+        query = query.filter(has_genre(model, request.args['genre']))
+    return [db.aliased(model, seek(query, order, **page_arguments()).cte(
+        f'{model.__tablename__}_page'))]
+
+
+def newest_sources(*models, count=10):
+    # The home page lists the `count` newest rows of each model.
+    return [db.aliased(model, model.query.order_by(db.desc(model.created_at)).limit(
+        count).cte(f'{model.__tablename__}_newest')) for model in models]
+
+
+def show_listing_sources():
+    # A /shows page lists one keyset range of shows (the rows seek() reads
+    # for it) with their venues and artists; shows elsewhere do not change
+    # it. The range is read once, as a CTE the other sources refer to.
+    page = seek(Show.query, SHOW_LISTING_ORDER, **page_arguments()).cte('show_page')
+    return [
+        db.aliased(Show, page),
+        (Venue, Venue.id.in_(db.session.query(page.c.venue_id))),
+        (Artist, Artist.id.in_(db.session.query(page.c.artist_id))),
+    ]
+
+
+def venue_page_sources(venue_id):
+    # A venue page shows the venue, its shows and the artists playing them.
+    return [
+        (Venue, Venue.id == venue_id),
+        (Show, Show.venue_id == venue_id),
+        (Artist, Artist.id.in_(db.session.query(
+            Show.artist_id).filter(Show.venue_id == venue_id)))
+    ]
+
+
+def artist_page_sources(artist_id):
+    # An artist page shows the artist, its shows and the venues hosting them.
+    return [
+        (Artist, Artist.id == artist_id),
+        (Show, Show.artist_id == artist_id),
+        (Venue, Venue.id.in_(db.session.query(
+            Show.venue_id).filter(Show.artist_id == artist_id)))
+    ]
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+# Venue.upcoming_shows_count / past_shows_count and their Artist twins are
+# maintained here, so views read them with the entity row instead of
+# counting shows on every request.
+
+
+def show_column(model):
+    return Show.venue_id if model is Venue else Show.artist_id
+
+
+def refresh_show_counts(model, ids=None, now=None):
+    # Recomputes the counters of the given venues or artists (all of them
+    # when ids is None) with one UPDATE. Does not commit.
+    if now is None:
+        now = datetime.now()
+    column = show_column(model)
+
+    def count(*criteria):
+        return db.session.query(db.func.count(Show.id)).filter(
+            column == model.id, *criteria).scalar_subquery()
+
+    query = db.session.query(model)
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+        query = query.filter(model.id.in_(ids))
+    return query.update({
+        model.upcoming_shows_count: count(Show.start_time > now),
+        model.past_shows_count: count(Show.start_time <= now),
+    }, synchronize_session=False)
+
+
+def record_show(show, now=None):
+    # Counts a newly added show on its venue and artist in the same
+    # transaction. The counters are incremented rather than recounted, so
+    # the other shows (and on PostgreSQL, past partitions) are not read.
+    if now is None:
+        now = datetime.now()
+    for model, entity_id in ((Venue, show.venue_id), (Artist, show.artist_id)):
+        counter = model.upcoming_shows_count if show.start_time > now else model.past_shows_count
+        db.session.query(model).filter(model.id == entity_id).update(
+            {counter: counter + 1}, synchronize_session=False)
+
+
+def roll_show_counts(since=None, now=None):
+    # Moves shows that started in (since, now] from upcoming to past by
+    # refreshing the venues and artists they belong to. Without `since`
+    # every counter is recomputed. Does not commit.
+    if now is None:
+        now = datetime.now()
+    refreshed = 0
+    for model in (Venue, Artist):
+        if since is None:
+            refreshed += refresh_show_counts(model, now=now)
+            continue
+        column = show_column(model)
+        ids = [row[0] for row in db.session.query(column).filter(
+            Show.start_time > since, Show.start_time <= now).distinct()]
+        refreshed += refresh_show_counts(model, ids, now)
+    return refreshed
+
+
+@click.command('refresh-show-counts')
+@click.option('--since-minutes', type=int, default=None,
+              help='Only refresh entities with shows that started in the last N minutes.')
+@with_appcontext
+def refresh_show_counts_command(since_minutes):
+    """Roll show counters from upcoming to past.
+
+    Meant to run on a schedule, e.g. every 15 minutes from cron with
+    --since-minutes=30 so consecutive runs overlap.
+    """
+    now = datetime.now()
+    since = now - timedelta(minutes=since_minutes) if since_minutes else None
+    refreshed = roll_show_counts(since, now)
+    db.session.commit()
+    click.echo(f'Refreshed show counters for {refreshed} venues and artists.')
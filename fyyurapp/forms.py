@@ -1,12 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL, Optional, ValidationError
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, Optional, ValidationError, NumberRange
 import re
 
 
+def validate_end_time(form, field):
+    start = form.start_time.data
+    if field.data and start and not start < field.data <= start + timedelta(hours=12):
+        raise ValidationError("End time must be after the start time and at most 12 hours later.")
+
+
 def validate_phone(form, field):
-    if not re.search(r"^[0-9]*$", field.data):
+    if not re.search(r"^[0-9]*$", field.data or ''):
         raise ValidationError("Phone number should only contain digits.")
 
 
@@ -22,6 +28,16 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    # minutes; ignored when end_time is given
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=15, max=720)],
+        default=120
+    )
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional(), validate_end_time]
+    )
 
 
 class VenueForm(Form):
@@ -0,0 +1,226 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from flask import has_request_context, request
+from sqlalchemy import event
+from fyyurapp import db
+from fyyurapp.models import Venue
+from fyyurapp.replicas import RoutingSession
+from fyyurapp.metrics import registry
+from fyyurapp.cache import cache, venue_key, artist_key
+from fyyurapp.counters import refresh_show_counts
+from fyyurapp.queries import show_partner_ids
+
+#----------------------------------------------------------------------------#
+# Background jobs.
+#----------------------------------------------------------------------------#
+
+# Views queue the work a write does not need before responding with
+# after_commit(); it runs once the transaction commits, on a few threads
+# of the same process, each job in its own app context and session. A
+# full queue, an executor that is shutting down or JOBS_WORKERS = 0 runs
+# the job in the caller instead, so jobs are never dropped.
+
+Job = namedtuple('Job', ['func', 'args', 'kwargs', 'submitted'])
+
+# session.info key of the jobs waiting for the transaction to commit
+PENDING = 'after_commit_jobs'
+
+
+def job_name(func):
+    return getattr(func, '__name__', type(func).__name__)
+
+
+class Executor:
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config['JOBS_WORKERS']
+        self.queue_size = app.config['JOBS_QUEUE_SIZE']
+        self.max_retries = app.config['JOBS_MAX_RETRIES']
+        self.backoff = app.config['JOBS_RETRY_BACKOFF']
+        self.drain_timeout = app.config['JOBS_DRAIN_TIMEOUT']
+        self.lock = threading.Lock()
+        self.pid = None
+        self.threads = []
+        self.queue = queue.Queue(self.queue_size)
+        self.stopping = threading.Event()
+        self.closed = False
+        self.running = 0
+
+    def start(self):
+        # Threads start on first use in each process, so a gunicorn master
+        # that preloads the app forks without any; a forked copy starts
+        # its own with an empty queue.
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.queue = queue.Queue(self.queue_size)
+            self.stopping = threading.Event()
+            self.closed = False
+            self.running = 0
+            self.threads = [threading.Thread(target=self.work, name=f'fyyur-jobs-{index}',
+                                             daemon=True) for index in range(self.workers)]
+            for thread in self.threads:
+                thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, func, *args, **kwargs):
+        job = Job(func, args, kwargs, time.perf_counter())
+        registry.inc('fyyur_jobs_submitted_total', (job_name(func),))
+        if self.workers:
+            self.start()
+            if not self.closed:
+                try:
+                    self.queue.put_nowait(job)
+                    return
+                except queue.Full:
+                    pass
+        registry.inc('fyyur_jobs_inline_total', (job_name(func),))
+        # The caller may be in an after_commit event, where its session
+        # cannot run SQL, so the job still gets a thread of its own.
+        thread = threading.Thread(target=self.run, args=(job,))
+        thread.start()
+        thread.join()
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                self.run(job)
+            finally:
+                self.queue.task_done()
+
+    def run(self, job):
+        name = job_name(job.func)
+        registry.observe('fyyur_job_wait_seconds', time.perf_counter() - job.submitted, (name,))
+        with self.lock:
+            self.running += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    with self.app.app_context():
+                        job.func(*job.args, **job.kwargs)
+                except Exception:
+                    registry.observe('fyyur_job_duration_seconds', time.perf_counter() - start, (name,))
+                    if attempt == self.max_retries:
+                        registry.inc('fyyur_jobs_finished_total', (name, 'failed'))
+                        self.app.logger.exception('job %s failed after %d attempts',
+                                                  name, attempt + 1)
+                        return
+                    registry.inc('fyyur_job_retries_total', (name,))
+                    # cut short when draining
+                    self.stopping.wait(self.backoff * 2 ** attempt)
+                else:
+                    registry.observe('fyyur_job_duration_seconds', time.perf_counter() - start, (name,))
+                    registry.inc('fyyur_jobs_finished_total', (name, 'ok'))
+                    return
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def shutdown(self, timeout=None):
+        # Stops queueing (later jobs run in the caller) and waits up to
+        # `timeout` seconds (JOBS_DRAIN_TIMEOUT) for the queued and running
+        # jobs. Returns how many were left unfinished.
+        timeout = self.drain_timeout if timeout is None else timeout
+        with self.lock:
+            if self.closed or self.pid != os.getpid():
+                return 0
+            self.closed = True
+        self.stopping.set()
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            try:
+                self.queue.put(None, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                break
+        for thread in self.threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        left = self.stats()['queued'] + self.running
+        if left:
+            self.app.logger.warning('%d background jobs unfinished at shutdown', left)
+        return left
+
+    def stats(self):
+        return {
+            'queued': sum(job is not None for job in list(self.queue.queue)),
+            'running': self.running,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+        }
+
+
+def init_app(app):
+    app.extensions['jobs'] = Executor(app)
+
+
+def get_executor(app):
+    return app.extensions['jobs']
+
+
+def after_commit(func, *args, **kwargs):
+    # Runs func(*args, **kwargs) in the background once the current
+    # transaction commits; nothing runs if it rolls back.
+    session = db.session()
+    if not session.in_transaction():
+        # so that closing the session before any SQL still drops the job
+        session.begin()
+    session.info.setdefault(PENDING, []).append((func, args, kwargs))
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def submit_pending(db_session):
+    pending = db_session.info.pop(PENDING, None)
+    if pending:
+        executor = get_executor(db_session.app)
+        for func, args, kwargs in pending:
+            executor.submit(func, *args, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def drop_pending(db_session, transaction):
+    # runs after after_commit, so only jobs of rolled back transactions are left
+    if transaction.parent is None:
+        db_session.info.pop(PENDING, None)
+
+
+#----------------------------------------------------------------------------#
+# Jobs.
+#----------------------------------------------------------------------------#
+
+audit_log = logging.getLogger('fyyurapp.audit')
+
+
+def invalidate_partner_pages(model, entity_id, partner_ids=None):
+    # Drops the cached detail pages of the artists of a venue (or the
+    # venues of an artist), which show its name and image.
+    key = artist_key if model is Venue else venue_key
+    if partner_ids is None:
+        partner_ids = show_partner_ids(model, entity_id)
+    cache.invalidate(*[key(id) for id in partner_ids])
+
+
+def refresh_counts(model, ids):
+    refresh_show_counts(model, ids)
+    db.session.commit()
+
+
+def audit(action, kind, entity_id, address=None):
+    audit_log.info('%s %s %s', action, kind, entity_id, extra={'fields': {
+        'audit': action, 'kind': kind, 'id': entity_id, 'address': address}})
+
+
+def after_commit_audit(action, kind, entity_id):
+    # Queues an audit record of a write, taking the client address while
+    # the request is still there.
+    after_commit(audit, action, kind, entity_id,
+                 request.remote_addr if has_request_context() else None)
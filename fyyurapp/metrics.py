@@ -0,0 +1,221 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from flask import Response, current_app, g, request
+from jinja2 import Template
+from fyyurapp import db
+from fyyurapp.cache import cache
+from fyyurapp.pool import pool_stats
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+
+# name: (type, help, histogram buckets, label names)
+METRICS = {
+    'fyyur_request_duration_seconds': (
+        'histogram', 'Request latency by endpoint.', LATENCY_BUCKETS, ('endpoint', 'method')),
+    'fyyur_responses_total': (
+        'counter', 'Responses by endpoint and status.', None, ('endpoint', 'status')),
+    'fyyur_requests_started_total': ('counter', 'Requests started.', None, ()),
+    'fyyur_requests_finished_total': ('counter', 'Requests finished.', None, ()),
+    'fyyur_template_render_seconds': (
+        'histogram', 'Template render time.', LATENCY_BUCKETS, ('template',)),
+    'fyyur_db_query_seconds': (
+        'histogram', 'Duration of single SQL statements.', QUERY_BUCKETS, ()),
+    'fyyur_errors_total': ('counter', 'Error pages served.', None, ('status',)),
+    'fyyur_jobs_submitted_total': ('counter', 'Background jobs submitted.', None, ('job',)),
+    'fyyur_jobs_inline_total': (
+        'counter', 'Jobs run by the caller as the queue was full or closed.', None, ('job',)),
+    'fyyur_jobs_finished_total': (
+        'counter', 'Background jobs finished, by outcome.', None, ('job', 'outcome')),
+    'fyyur_job_retries_total': ('counter', 'Failed job attempts retried.', None, ('job',)),
+    'fyyur_job_wait_seconds': (
+        'histogram', 'Time jobs spent queued.', LATENCY_BUCKETS, ('job',)),
+    'fyyur_job_duration_seconds': (
+        'histogram', 'Run time of job attempts.', LATENCY_BUCKETS, ('job',)),
+}
+
+
+class Shard:
+    # Samples recorded by one thread. Only that thread writes to it, so
+    # recording takes no lock.
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def merge(self, other):
+        for key, value in list(other.counters.items()):
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, (buckets, total) in list(other.histograms.items()):
+            mine = self.histograms.setdefault(key, [[0] * len(buckets), 0.0])
+            mine[0] = [a + b for a, b in zip(mine[0], buckets)]
+            mine[1] += total
+
+
+class Registry:
+    # Per-thread shards summed when /metrics is scraped. The lock is only
+    # taken when a thread records its first sample, when a finished thread's
+    # shard is folded into `retired`, and while scraping. Values cover this
+    # process only; with several workers each is scraped separately.
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = set()
+        self.retired = Shard()
+
+    def shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = Shard()
+            with self.lock:
+                self.shards.add(shard)
+            weakref.finalize(threading.current_thread(), self.retire, shard)
+        return shard
+
+    def retire(self, shard):
+        with self.lock:
+            self.shards.discard(shard)
+            self.retired.merge(shard)
+
+    def inc(self, name, labels=(), value=1):
+        counters = self.shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][2]
+        histograms = self.shard().histograms
+        key = (name, labels)
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+        entry[0][bisect_left(buckets, value)] += 1
+        entry[1] += value
+
+    def collect(self):
+        total = Shard()
+        with self.lock:
+            total.merge(self.retired)
+            for shard in list(self.shards):
+                total.merge(shard)
+        return total
+
+    def reset(self):
+        with self.lock:
+            self.shards.clear()
+            self.retired = Shard()
+        self.local = threading.local()
+
+
+registry = Registry()
+
+
+class TimedTemplate(Template):
+    # Records the render time of top-level templates (not their includes).
+
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            registry.observe('fyyur_template_render_seconds',
+                             time.perf_counter() - start, (self.name,))
+
+
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    registry.inc('fyyur_requests_started_total')
+
+
+def record_request_metrics(response):
+    started = g.get('metrics_started')
+    if started is not None:
+        endpoint = request.endpoint or 'none'
+        registry.observe('fyyur_request_duration_seconds', time.perf_counter() - started,
+                         (endpoint, request.method))
+        registry.inc('fyyur_responses_total', (endpoint, str(response.status_code)))
+    return response
+
+
+def finish_request_metrics(error=None):
+    registry.inc('fyyur_requests_finished_total')
+
+
+#----------------------------------------------------------------------------#
+# Exposition.
+#----------------------------------------------------------------------------#
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def render_metrics(samples):
+    lines = []
+    for name, (kind, help, buckets, label_names) in METRICS.items():
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (key, labels), value in sorted(samples.counters.items()):
+                if key == name:
+                    lines.append(f'{name}{format_labels(label_names, labels)} {value}')
+            continue
+        for (key, labels), (counts, total) in sorted(samples.histograms.items()):
+            if key != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket'
+                             f'{format_labels(label_names, labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(label_names, labels)} {total}')
+            lines.append(f'{name}_count{format_labels(label_names, labels)} {cumulative}')
+
+    in_flight = samples.counters.get(('fyyur_requests_started_total', ()), 0) - \
+        samples.counters.get(('fyyur_requests_finished_total', ()), 0)
+    pool = pool_stats.snapshot(db.get_engine().pool)
+    jobs = current_app.extensions['jobs'].stats()
+    gauges = [
+        ('fyyur_requests_in_flight', 'gauge', 'Requests being served.', in_flight),
+        ('fyyur_cache_hits_total', 'counter', 'Detail page cache hits.', cache.hits),
+        ('fyyur_cache_misses_total', 'counter', 'Detail page cache misses.', cache.misses),
+        ('fyyur_db_pool_checkouts_total', 'counter', 'Pool checkouts.', pool['checkouts']),
+        ('fyyur_db_pool_timeouts_total', 'counter', 'Pool checkout timeouts.', pool['timeouts']),
+        ('fyyur_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection.',
+         pool['wait_total_ms'] / 1000),
+        ('fyyur_db_pool_checked_out', 'gauge', 'Connections in use.', pool.get('checked_out', 0)),
+        ('fyyur_db_pool_overflow', 'gauge', 'Overflow connections open.', pool.get('overflow', 0)),
+        ('fyyur_jobs_queued', 'gauge', 'Background jobs waiting in the queue.', jobs['queued']),
+        ('fyyur_jobs_running', 'gauge', 'Background jobs running.', jobs['running']),
+        ('fyyur_jobs_queue_size', 'gauge', 'Capacity of the job queue.', jobs['queue_size']),
+    ]
+    for name, kind, help, value in gauges:
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def metrics():
+    return Response(render_metrics(registry.collect()),
+                    mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(start_request_metrics)
+    app.after_request(record_request_metrics)
+    app.teardown_request(finish_request_metrics)
+    app.add_url_rule('/metrics', 'metrics', metrics)
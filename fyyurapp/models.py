@@ -1,12 +1,56 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import DDL, event
 from fyyurapp import db
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# Association tables; the (genre_id, entity_id) indexes serve genre filters.
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey(
+        'Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey(
+        'Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey(
+        'Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey(
+        'Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
+
+def trigram_indexes(table, *columns):
+    # pg_trgm GIN indexes serving the ILIKE filters of search.py (created
+    # on PostgreSQL by migration aa304bc61f4d). Other databases ignore the
+    # postgresql_* options and build plain indexes.
+    return tuple(db.Index(f'ix_{table}_{column}_trgm', column, postgresql_using='gin',
+                          postgresql_ops={column: 'gin_trgm_ops'}) for column in columns)
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Genre id: {self.id} name: {self.name}>"
+
+
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        # area grouping and keyset order of the /venues listing
+        db.Index('ix_Venue_city_state_name_id', 'city', 'state', 'name', 'id'),
+        *trigram_indexes('venue', 'name', 'city', 'state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -14,7 +58,8 @@ class Venue(db.Model):
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String, nullable=False)
+    genres = db.relationship("Genre", secondary=venue_genres,
+                             order_by="Genre.name")
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
@@ -22,9 +67,21 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(500))
     created_at = db.Column(
-        db.DateTime, default=datetime.utcnow, nullable=False)
+        db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, nullable=False, index=True)
+    # maintained by fyyurapp.counters
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # shows are only loaded on access; views pick a loader with queries.with_shows()
     shows = db.relationship("Show", backref="venues",
-                            lazy=False, cascade="all, delete-orphan")
+                            lazy="select", cascade="all, delete-orphan")
+
+    @property
+    def genre_names(self):
+        return [genre.name for genre in self.genres]
 
     def __repr__(self):
         return f"<Venue id: {self.id} name: {self.name} city: {self.city} state: {self.state}>"
@@ -32,13 +89,19 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        # keyset order of the /artists listing
+        db.Index('ix_Artist_name_id', 'name', 'id'),
+        *trigram_indexes('artist', 'name', 'city', 'state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship("Genre", secondary=artist_genres,
+                             order_by="Genre.name")
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
@@ -46,18 +109,50 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(500))
     created_at = db.Column(
-        db.DateTime, default=datetime.utcnow, nullable=False)
+        db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, nullable=False, index=True)
+    # maintained by fyyurapp.counters
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # shows are only loaded on access; views pick a loader with queries.with_shows()
     shows = db.relationship("Show", backref="artists",
-                            lazy=False, cascade="all, delete-orphan")
+                            lazy="select", cascade="all, delete-orphan")
+
+    @property
+    def genre_names(self):
+        return [genre.name for genre in self.genres]
 
     def __repr__(self):
         return f"<Venue id: {self.id} name: {self.name}>"
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 
+# Shows listed without an end time or duration run this long; none may
+# run longer than MAX_SHOW_DURATION.
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+MAX_SHOW_DURATION = timedelta(hours=12)
+
+
+def default_end_time(context):
+    return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_DURATION
+
 
 class Show(db.Model):
     __tablename__ = "Show"
+    __table_args__ = (
+        # past/upcoming lookups and counts per venue and per artist; the
+        # included column lets PostgreSQL answer them from the index alone
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time',
+                 postgresql_include=['artist_id']),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time',
+                 postgresql_include=['venue_id']),
+        # keyset order of the /shows listing
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        db.CheckConstraint('end_time > start_time', name='ck_Show_end_after_start'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     artist_id = db.Column(db.Integer, db.ForeignKey(
@@ -65,6 +160,31 @@ class Show(db.Model):
     venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False,
                            default=datetime.utcnow)
+    end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, nullable=False, index=True)
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
 
     def __repr__(self):
         return f"<Show id: {self.id} artist_id: {self.artist_id} venue_id: {self.venue_id} start_time: {self.start_time}"
+
+
+# On PostgreSQL a venue or an artist cannot have two shows at overlapping
+# times: exclusion constraints over the show's time range, each backed by a
+# GiST index (btree_gist provides the = on ids). The columns hold local
+# times without a zone, hence tsrange rather than tstzrange. The migrations
+# also partition the table by month; there each partition carries these
+# constraints instead (see partitions.py).
+for column in ('venue_id', 'artist_id'):
+    event.listen(Show.__table__, 'after_create', DDL(
+        f'ALTER TABLE "Show" ADD CONSTRAINT "Show_{column}_no_overlap" EXCLUDE USING gist '
+        f'({column} WITH =, tsrange(start_time, end_time) WITH &&)'
+    ).execute_if(dialect='postgresql'))
+event.listen(Show.__table__, 'before_create', DDL(
+    'CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+for table in (Venue.__table__, Artist.__table__):
+    event.listen(table, 'before_create', DDL(
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
@@ -0,0 +1,136 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app, request, url_for
+from fyyurapp import db
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# items: rows of the current page; next/prev: cursors for the URL, or None.
+KeysetPage = namedtuple('KeysetPage', ['items', 'next', 'prev', 'per_page'])
+
+
+def encode_cursor(values):
+    data = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def cursor_value(column, value):
+    # A cursor value as the column's Python type, or ValueError if it is
+    # not one (a nested object, a bool, a string for an integer key...),
+    # so a forged cursor starts over rather than failing in the database.
+    if value is None:
+        return None
+    if isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) or not isinstance(value, column.type.python_type):
+        raise ValueError(f'{column.key}: unexpected {type(value).__name__} in cursor')
+    return value
+
+
+def decode_cursor(cursor, columns):
+    # Returns the key values stored in a cursor, or None if it is invalid.
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def page_size(per_page=None):
+    per_page = per_page or current_app.config['PAGE_SIZE']
+    return max(1, min(per_page, current_app.config['MAX_PAGE_SIZE']))
+
+
+def seek(query, columns, after=None, before=None, per_page=None):
+    # The rows keyset_page() fetches: the page and one more row telling
+    # whether there is another, seeking forward from `after` or backward
+    # from `before` (in reverse order then). Invalid cursors start over.
+    per_page = page_size(per_page)
+    key = db.tuple_(*columns)
+
+    before_values = decode_cursor(before, columns) if before else None
+    after_values = decode_cursor(after, columns) if after else None
+
+    if before_values is not None:
+        query = query.filter(key < db.tuple_(*before_values)).order_by(
+            *[db.desc(column) for column in columns])
+    else:
+        if after_values is not None:
+            query = query.filter(key > db.tuple_(*after_values))
+        query = query.order_by(*columns)
+    return query.limit(per_page + 1)
+
+
+def keyset_page(query, columns, after=None, before=None, per_page=None):
+    # Seeks `query` on the unique ordering `columns` instead of using OFFSET,
+    # so every page costs the same however deep it is. Rows must expose
+    # each column under its key (e.g. `row.start_time`, `row.id`).
+    per_page = page_size(per_page)
+    rows = seek(query, columns, after, before, per_page).all()
+
+    if before and decode_cursor(before, columns) is not None:
+        has_prev, has_next = len(rows) > per_page, True
+        rows = rows[:per_page][::-1]
+    else:
+        has_prev = bool(after) and decode_cursor(after, columns) is not None
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+
+    def cursor(row):
+        return encode_cursor([getattr(row, column.key) for column in columns])
+
+    return KeysetPage(
+        items=rows,
+        next=cursor(rows[-1]) if rows and has_next else None,
+        prev=cursor(rows[0]) if rows and has_prev else None,
+        per_page=per_page
+    )
+
+
+def iter_keyset(query, columns, chunk_size=1000):
+    # Yields every row of `query` in keyset order, fetching `chunk_size`
+    # rows per statement, for streaming whole collections.
+    last = None
+    while True:
+        chunk = query
+        if last is not None:
+            chunk = chunk.filter(db.tuple_(*columns) > db.tuple_(*last))
+        rows = chunk.order_by(*columns).limit(chunk_size).all()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = [getattr(rows[-1], column.key) for column in columns]
+
+
+def page_arguments():
+    # The ?after=, ?before= and ?per_page= arguments of the request.
+    return {
+        'after': request.args.get('after'),
+        'before': request.args.get('before'),
+        'per_page': request.args.get('per_page', type=int),
+    }
+
+
+def paginate_request(query, columns):
+    # keyset_page() driven by the request's page arguments.
+    return keyset_page(query, columns, **page_arguments())
+
+
+def page_url(**cursor):
+    # URL of the current listing with the given cursor, keeping other
+    # arguments such as ?genre= and ?per_page=.
+    args = {key: value for key, value in request.args.items()
+            if key not in ('after', 'before')}
+    args.update(cursor)
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
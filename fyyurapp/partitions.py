@@ -0,0 +1,185 @@
+from datetime import datetime
+import click
+from flask import current_app
+from fyyurapp import db
+from fyyurapp.counters import roll_show_counts
+from fyyurapp.cache import cache
+from fyyurapp.cli import fyyur_cli
+
+#----------------------------------------------------------------------------#
+# Show partitions.
+#----------------------------------------------------------------------------#
+
+# On PostgreSQL "Show" is range partitioned by month of start_time (see
+# migration e5a9c2d4b8f1): "Show_p2026_01" holds January 2026 and rows of
+# months without a partition land in "Show_default". Archived months are
+# detached and kept as "Show_archived_2026_01". Elsewhere (SQLite, or a
+# schema made by db.create_all()) the table is not partitioned and archived
+# shows are moved to "Show_archive" instead.
+PARTITION_PREFIX = 'Show_p'
+ARCHIVED_PREFIX = 'Show_archived_'
+DEFAULT_PARTITION = 'Show_default'
+ARCHIVE_TABLE = 'Show_archive'
+
+# Partitioned tables cannot carry the exclusion constraints of the plain
+# table (they do not compare the partition key with =), so each partition
+# gets its own. Shows crossing a month boundary are checked by the app.
+OVERLAP_COLUMNS = ['venue_id', 'artist_id']
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month, prefix=PARTITION_PREFIX):
+    return f'{prefix}{month:%Y_%m}'
+
+
+def execute(sql, **params):
+    statement = db.text(sql).bindparams(*[
+        db.bindparam(name, type_=db.DateTime)
+        for name, value in params.items() if isinstance(value, datetime)])
+    return db.session.execute(statement, params)
+
+
+def is_partitioned():
+    if db.get_engine().dialect.name != 'postgresql':
+        return False
+    return execute("""SELECT 1 FROM pg_partitioned_table
+                      WHERE partrelid = '"Show"'::regclass""").first() is not None
+
+
+def partition_months():
+    # First days of the months that have a partition, in order.
+    names = execute(f"""SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                        WHERE i.inhparent = '"Show"'::regclass
+                        AND c.relname LIKE '{PARTITION_PREFIX}%'""").scalars()
+    return sorted(datetime.strptime(name[len(PARTITION_PREFIX):], '%Y_%m') for name in names)
+
+
+def add_overlap_constraints(table):
+    for column in OVERLAP_COLUMNS:
+        execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_no_overlap" '
+                f'EXCLUDE USING gist ({column} WITH =, tsrange(start_time, end_time) WITH &&)')
+
+
+def create_partition(month):
+    # The month's rows are moved out of the default partition first;
+    # attaching fails while it holds any.
+    name, upper = partition_name(month), add_months(month, 1)
+    execute(f'CREATE TABLE "{name}" (LIKE "Show" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    execute(f'''WITH moved AS (
+                    DELETE FROM "{DEFAULT_PARTITION}"
+                    WHERE start_time >= :lower AND start_time < :upper RETURNING *
+                ) INSERT INTO "{name}" SELECT * FROM moved''', lower=month, upper=upper)
+    add_overlap_constraints(name)
+    execute(f'''ALTER TABLE "Show" ATTACH PARTITION "{name}"
+                FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')''')
+    return name
+
+
+def ensure_partitions(first, last):
+    # Creates the missing partitions of the months from `first` to `last`
+    # and of any month with rows in the default partition, committing
+    # each. Returns their names.
+    months = set()
+    month = month_start(first)
+    while month <= last:
+        months.add(month)
+        month = add_months(month, 1)
+    months.update(execute(f'''SELECT DISTINCT date_trunc('month', start_time)
+                              FROM "{DEFAULT_PARTITION}"''').scalars())
+    created = []
+    for month in sorted(months - set(partition_months())):
+        created.append(create_partition(month))
+        db.session.commit()
+    return created
+
+
+def drop_archived_foreign_keys():
+    # Detached partitions keep the foreign keys of "Show", which would stop
+    # venues and artists with archived shows from being deleted. Also
+    # covers tables archived before the keys were dropped here.
+    keys = execute(f"""SELECT c.relname, k.conname FROM pg_constraint k
+                       JOIN pg_class c ON c.oid = k.conrelid
+                       WHERE k.contype = 'f' AND c.relname LIKE '{ARCHIVED_PREFIX}%'""").all()
+    for table, key in keys:
+        execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{key}"')
+    db.session.commit()
+
+
+def archive_partitions(before):
+    # Detaches the partitions of the months that end by `before`; their
+    # shows leave every query but stay in "Show_archived_YYYY_MM", which
+    # no longer references "Venue" or "Artist".
+    archived = []
+    for month in partition_months():
+        if add_months(month, 1) > before:
+            break
+        name = partition_name(month, ARCHIVED_PREFIX)
+        execute(f'ALTER TABLE "Show" DETACH PARTITION "{partition_name(month)}"')
+        execute(f'ALTER TABLE "{partition_name(month)}" RENAME TO "{name}"')
+        db.session.commit()
+        archived.append(name)
+    drop_archived_foreign_keys()
+    return archived
+
+
+def archive_rows(before):
+    # Fallback for a table that is not partitioned: moves the shows that
+    # start before `before` to "Show_archive". Returns how many moved.
+    execute(f'CREATE TABLE IF NOT EXISTS "{ARCHIVE_TABLE}" AS SELECT * FROM "Show" WHERE 1 = 0')
+    moved = execute(f'INSERT INTO "{ARCHIVE_TABLE}" SELECT * FROM "Show" WHERE start_time < :before',
+                    before=before).rowcount
+    execute('DELETE FROM "Show" WHERE start_time < :before', before=before)
+    db.session.commit()
+    return moved
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+@fyyur_cli.command('partitions')
+@click.option('--ahead', type=int, default=None,
+              help='Months to keep partitioned ahead of this one [default: SHOW_PARTITIONS_AHEAD].')
+@click.option('--retention', type=int, default=None,
+              help='Archive shows of months more than this many months back; '
+                   '0 keeps them all [default: SHOW_RETENTION_MONTHS].')
+def partitions_command(ahead, retention):
+    """Create upcoming Show partitions and archive old months.
+
+    Meant to run daily (e.g. from cron). Partitions are only made on
+    PostgreSQL; archiving also works on an unpartitioned table.
+    """
+    config = current_app.config
+    ahead = config['SHOW_PARTITIONS_AHEAD'] if ahead is None else ahead
+    retention = config['SHOW_RETENTION_MONTHS'] if retention is None else retention
+    this_month = month_start(datetime.now())
+    before = add_months(this_month, -retention)
+
+    archived = 0
+    if is_partitioned():
+        for name in ensure_partitions(this_month, add_months(this_month, ahead)):
+            click.echo(f'Created {name}.')
+        if retention:
+            for name in archive_partitions(before):
+                click.echo(f'Archived {name}.')
+                archived += 1
+    else:
+        click.echo('Show is not partitioned; no partitions to create.', err=True)
+        if retention:
+            archived = archive_rows(before)
+            click.echo(f'Archived {archived} shows before {before:%Y-%m-%d} to {ARCHIVE_TABLE}.')
+
+    if archived:
+        # archived shows no longer count as past shows
+        roll_show_counts()
+        db.session.commit()
+        cache.clear()
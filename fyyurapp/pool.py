@@ -0,0 +1,137 @@
+import threading
+import time
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc, event
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Connection pool.
+#----------------------------------------------------------------------------#
+
+
+class PoolStats:
+    # Checkout counters for one process, shared by every pool it creates.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.invalidated = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_invalidated(self):
+        with self.lock:
+            self.invalidated += 1
+
+    def snapshot(self, pool=None):
+        with self.lock:
+            data = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'invalidated': self.invalidated,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3)
+                if self.checkouts else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), checked_in=pool.checkedin(),
+                        checked_out=pool.checkedout(), overflow=max(pool.overflow(), 0))
+        return data
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a connection.
+    # Waits of `slow_wait` seconds or more are logged to `wait_logger`, at
+    # most once every `log_interval` seconds so a saturated pool does not
+    # flood the log. Both are pool arguments, so each engine has its own.
+
+    def __init__(self, creator, slow_wait=None, wait_logger=None, log_interval=10.0, **kw):
+        super().__init__(creator, **kw)
+        self.slow_wait = slow_wait
+        self.wait_logger = wait_logger
+        self.log_interval = log_interval
+        self.last_logged = 0.0
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.slow_wait = self.slow_wait
+        pool.wait_logger = self.wait_logger
+        pool.log_interval = self.log_interval
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            if self.wait_logger:
+                self.wait_logger.error('db pool exhausted: %s', pool_stats.snapshot(self))
+            raise
+        waited = time.perf_counter() - start
+        pool_stats.record_wait(waited)
+        if self.slow_wait is not None and waited >= self.slow_wait and self.wait_logger \
+                and time.monotonic() - self.last_logged >= self.log_interval:
+            self.last_logged = time.monotonic()
+            self.wait_logger.warning('db pool wait %.1fms: %s', waited * 1000,
+                                     pool_stats.snapshot(self))
+        return connection
+
+
+def engine_options(config, sa_url, logger=None):
+    # Engine options built from the DB_POOL_* settings. SQLite keeps the
+    # pools Flask-SQLAlchemy picks for it; statement_timeout is a
+    # PostgreSQL session setting. Slow checkouts are logged to `logger`.
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    if sa_url.get_backend_name() == 'sqlite':
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+        slow_wait=config['DB_POOL_SLOW_WAIT_MS'] / 1000,
+        wait_logger=logger,
+    )
+    if sa_url.get_backend_name() == 'postgresql' and config['DB_STATEMENT_TIMEOUT']:
+        options['connect_args'] = {
+            'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"}
+    return options
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    # Applies engine_options() under anything set explicitly in
+    # SQLALCHEMY_ENGINE_OPTIONS, and counts connections dropped by pre-ping
+    # or errors.
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        for key, value in engine_options(app.config, sa_url, app.logger).items():
+            options.setdefault(key, value)
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        event.listen(engine.pool, 'invalidate',
+                     lambda *args: pool_stats.record_invalidated())
+        return engine
@@ -0,0 +1,145 @@
+import json
+import logging
+import time
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from fyyurapp.metrics import registry
+
+#----------------------------------------------------------------------------#
+# SQL profiling.
+#----------------------------------------------------------------------------#
+
+# Longest statement text kept for the slowest query of a request.
+STATEMENT_PREVIEW = 300
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestProfile:
+    # What the database cost one request. `rows` sums cursor.rowcount where
+    # the driver reports it (PostgreSQL does for SELECTs, SQLite does not).
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, elapsed, rowcount):
+        self.queries += 1
+        self.db_time += elapsed
+        if rowcount and rowcount > 0:
+            self.rows += rowcount
+        if elapsed >= self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = ' '.join(statement.split())[:STATEMENT_PREVIEW]
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_profile():
+    return g.get('sql_profile') if has_app_context() else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def end_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    registry.observe('fyyur_db_query_seconds', elapsed)
+    profile = current_profile()
+    if profile is not None:
+        profile.record(statement, elapsed, cursor.rowcount)
+
+
+def query_budget(max_queries):
+    # Declares the most queries a view may run per request. Going over it
+    # raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (by default
+    # under TESTING, so the test fails) and logs a warning otherwise.
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def check_budget(profile):
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is None or profile.queries <= budget:
+        return
+    message = (f'{request.endpoint} ran {profile.queries} queries, '
+               f'over its budget of {budget}; slowest: {profile.slowest_statement}')
+    strict = current_app.config['QUERY_BUDGET_STRICT']
+    if strict is None:
+        strict = current_app.testing
+    if strict:
+        raise QueryBudgetExceeded(message)
+    current_app.logger.warning(message)
+
+
+def start_profile():
+    g.sql_profile = RequestProfile()
+
+
+def finish_profile(response):
+    # Queries run while a streamed body is generated are not included.
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+    check_budget(profile)
+
+    total = profile.elapsed()
+    response.headers.add('Server-Timing', f'db;dur={profile.db_time * 1000:.2f};'
+                                          f'desc="{profile.queries} queries", '
+                                          f'app;dur={total * 1000:.2f}')
+    if current_app.config['REQUEST_LOG']:
+        current_app.logger.info('%s %s %s %.1fms %d queries', request.method, request.path,
+                        response.status_code, total * 1000, profile.queries, extra={'fields': {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 3),
+            'queries': profile.queries,
+            'db_ms': round(profile.db_time * 1000, 3),
+            'rows': profile.rows,
+            'slowest_ms': round(profile.slowest_time * 1000, 3),
+            'slowest_sql': profile.slowest_statement,
+        }})
+    return response
+
+
+def init_app(app):
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+
+
+#----------------------------------------------------------------------------#
+# Structured logging.
+#----------------------------------------------------------------------------#
+
+
+class JSONFormatter(logging.Formatter):
+    # One JSON object per line; `extra={'fields': {...}}` adds its keys.
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        data.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
@@ -0,0 +1,224 @@
+from datetime import datetime
+from itertools import groupby
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show, Genre
+
+#----------------------------------------------------------------------------#
+# Loading profiles.
+#----------------------------------------------------------------------------#
+
+SHOW_LOADERS = {
+    'noload': db.noload,
+    'selectin': db.selectinload,
+    'joined': db.joinedload,
+}
+
+
+def with_shows(model, strategy='noload'):
+    # Loader option deciding how `model.shows` is fetched for a query.
+    # Views that never touch shows keep the default and skip them entirely.
+    if strategy not in SHOW_LOADERS:
+        raise ValueError(f"Unknown show loading strategy: {strategy}")
+    return SHOW_LOADERS[strategy](model.shows)
+
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+
+def genres_by_name(names):
+    # Returns Genre rows for the given names, creating the missing ones.
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    if not names:
+        return []
+    genres = {genre.name: genre for genre in Genre.query.filter(
+        Genre.name.in_(names)).all()}
+    for name in names:
+        if name not in genres:
+            genres[name] = Genre(name=name)
+            db.session.add(genres[name])
+    return [genres[name] for name in names]
+
+
+def has_genre(model, genre):
+    # EXISTS filter over the genre association table, served by its
+    # (genre_id, entity_id) index instead of a LIKE scan.
+    return model.genres.any(Genre.name == genre)
+
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+
+# Unique orderings used for keyset pagination of the listing pages.
+VENUE_LISTING_ORDER = (Venue.city, Venue.state, Venue.name, Venue.id)
+ARTIST_LISTING_ORDER = (Artist.name, Artist.id)
+SHOW_LISTING_ORDER = (Show.start_time, Show.id)
+
+
+def venue_areas_query(genre=None):
+    # Venues with their number of upcoming shows, read from the maintained
+    # counter so the listing never touches the Show table.
+    query = db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.upcoming_shows_count.label('num_upcoming_shows')
+    )
+    if genre:
+        query = query.filter(has_genre(Venue, genre))
+    return query
+
+
+def group_areas(rows):
+    # Groups venue rows ordered by (city, state) into the areas structure
+    # rendered by pages/venues.html.
+    areas = []
+    for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        areas.append({
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': venue.num_upcoming_shows
+            } for venue in venues]
+        })
+    return areas
+
+
+def artist_listing_query(genre=None):
+    query = db.session.query(Artist.id, Artist.name)
+    if genre:
+        query = query.filter(has_genre(Artist, genre))
+    return query
+
+
+def show_listing_query():
+    # Shows with their venue and artist as column tuples, so the listing
+    # never hydrates ORM objects or lazy-loads relationships per row.
+    return db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.end_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+
+
+#----------------------------------------------------------------------------#
+# Detail pages.
+#----------------------------------------------------------------------------#
+
+
+# Entity columns copied into the detail page data.
+DETAIL_FIELDS = {
+    Venue: ('id', 'name', 'address', 'city', 'state', 'phone', 'website_link',
+            'facebook_link', 'seeking_talent', 'seeking_description', 'image_link'),
+    Artist: ('id', 'name', 'city', 'state', 'phone', 'website_link',
+             'facebook_link', 'seeking_venue', 'seeking_description', 'image_link'),
+}
+
+
+def detail_shows(model, entity_id, upcoming, limit, now):
+    # The entity's upcoming shows, soonest first, or its past shows, most
+    # recent first, with their partner, at most `limit` of them (None for
+    # all). Ordered and limited in SQL, from the (entity, start_time)
+    # indexes.
+    if model is Venue:
+        column, partner, partner_column = Show.venue_id, Artist, Show.artist_id
+    else:
+        column, partner, partner_column = Show.artist_id, Venue, Show.venue_id
+    query = db.session.query(
+        Show.start_time.label('start_time'),
+        partner.id.label('partner_id'),
+        partner.name.label('partner_name'),
+        partner.image_link.label('partner_image_link')
+    ).join(partner, partner.id == partner_column).filter(column == entity_id)
+    if upcoming:
+        query = query.filter(Show.start_time > now).order_by(Show.start_time, Show.id)
+    else:
+        query = query.filter(Show.start_time <= now).order_by(
+            db.desc(Show.start_time), db.desc(Show.id))
+    if limit is not None:
+        query = query.limit(limit)
+    return query.subquery()
+
+
+def entity_detail(model, entity_id, limit=None, now=None):
+    # Assembles the data rendered by pages/show_venue.html or
+    # pages/show_artist.html, or None if the entity does not exist.
+    # The entity comes back with at most `limit` upcoming and `limit` past
+    # shows (None shows them all) from one statement: the entity row
+    # outer-joined to the two limited show lists, split against a single
+    # `now`. The totals are the maintained counters.
+    if now is None:
+        now = datetime.now()
+    prefix = 'artist' if model is Venue else 'venue'
+    lists = [db.select(*detail_shows(model, entity_id, upcoming, limit, now).c,
+                       db.literal(upcoming).label('upcoming'))
+             for upcoming in (True, False)]
+    shows = db.union_all(*lists).subquery()
+
+    rows = db.session.query(
+        model, shows.c.upcoming, shows.c.start_time, shows.c.partner_id,
+        shows.c.partner_name, shows.c.partner_image_link
+    ).options(with_shows(model)).outerjoin(
+        shows, db.true()
+    ).filter(model.id == entity_id).order_by(
+        db.desc(shows.c.upcoming), shows.c.start_time).all()
+
+    if not rows:
+        return None
+    entity = rows[0][0]
+
+    past_shows = []
+    upcoming_shows = []
+    for _, upcoming, start_time, partner_id, partner_name, partner_image_link in rows:
+        if start_time is None:
+            continue
+        (upcoming_shows if upcoming else past_shows).append({
+            f'{prefix}_id': partner_id,
+            f'{prefix}_name': partner_name,
+            f'{prefix}_image_link': partner_image_link,
+            'start_time': start_time,
+        })
+    # most recent past shows first
+    past_shows.reverse()
+
+    data = {field: getattr(entity, field) for field in DETAIL_FIELDS[model]}
+    data.update({
+        "genres": entity.genre_names,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": entity.past_shows_count,
+        "upcoming_shows_count": entity.upcoming_shows_count,
+        "more_shows": limit is not None and max(
+            entity.past_shows_count, entity.upcoming_shows_count) > limit,
+    })
+    return data
+
+
+def venue_detail(venue_id, limit=None):
+    return entity_detail(Venue, venue_id, limit)
+
+
+def artist_detail(artist_id, limit=None):
+    return entity_detail(Artist, artist_id, limit)
+
+
+def show_partner_ids(model, entity_id):
+    # Ids of the artists playing at a venue, or of the venues an artist
+    # plays at; their detail pages embed the entity's name and image.
+    if model is Venue:
+        column, partner = Show.venue_id, Show.artist_id
+    else:
+        column, partner = Show.artist_id, Show.venue_id
+    return [row[0] for row in db.session.query(partner).filter(
+        column == entity_id).distinct().all()]
@@ -0,0 +1,204 @@
+import itertools
+import threading
+import time
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import event, exc, orm, text
+from sqlalchemy.engine import make_url
+from fyyurapp.pool import PooledSQLAlchemy
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Session key holding the time until which a client that has just written
+# keeps reading from the primary.
+PRIMARY_UNTIL = '_primary_until'
+
+
+def read_only(view):
+    # Marks a view that only reads, so it may use a replica even when it is
+    # not a GET (the POST search forms).
+    view.read_only = True
+    return view
+
+
+class Replica:
+
+    def __init__(self, url, engine):
+        self.url = url
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = 0.0
+        self.checking = False
+        self.lag = None
+
+    def status(self):
+        return {'url': make_url(self.url).render_as_string(hide_password=True),
+                'healthy': self.healthy, 'lag': self.lag}
+
+
+class ReplicaSet:
+    # Round-robin over the replicas that passed their last health check.
+    # A replica is pinged again once DB_REPLICA_CHECK_INTERVAL has passed
+    # since its last check, and is taken out as soon as one of its
+    # connections fails or it lags more than DB_REPLICA_MAX_LAG seconds.
+    # Checks run on a thread of their own; requests never wait for them
+    # and go by the result of the last one.
+
+    def __init__(self, db, app):
+        self.app = app
+        self.interval = app.config['DB_REPLICA_CHECK_INTERVAL']
+        self.max_lag = app.config['DB_REPLICA_MAX_LAG']
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.replicas = []
+        for url in app.config['DB_REPLICA_URLS']:
+            sa_url, options = db.apply_driver_hacks(app, make_url(url), {})
+            replica = Replica(url, db.create_engine(sa_url, options))
+            event.listen(replica.engine, 'handle_error', self.disconnect_handler(replica))
+            self.replicas.append(replica)
+
+    def disconnect_handler(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                self.mark(replica, False)
+        return handle_error
+
+    def mark(self, replica, healthy, lag=None):
+        if replica.healthy and not healthy:
+            self.app.logger.warning('replica %s taken out of rotation', replica.status()['url'])
+        replica.healthy = healthy
+        replica.lag = lag
+        replica.checked_at = time.monotonic()
+
+    def check(self, replica):
+        lag = None
+        try:
+            with replica.engine.connect() as connection:
+                if replica.engine.dialect.name == 'postgresql':
+                    lag = connection.execute(text(
+                        'SELECT extract(epoch FROM now() - pg_last_xact_replay_timestamp())'
+                    )).scalar()
+                    lag = float(lag) if lag is not None else 0.0
+                else:
+                    connection.execute(text('SELECT 1'))
+        except exc.DBAPIError:
+            self.mark(replica, False)
+            return
+        self.mark(replica, self.max_lag is None or lag is None or lag <= self.max_lag, lag)
+
+    def is_healthy(self, replica):
+        if time.monotonic() - replica.checked_at >= self.interval:
+            self.check_in_background(replica)
+        return replica.healthy
+
+    def check_in_background(self, replica):
+        # Starts a check unless one of this replica is already running.
+        with self.lock:
+            if replica.checking:
+                return
+            replica.checking = True
+
+        def run():
+            try:
+                self.check(replica)
+            finally:
+                replica.checking = False
+        threading.Thread(target=run, name='fyyur-replica-check', daemon=True).start()
+
+    def pick(self):
+        # Returns the next healthy replica engine, or None when all are down.
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self.counter) % len(self.replicas)]
+            if self.is_healthy(replica):
+                return replica.engine
+        return None
+
+    def status(self):
+        return [replica.status() for replica in self.replicas]
+
+
+def get_replicas(db, app):
+    if 'replicas' not in app.extensions:
+        app.extensions['replicas'] = ReplicaSet(db, app)
+    return app.extensions['replicas']
+
+
+def dispose_engines(db, app):
+    # Drops inherited connections after a fork without closing the
+    # parent's sockets.
+    db.get_engine(app).dispose(close=False)
+    if 'replicas' in app.extensions:
+        for replica in app.extensions['replicas'].replicas:
+            replica.engine.dispose(close=False)
+
+
+def use_primary():
+    # Sends the rest of the current request to the primary.
+    g.use_primary = True
+
+
+class RoutingSession(SignallingSession):
+    # Sends reads of read-only requests to a replica. Everything else goes
+    # to the primary: writes, anything after this session flushed, work
+    # outside a request (CLI, migrations) and requests from a client that
+    # wrote within the last DB_READ_YOUR_WRITES_SECONDS.
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.reads_from_replica():
+            # one replica for the whole request, picked on its first read
+            if 'replica' not in g:
+                g.replica = get_replicas(self.db, self.app).pick()
+            if g.replica is not None:
+                return g.replica
+        return super().get_bind(mapper, clause)
+
+    def reads_from_replica(self):
+        if not self.app.config['DB_REPLICA_URLS'] or not has_request_context():
+            return False
+        if self._flushing or self.info.get('wrote') or g.get('use_primary'):
+            return False
+        view = self.app.view_functions.get(request.endpoint)
+        if request.method not in SAFE_METHODS and not getattr(view, 'read_only', False):
+            return False
+        return session.get(PRIMARY_UNTIL, 0) < time.time()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def remember_write(db_session, flush_context):
+    db_session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def stick_to_primary(db_session):
+    # After a write, the client reads its own changes from the primary
+    # until the replicas have had time to catch up.
+    if db_session.info.pop('wrote', False) and has_request_context() \
+            and db_session.app.config['DB_REPLICA_URLS']:
+        session[PRIMARY_UNTIL] = time.time() + db_session.app.config['DB_READ_YOUR_WRITES_SECONDS']
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def forget_write(db_session):
+    db_session.info.pop('wrote', None)
+
+
+class RoutingSQLAlchemy(PooledSQLAlchemy):
+
+    def init_app(self, app):
+        super().init_app(app)
+
+        @app.teardown_request
+        def forget_replica(error=None):
+            # g outlives the request when an app context was already pushed
+            g.pop('replica', None)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
@@ -1,538 +1,39 @@
-from flask import abort, render_template, request, Response, flash, redirect, url_for
-from fyyurapp.models import Venue, Artist, Show
-from fyyurapp.forms import *
-from fyyurapp import app, db
-import logging
-from logging import Formatter, FileHandler
-import sys
+from flask import Blueprint, render_template
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist
+from fyyurapp.queries import with_shows
+from fyyurapp.conditional import conditional, newest_sources
+from fyyurapp.profiling import query_budget
+from fyyurapp.metrics import registry
 
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
+# Home page and error pages; venues, artists and shows have their own
+# blueprints.
+main = Blueprint('main', __name__)
 
-@app.route('/')
+
+@main.route('/')
+@query_budget(3)
+@conditional(lambda: newest_sources(Venue, Artist))
 def index():
-    venues = Venue.query.order_by(db.desc(Venue.created_at)).limit(10).all()
-    artists = Artist.query.order_by(db.desc(Artist.created_at)).limit(10).all()
+    venues = Venue.query.options(with_shows(Venue)).order_by(
+        db.desc(Venue.created_at)).limit(10).all()
+    artists = Artist.query.options(with_shows(Artist)).order_by(
+        db.desc(Artist.created_at)).limit(10).all()
     return render_template('pages/home.html', venues=venues, artists=artists)
 
 
-#  Venues
-#  ----------------------------------------------------------------
-
-@app.route('/venues')
-def venues():
-    # TODO: replace with real venues data.
-    # num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-
-    vunues = db.session.query(Venue.city, Venue.state).distinct(
-        Venue.city, Venue.state)
-    data = []
-    for venue in vunues:
-        result = Venue.query.filter(Venue.state == venue.state).filter(
-            Venue.city == venue.city).all()
-        venue_data = []
-
-        # Creating venues' response
-        for venue in result:
-            venue_data.append({
-                'id': venue.id,
-                'name': venue.name,
-                'num_upcoming_shows': len(db.session.query(Show).filter(Show.start_time > datetime.now()).all())
-            })
-
-            data.append({
-                'city': venue.city,
-                'state': venue.state,
-                'venues': venue_data
-            })
-    return render_template('pages/venues.html', areas=data)
-
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-    # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
-    # seach for Hop should return "The Musical Hop".
-    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-    search_term = request.form.get("search_term", "")
-
-    response = {}
-
-    name_search = Venue.name.ilike(f"%{search_term}%")
-    state_search = Venue.state.ilike(f"%{search_term}%")
-    city_search = Venue.city.ilike(f"%{search_term}%")
-
-    venues = list(Venue.query.filter(
-        name_search | state_search | city_search).all())
-
-    response['count'] = len(venues)
-    response["data"] = []
-
-    for venue in venues:
-
-        specific_venue = {
-            "id": venue.id,
-            "name": venue.name,
-            "num_upcoming_shows": len(db.session.query(Show).filter(Show.venue_id == venue.id).filter(Show.start_time > datetime.now()).all())
-        }
-        response["data"].append(specific_venue)
-
-        return render_template('pages/search_venues.html', results=response, search_term=search_term)
-
-
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-    # shows the venue page with the given venue_id
-    # TODO: replace with real venue data from the venues table, using venue_id
-
-    venue = Venue.query.filter(Venue.id == venue_id).first()
-
-    past_shows_data = db.session.query(Show).filter(Show.venue_id == venue_id).filter(
-        Show.start_time < datetime.now()).join(Artist, Show.artist_id == Artist.id).add_columns(Artist.id, Artist.name,
-                                                                                                Artist.image_link,
-                                                                                                Show.start_time).all()
-
-    upcoming_shows_data = db.session.query(Show).filter(Show.venue_id == venue_id).filter(
-        Show.start_time > datetime.now()).join(Artist, Show.artist_id == Artist.id).add_columns(Artist.id, Artist.name,
-                                                                                                Artist.image_link,
-                                                                                                Show.start_time).all()
-
-    upcoming_shows = []
-
-    past_shows = []
-
-    for upcoming_show in upcoming_shows_data:
-        upcoming_shows.append({
-            'artist_id': upcoming_show[1],
-            'artist_name': upcoming_show[2],
-            'image_link': upcoming_show[3],
-            'start_time': str(upcoming_show[4])
-        })
-
-    for past_show in past_shows_data:
-        past_shows.append({
-            'artist_id': past_show[1],
-            'artist_name': past_show[2],
-            'image_link': past_show[3],
-            'start_time': str(past_show[4])
-        })
-
-    if venue is None:
-        abort(404)
-
-    venue_data = {
-        "id": venue.id,
-        "name": venue.name,
-        "genres": [venue.genres],
-        "address": venue.address,
-        "city": venue.city,
-        "state": venue.state,
-        "phone": venue.phone,
-        "website_link": venue.website_link,
-        "facebook_link": venue.facebook_link,
-        "seeking_talent": venue.seeking_talent,
-        "seeking_description": venue.seeking_description,
-        "image_link": venue.image_link,
-        "past_shows": past_shows,
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows_data),
-        "upcoming_shows_count": len(upcoming_shows_data),
-    }
-    return render_template('pages/show_venue.html', venue=venue_data)
-
-#  Create Venue
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-    form = VenueForm()
-    return render_template('forms/new_venue.html', form=form)
-
-
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-    # TODO: insert form data as a new Venue record in the db, instead
-    # TODO: modify data to be the data object returned from db insertion
-
-    # on successful db insert, flash success
-    # flash('Venue ' + request.form['name'] + ' was successfully listed!')
-    # TODO: on unsuccessful db insert, flash an error instead.
-    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    try:
-        newVenue = Venue(
-            name=request.form['name'],
-            city=request.form['city'],
-            state=request.form['state'],
-            address=request.form['address'],
-            phone=request.form['phone'],
-            # convert array to string separated by commas
-            genres=",".join(request.form['genres']),
-            facebook_link=request.form['facebook_link'],
-            image_link=request.form['image_link'],
-            seeking_talent=True if 'seeking_talent' in request.form else False,
-            seeking_description=request.form['seeking_description'],
-            website_link=request.form['website_link']
-        )
-
-        db.session.add(newVenue)
-        db.session.commit()
-        flash('Venue ' + request.form['name'] +
-              ' was successfully listed!')
-
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-
-        flash('An error occurred. Venue ' +
-              request.form['name'] + ' could not be listed.')
-
-    finally:
-        db.session.close()
-
-    return render_template('pages/home.html')
-
-
-@app.route('/venues/<venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-    # TODO: Complete this endpoint for taking a venue_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-    # return None
-
-    try:
-        venue = Venue.query.get(venue_id)
-        db.session.delete(venue)
-        db.session.commit()
-        flash("Venue " + venue.name + " was deleted successfully!")
-    except:
-        db.session.rollback()
-
-        flash("Venue was not deleted successfully.")
-    finally:
-        db.session.close()
-
-    return redirect(url_for("index"))
-
-#  Artists
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists')
-def artists():
-    # TODO: replace with real data returned from querying the database
-    # solutions
-    artists = db.session.query(Artist.id, Artist.name).all()
-    return render_template('pages/artists.html', artists=artists)
-
-
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-    # search for "band" should return "The Wild Sax Band".
-    search_term = request.form.get('search_term', '')
-
-    name_search = Artist.name.ilike(f"%{search_term}%")
-    city_search = Artist.city.ilike(f"%{search_term}%")
-    state_search = Artist.state.ilike(f"%{search_term}%")
-
-    artists = Artist.query.filter(
-        name_search | city_search | state_search).all()
-    response = {
-        "count": len(artists),
-        "data": []
-    }
-
-    for artist in artists:
-        artist_info = {}
-        artist_info["name"] = artist.name
-        artist_info["id"] = artist.id
-
-        artist_info["upcoming_shows"] = len(db.session.query(Show).filter(
-            Show.artist_id == artist.id).filter(Show.start_time > datetime.now()).all())
-
-        response["data"].append(artist_info)
-
-    return render_template('pages/search_artists.html', results=response, search_term=search_term)
-
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    # shows the artist page with the given artist_id
-    # TODO: replace with real artist data from the artist table, using artist_id
-    # shows the venue page with the given venue_id
-    # TODO: replace with real venue data from the venues table, using venue_id
-    artist = db.session.query(Artist).get(artist_id)
-
-    if not artist:
-        abort(404)
-
-    past_shows_data = db.session.query(Show).join(Venue).filter(
-        Show.artist_id == artist_id).filter(Show.start_time > datetime.now()).all()
-    past_shows = []
-
-    for show in past_shows_data:
-        past_shows.append({
-            "venue_id": show.venue_id,
-            "venue_name": show.venue.name,
-            "artist_image_link": show.venue.image_link,
-            "start_time": show.start_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
-    upcoming_shows_data = db.session.query(Show).join(Venue).filter(
-        Show.artist_id == artist_id).filter(Show.start_time > datetime.now()).all()
-    upcoming_shows = []
-
-    for show in upcoming_shows_data:
-        upcoming_shows.append({
-            "venue_id": show.venue_id,
-            "venue_name": show.venue.name,
-            "artist_image_link": show.venue.image_link,
-            "start_time": show.start_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
-    artist_data = {
-        "id": artist.id,
-        "name": artist.name,
-        "genres": artist.genres,
-        "city": artist.city,
-        "state": artist.state,
-        "phone": artist.phone,
-        "website_link": artist.website_link,
-        "facebook_link": artist.facebook_link,
-        "seeking_venue": artist.seeking_venue,
-        "seeking_description": artist.seeking_description,
-        "image_link": artist.image_link,
-        "past_shows": past_shows,
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
-    }
-
-    return render_template('pages/show_artist.html', artist=artist_data)
-
-#  Update
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-    form = ArtistForm()
-    # TODO: populate form with fields from artist with ID <artist_id>
-
-    artist = Artist.query.get(artist_id)
-    # convert genre string back to array
-    request.form['genres'] = artist.genres.split(",")
-
-    return render_template('forms/edit_artist.html', form=form, artist=artist)
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
-    # TODO: take values from the form submitted, and update existing
-    # artist record with ID <artist_id> using the new attributes
-    try:
-        artist = Artist.query.get(artist_id)
-
-        artist.name = request.form['name']
-        artist.city = request.form['city']
-        artist.state = request.form['state']
-        artist.phone = request.form['phone']
-        # convert array to string separated by commas
-        artist.genres = ",".join(request.form['genres'])
-        artist.facebook_link = request.form['facebook_link']
-        artist.image_link = request.form['image_link']
-        artist.seeking_venue = request.form['seeking_venue']
-        artist.seeking_description = request.form['seeking_description']
-        artist.website_link = request.form['website_link']
-
-        db.session.add(artist)
-        db.session.commit()
-        flash("Artist " + artist.name + " was successfully edited!")
-    except:
-        db.session.rollback()
-        flash("Artist was not edited successfully.")
-    finally:
-        db.session.close()
-    return redirect(url_for('show_artist', artist_id=artist_id))
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-    form = VenueForm()
-    venue = Venue.query.get(venue_id)
-    # converting genre string back to array
-    form.genres.data = venue.genres.split(",")
-
-    return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-    # TODO: take values from the form submitted, and update existing
-    # venue record with ID <venue_id> using the new attributes
-    form = VenueForm(request.form)
-
-    try:
-        venue = Venue.query.get(venue_id)
-
-        venue.name = request.form['name']
-        venue.city = request.form['city']
-        venue.state = request.form['state']
-        venue.address = request.form['address']
-        venue.phone = request.form['phone']
-        # convert array to string separated by commas
-        venue.genres = ",".join(request.form['genres'])
-        venue.facebook_link = request.form['facebook_link']
-        venue.image_link = request.form['image_link']
-        venue.seeking_talent = request.form['seeking_talent']
-        venue.seeking_description = request.form['seeking_description']
-        venue.website_link = request.form['website_link']
-
-        db.session.add(venue)
-        db.session.commit()
-
-        flash("Venue " + form.name.data + " edited successfully")
-
-    except Exception:
-        db.session.rollback()
-        flash("Venue was not edited successfully.")
-    finally:
-        db.session.close()
-
-    return redirect(url_for('show_venue', venue_id=venue_id))
-
-
-#  Create Artist
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template('forms/new_artist.html', form=form)
-
-
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-    # called upon submitting the new artist listing form
-    # TODO: insert form data as a new Venue record in the db, instead
-    # TODO: modify data to be the data object returned from db insertion
-
-    # on successful db insert, flash success
-    # flash('Artist ' + request.form['name'] + ' was successfully listed!')
-    # TODO: on unsuccessful db insert, flash an error instead.
-    # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
-    try:
-        newArtist = Artist(
-            name=request.form['name'],
-            city=request.form['city'],
-            state=request.form['state'],
-            phone=request.form['phone'],
-            # convert array to string separated by commas
-            genres=",".join(request.form['genres']),
-            image_link=request.form['image_link'],
-            facebook_link=request.form['facebook_link'],
-            website_link=request.form['website_link'],
-            seeking_venue=True if 'seeking_venue' in request.form else False,
-            seeking_description=request.form['seeking_description'],
-        )
-        db.session.add(newArtist)
-        db.session.commit()
-        flash("Artist " + request.form["name"] +
-              " was successfully listed!")
-    except Exception as e:
-        db.session.rollback()
-        print(e)
-        flash('An error occurred. Artist ' +
-              request.form['name'] + ' could not be added')
-    finally:
-        db.session.close()
-    return render_template('pages/home.html')
-
-#  Shows
-#  ----------------------------------------------------------------
-
-
-@app.route('/shows')
-def shows():
-    # displays list of shows
-    # TODO: replace with real venues data.
-    data = []
-
-    shows = Show.query.all()
-    for show in shows:
-        show_info = {}
-        show_info["venue_id"] = show.venues.id
-        show_info["venue_name"] = show.venues.name
-        show_info["artist_id"] = show.artists.id
-        show_info["artist_name"] = show.artists.name
-        show_info["artist_image_link"] = show.artists.image_link
-        show_info["start_time"] = show.start_time.strftime(
-            "%m/%d/%Y, %H:%M:%S")
-
-        data.append(show_info)
-
-    return render_template('pages/shows.html', shows=data)
-
-
-@app.route('/shows/create')
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm()
-    return render_template('forms/new_show.html', form=form)
-
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-    # called to create new shows in the db, upon submitting new show listing form
-    # TODO: insert form data as a new Show record in the db, instead
-
-    # on successful db insert, flash success
-    # flash('Show was successfully listed!')
-    # TODO: on unsuccessful db insert, flash an error instead.
-    # e.g., flash('An error occurred. Show could not be listed.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    try:
-        new_show = Show(
-            artist_id=request.form['artist_id'],
-            venue_id=request.form['venue_id'],
-            start_time=request.form['start_time']
-        )
-        db.session.add(new_show)
-        db.session.commit()
-        flash('Show was successfully listed!')
-    except Exception:
-        db.session.rollback()
-        flash('An error occurred. Show could not be listed.')
-    finally:
-        db.session.close()
-    return redirect(url_for("index"))
-
-
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
+    registry.inc('fyyur_errors_total', ('404',))
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
+    registry.inc('fyyur_errors_total', ('500',))
     return render_template('errors/500.html'), 500
-
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
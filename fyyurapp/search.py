@@ -0,0 +1,131 @@
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from flask import current_app
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist
+from fyyurapp.queries import has_genre
+
+#----------------------------------------------------------------------------#
+# Search backends.
+#----------------------------------------------------------------------------#
+
+# Columns matched by the search box, most significant first.
+SEARCH_FIELDS = {
+    Venue: (Venue.name, Venue.city, Venue.state),
+    Artist: (Artist.name, Artist.city, Artist.state),
+}
+
+# Items are (id, upcoming_shows_count, *SEARCH_FIELDS, total) rows.
+SearchPage = namedtuple('SearchPage', ['count', 'items', 'page', 'per_page'])
+
+# pg_trgm indexes nothing for a term shorter than a trigram, and its
+# similarity to any name is close to zero, so the trigram backend hands
+# such terms to the simple ranking.
+MIN_TRIGRAM_TERM = 3
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class SearchBackend(ABC):
+    # Base backend: case-insensitive partial matching over SEARCH_FIELDS.
+
+    def matches(self, model, term):
+        pattern = f"%{term}%"
+        return db.or_(*[column.ilike(pattern) for column in SEARCH_FIELDS[model]])
+
+    def query(self, model, term, filters):
+        return db.session.query(model.id, model.upcoming_shows_count, *SEARCH_FIELDS[model]).filter(
+            self.matches(model, term), *filters)
+
+    def paginate(self, query, order_by, page, per_page):
+        # The page ordered and limited in SQL, with the number of matches
+        # from a window count in the same statement. Only a page past the
+        # end needs a separate count.
+        items = query.add_columns(db.func.count().over().label('total')).order_by(
+            *order_by).limit(per_page).offset((page - 1) * per_page).all()
+        if items:
+            count = items[0].total
+        else:
+            count = query.order_by(None).count() if page > 1 else 0
+        return SearchPage(count, items, page, per_page)
+
+    @abstractmethod
+    def search(self, model, term, filters=(), page=1, per_page=None):
+        # Returns the SearchPage of `model` rows matching `term` and
+        # `filters`, best matches first.
+        raise NotImplementedError
+
+
+class TrigramSearchBackend(SearchBackend):
+    # PostgreSQL backend. The ILIKE filter is served by the pg_trgm GIN
+    # indexes and results are ranked by trigram similarity. Terms shorter
+    # than MIN_TRIGRAM_TERM are ranked by SimpleSearchBackend instead.
+
+    def search(self, model, term, filters=(), page=1, per_page=None):
+        if len(term) < MIN_TRIGRAM_TERM:
+            return SimpleSearchBackend().search(model, term, filters, page, per_page)
+        per_page = per_page or current_app.config['SEARCH_PAGE_SIZE']
+        rank = db.func.greatest(
+            *[db.func.similarity(column, term) for column in SEARCH_FIELDS[model]])
+        return self.paginate(self.query(model, term, filters),
+                             (db.desc(rank), model.name, model.id), page, per_page)
+
+
+class SimpleSearchBackend(SearchBackend):
+    # Backend for SQLite and other databases without pg_trgm. Each field
+    # ranks an exact match over a prefix over a substring, the fields in
+    # SEARCH_FIELDS order; ranked, limited and counted in SQL.
+
+    def rank(self, column, term):
+        escaped = escape_like(term)
+        return db.case(
+            (db.func.lower(column) == term.lower(), 3),
+            (column.ilike(f'{escaped}%', escape='\\'), 2),
+            (column.ilike(f'%{escaped}%', escape='\\'), 1),
+            else_=0)
+
+    def search(self, model, term, filters=(), page=1, per_page=None):
+        per_page = per_page or current_app.config['SEARCH_PAGE_SIZE']
+        order_by = [db.desc(self.rank(column, term)) for column in SEARCH_FIELDS[model]]
+        return self.paginate(self.query(model, term, filters),
+                             (*order_by, model.name, model.id), page, per_page)
+
+
+SEARCH_BACKENDS = {
+    'trigram': TrigramSearchBackend,
+    'simple': SimpleSearchBackend,
+}
+
+
+def get_search_backend():
+    # SEARCH_BACKEND is 'auto', 'trigram' or 'simple'; 'auto' uses pg_trgm
+    # when running against PostgreSQL.
+    name = current_app.config['SEARCH_BACKEND']
+    if name == 'auto':
+        dialect = db.get_engine().dialect.name
+        name = 'trigram' if dialect == 'postgresql' else 'simple'
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend: {name}")
+    return SEARCH_BACKENDS[name]()
+
+
+def search(model, term, filters=(), page=1, per_page=None):
+    return get_search_backend().search(model, term, filters, page, per_page)
+
+
+def search_results(model, term, genre=None, page=1):
+    # Search response shared by the HTML search pages and the JSON API.
+    filters = [has_genre(model, genre)] if genre else []
+    results = search(model, term, filters, page=max(page, 1))
+    return {
+        "count": results.count,
+        "page": results.page,
+        "pages": -(-results.count // results.per_page),
+        "data": [{
+            "id": item.id,
+            "name": item.name,
+            "num_upcoming_shows": item.upcoming_shows_count
+        } for item in results.items]
+    }
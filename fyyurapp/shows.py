@@ -0,0 +1,89 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from fyyurapp import db
+from fyyurapp.models import Show
+from fyyurapp.forms import ShowForm
+from fyyurapp.queries import show_listing_query, SHOW_LISTING_ORDER
+from fyyurapp.pagination import paginate_request
+from fyyurapp.cache import cache, venue_key, artist_key
+from fyyurapp.conditional import conditional, show_listing_sources
+from fyyurapp.counters import record_show
+from fyyurapp.jobs import after_commit_audit
+from fyyurapp.bookings import show_end_time, find_conflicts, constraint_conflict
+from fyyurapp.profiling import query_budget
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+shows = Blueprint('shows', __name__)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+
+@shows.route('/shows')
+@query_budget(2)
+@conditional(show_listing_sources)
+def index():
+    # displays list of shows
+    # rows carry the names and start_time the tiles need, as datetimes
+    page = paginate_request(show_listing_query(), SHOW_LISTING_ORDER)
+    return render_template('pages/shows.html', shows=page.items, page=page)
+
+
+@shows.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@shows.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    # TODO: insert form data as a new Show record in the db, instead
+
+    # on successful db insert, flash success
+    # flash('Show was successfully listed!')
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    form = ShowForm(request.form)
+    if not form.validate():
+        flash('Show could not be listed: ' + '; '.join(
+            f"{field}: {', '.join(messages)}" for field, messages in form.errors.items()))
+        return redirect(url_for('.create_shows'))
+    try:
+        new_show = Show(
+            artist_id=int(request.form['artist_id']),
+            venue_id=int(request.form['venue_id']),
+            start_time=form.start_time.data
+        )
+        new_show.end_time = show_end_time(
+            new_show.start_time, form.end_time.data, form.duration.data)
+        # PostgreSQL enforces this with exclusion constraints as well
+        conflicts = find_conflicts(new_show.venue_id, new_show.artist_id,
+                                   new_show.start_time, new_show.end_time)
+        if conflicts:
+            flash('Show could not be listed: ' + '; '.join(
+                f'the {conflict.kind} is booked from {conflict.start_time:%Y-%m-%d %H:%M} '
+                f'to {conflict.end_time:%Y-%m-%d %H:%M}' for conflict in conflicts))
+            return redirect(url_for('.create_shows'))
+        db.session.add(new_show)
+        record_show(new_show)
+        db.session.flush()
+        after_commit_audit('create', 'show', new_show.id)
+        db.session.commit()
+        cache.invalidate(venue_key(new_show.venue_id),
+                         artist_key(new_show.artist_id))
+        flash('Show was successfully listed!')
+    except Exception as e:
+        db.session.rollback()
+        kind = constraint_conflict(e)
+        if kind:
+            flash(f'The {kind} is already booked at that time. Show could not be listed.')
+        else:
+            flash('An error occurred. Show could not be listed.')
+    finally:
+        db.session.close()
+    return redirect(url_for("main.index"))
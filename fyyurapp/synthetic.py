@@ -0,0 +1,202 @@
+import random
+from itertools import islice
+from datetime import datetime, timedelta
+import click
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show, venue_genres, artist_genres
+from fyyurapp.forms import VenueForm
+from fyyurapp.queries import genres_by_name
+from fyyurapp.counters import refresh_show_counts
+from fyyurapp.cache import cache
+from fyyurapp.cli import fyyur_cli
+from fyyurapp.partitions import is_partitioned, ensure_partitions
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+# Named scales: number of shows. Venues and artists are derived from it.
+SCALES = {'1k': 1000, '100k': 100000, '10m': 10000000}
+
+GENRES = [value for value, _ in VenueForm.genres.kwargs['choices']]
+
+# (city, state) pairs; real listings cluster in a few large cities.
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+    ('Phoenix', 'AZ'), ('Philadelphia', 'PA'), ('San Antonio', 'TX'), ('San Diego', 'CA'),
+    ('Dallas', 'TX'), ('San Francisco', 'CA'), ('Austin', 'TX'), ('Seattle', 'WA'),
+    ('Denver', 'CO'), ('Nashville', 'TN'), ('Portland', 'OR'), ('New Orleans', 'LA'),
+    ('Atlanta', 'GA'), ('Miami', 'FL'), ('Boston', 'MA'), ('Detroit', 'MI'),
+]
+
+WORDS = ['Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Wild', 'Silver', 'Neon',
+         'Rolling', 'Crimson', 'Hollow', 'Echo', 'Lunar', 'Rusty', 'Paper', 'Atomic']
+VENUE_KINDS = ['Hall', 'Lounge', 'Club', 'Theatre', 'Bar', 'Room', 'Garden', 'Cellar']
+ARTIST_KINDS = ['Band', 'Trio', 'Quartet', 'Collective', 'Orchestra', 'Project', 'Sisters']
+
+
+def scale_counts(shows):
+    # About 50 shows per venue and 20 per artist over the generated period.
+    return max(shows // 50, 1), max(shows // 20, 1)
+
+
+def weighted_index(rng, count, skew=1.2):
+    # Zipf-like pick in [0, count): a few venues and artists get most shows.
+    return min(int(count * rng.random() ** (1 + skew)), count - 1)
+
+
+def fake_name(rng, kinds, index):
+    return f'{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(kinds)} {index}'
+
+
+def fake_phone(rng):
+    # digits only, as forms.validate_phone requires
+    return f'{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(1000, 9999)}'
+
+
+def entity_rows(rng, model, count, offset):
+    for index in range(offset, offset + count):
+        city, state = CITIES[weighted_index(rng, len(CITIES), skew=0.8)]
+        row = {
+            'name': fake_name(rng, VENUE_KINDS if model is Venue else ARTIST_KINDS, index),
+            'city': city,
+            'state': state,
+            'phone': fake_phone(rng),
+            'image_link': f'https://images.example.com/{model.__tablename__.lower()}/{index}.jpg',
+            'facebook_link': f'https://www.facebook.com/fyyur{index}',
+            'website_link': f'https://fyyur{index}.example.com',
+            'seeking_description': None,
+        }
+        seeking = rng.random() < 0.3
+        if model is Venue:
+            row.update(address=f'{rng.randint(1, 9999)} {rng.choice(WORDS)} St',
+                       seeking_talent=seeking)
+        else:
+            row['seeking_venue'] = seeking
+        if seeking:
+            row['seeking_description'] = 'We are looking for new acts to book.'
+        yield row
+
+
+# Evening start times. Shows last 90-150 minutes, so shows in different
+# slots never overlap; within a slot every venue and artist plays once.
+SLOTS = [(17, 0), (19, 30), (22, 0)]
+# Two years of history and one year ahead.
+DAYS = range(-730, 366)
+
+
+def show_slots(shows, now):
+    # (start time, number of shows) per slot, weekend-heavy, `shows` in
+    # all. Counts are split by largest remainder so they add up exactly.
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    starts, weights = [], []
+    for offset in DAYS:
+        day = today + timedelta(days=offset)
+        for hour, minute in SLOTS:
+            starts.append(day.replace(hour=hour, minute=minute))
+            weights.append(1.0 if day.weekday() >= 4 else 0.4)
+    total = sum(weights)
+    exact = [shows * weight / total for weight in weights]
+    counts = [int(value) for value in exact]
+    by_remainder = sorted(range(len(exact)), key=lambda index: counts[index] - exact[index])
+    for index in by_remainder[:shows - sum(counts)]:
+        counts[index] += 1
+    return [(start, count) for start, count in zip(starts, counts) if count]
+
+
+def distinct_picks(rng, ids, count):
+    # `count` different ids, skewed like weighted_index while that stays cheap.
+    if count * 2 > len(ids):
+        return rng.sample(ids, count)
+    picked = {}
+    while len(picked) < count:
+        picked.setdefault(ids[weighted_index(rng, len(ids))], None)
+    return list(picked)
+
+
+def show_rows(rng, shows, now, venue_ids, artist_ids):
+    for start, count in show_slots(shows, now):
+        count = min(count, len(venue_ids), len(artist_ids))
+        for venue_id, artist_id in zip(distinct_picks(rng, venue_ids, count),
+                                       distinct_picks(rng, artist_ids, count)):
+            yield {
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': start,
+                'end_time': start + timedelta(minutes=rng.randrange(90, 151, 15)),
+            }
+
+
+def insert_entities(rng, model, link, key, count, genres, batch_size, report):
+    # Inserts `count` venues or artists with 1-3 genres each; returns their ids.
+    first_id = db.session.query(db.func.max(model.id)).scalar() or 0
+    for offset in range(0, count, batch_size):
+        rows = list(entity_rows(rng, model, min(batch_size, count - offset), offset))
+        db.session.execute(model.__table__.insert(), rows)
+        db.session.commit()
+        report(model.__tablename__, offset + len(rows))
+    ids = [row[0] for row in db.session.query(model.id).filter(
+        model.id > first_id).order_by(model.id)]
+    links = [{key: entity_id, 'genre_id': genre.id}
+             for entity_id in ids
+             for genre in rng.sample(genres, rng.randint(1, 3))]
+    for offset in range(0, len(links), batch_size):
+        db.session.execute(link.insert(), links[offset:offset + batch_size])
+    db.session.commit()
+    return ids
+
+
+def generate(shows, seed=0, batch_size=10000, now=None, report=None, venues=None):
+    # Populates the schema with `shows` shows and matching venues and
+    # artists (`venues` overrides the venue count). Rows are inserted with
+    # executemany in batches so 10M shows run in bounded memory. Returns
+    # (venues, artists, shows) inserted.
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    report = report or (lambda kind, done: None)
+    venue_count, artist_count = scale_counts(shows)
+    venue_count = venues or venue_count
+
+    genres = genres_by_name(GENRES)
+    db.session.commit()
+    venue_ids = insert_entities(rng, Venue, venue_genres, 'venue_id', venue_count,
+                                genres, batch_size, report)
+    artist_ids = insert_entities(rng, Artist, artist_genres, 'artist_id', artist_count,
+                                 genres, batch_size, report)
+
+    if is_partitioned():
+        ensure_partitions(now + timedelta(days=DAYS[0]), now + timedelta(days=DAYS[-1]))
+    rows = show_rows(rng, shows, now, venue_ids, artist_ids)
+    inserted = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        db.session.execute(Show.__table__.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+        report('Show', inserted)
+
+    refresh_show_counts(Venue, now=now)
+    refresh_show_counts(Artist, now=now)
+    db.session.commit()
+    cache.clear()
+    return len(venue_ids), len(artist_ids), inserted
+
+
+@fyyur_cli.command('generate')
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='1k', show_default=True,
+              help='Number of shows to generate.')
+@click.option('--shows', type=int, default=None, help='Exact number of shows; overrides --scale.')
+@click.option('--venues', type=int, default=None,
+              help='Exact number of venues; defaults to one per 50 shows.')
+@click.option('--seed', type=int, default=0, show_default=True)
+@click.option('--batch-size', type=int, default=10000, show_default=True)
+def generate_command(scale, shows, venues, seed, batch_size):
+    """Fill the database with synthetic venues, artists and shows."""
+    def report(kind, done):
+        click.echo(f'{kind}: {done}', err=True)
+
+    venues, artists, shows = generate(shows or SCALES[scale], seed, batch_size,
+                                      report=report, venues=venues)
+    click.echo(f'Generated {venues} venues, {artists} artists and {shows} shows.')
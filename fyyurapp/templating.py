@@ -0,0 +1,42 @@
+import os
+import time
+import click
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from fyyurapp.cli import fyyur_cli
+
+#----------------------------------------------------------------------------#
+# Template compilation.
+#----------------------------------------------------------------------------#
+
+
+def configure_templates(app):
+    # Compiled templates are kept as bytecode on disk, so a new worker or a
+    # restarted process loads them instead of parsing and compiling every
+    # template again. Reloading changed templates is only done in debug
+    # mode unless TEMPLATES_AUTO_RELOAD says otherwise.
+    if app.config['TEMPLATE_BYTECODE_CACHE'] == 'filesystem':
+        directory = app.config['TEMPLATE_CACHE_DIR']
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.auto_reload = app.templates_auto_reload
+
+
+def precompile_templates(app):
+    # Loads every template once: fills the bytecode cache and this process's
+    # template cache, which pre-forked workers then inherit. Returns the
+    # template names.
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+
+@fyyur_cli.command('compile-templates')
+def compile_templates_command():
+    """Compile all templates into the bytecode cache (run at deploy time)."""
+    start = time.perf_counter()
+    names = precompile_templates(current_app)
+    click.echo(f'Compiled {len(names)} templates in {(time.perf_counter() - start) * 1000:.0f}ms.')
@@ -0,0 +1,208 @@
+from datetime import datetime
+from flask import Blueprint, abort, current_app, render_template, request, flash, redirect, url_for
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist
+from fyyurapp.forms import VenueForm
+from fyyurapp.queries import (with_shows, genres_by_name, venue_areas_query, group_areas,
+                              venue_detail, show_partner_ids, VENUE_LISTING_ORDER)
+from fyyurapp.pagination import paginate_request
+from fyyurapp.cache import cache, venue_key, detail_ttl
+from fyyurapp.conditional import conditional, listing_sources, venue_page_sources
+from fyyurapp.jobs import after_commit, after_commit_audit, invalidate_partner_pages, refresh_counts
+from fyyurapp.search import search_results
+from fyyurapp.replicas import read_only
+from fyyurapp.profiling import query_budget
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+venues = Blueprint('venues', __name__)
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@venues.route('/venues')
+@query_budget(2)
+# upcoming show counts are kept on the Venue rows
+@conditional(lambda: listing_sources(Venue, VENUE_LISTING_ORDER))
+def index():
+    # TODO: replace with real venues data.
+    # num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
+
+    page = paginate_request(venue_areas_query(
+        genre=request.args.get('genre')), VENUE_LISTING_ORDER)
+    data = group_areas(page.items)
+    return render_template('pages/venues.html', areas=data, page=page)
+
+
+@venues.route('/venues/search', methods=['POST'])
+@query_budget(2)
+@read_only
+def search_venues():
+    # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    search_term = request.form.get("search_term", "")
+    genre = request.form.get("genre")
+    page = request.form.get("page", 1, type=int)
+
+    response = search_results(Venue, search_term, genre, page)
+
+    return render_template('pages/search_venues.html', results=response, search_term=search_term, genre=genre)
+
+
+@venues.route('/venues/<int:venue_id>')
+@query_budget(3)
+@conditional(venue_page_sources)
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    # TODO: replace with real venue data from the venues table, using venue_id
+
+    if request.args.get('all_shows'):
+        venue_data = venue_detail(venue_id, current_app.config['DETAIL_ALL_SHOWS_LIMIT'])
+    else:
+        venue_data = cache.get_or_set(venue_key(venue_id), lambda: venue_detail(
+            venue_id, current_app.config['DETAIL_SHOWS_LIMIT']), ttl=detail_ttl)
+    if venue_data is None:
+        abort(404)
+
+    return render_template('pages/show_venue.html', venue=venue_data)
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@venues.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venues.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+
+    # on successful db insert, flash success
+    # flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    try:
+        newVenue = Venue(
+            name=request.form['name'],
+            city=request.form['city'],
+            state=request.form['state'],
+            address=request.form['address'],
+            phone=request.form['phone'],
+            genres=genres_by_name(request.form.getlist('genres')),
+            facebook_link=request.form['facebook_link'],
+            image_link=request.form['image_link'],
+            seeking_talent=True if 'seeking_talent' in request.form else False,
+            seeking_description=request.form['seeking_description'],
+            website_link=request.form['website_link']
+        )
+
+        db.session.add(newVenue)
+        db.session.flush()
+        after_commit_audit('create', 'venue', newVenue.id)
+        db.session.commit()
+        cache.invalidate(venue_key(newVenue.id))
+        flash('Venue ' + request.form['name'] +
+              ' was successfully listed!')
+
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+
+        flash('An error occurred. Venue ' +
+              request.form['name'] + ' could not be listed.')
+
+    finally:
+        db.session.close()
+
+    return redirect(url_for("main.index"))
+
+
+@venues.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    # TODO: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    # return None
+
+    try:
+        # shows are deleted through the cascade, so load them in one go
+        venue = Venue.query.options(
+            with_shows(Venue, 'selectin')).get(venue_id)
+        artist_ids = show_partner_ids(Venue, venue_id)
+        db.session.delete(venue)
+        # the artists' counters and pages are updated in the background
+        after_commit(refresh_counts, Artist, artist_ids)
+        after_commit(invalidate_partner_pages, Venue, venue_id, artist_ids)
+        after_commit_audit('delete', 'venue', venue_id)
+        db.session.commit()
+        cache.invalidate(venue_key(venue_id))
+        flash("Venue " + venue.name + " was deleted successfully!")
+    except:
+        db.session.rollback()
+
+        flash("Venue was not deleted successfully.")
+    finally:
+        db.session.close()
+
+    return redirect(url_for("main.index"))
+#  Update
+#  ----------------------------------------------------------------
+
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@query_budget(2)
+def edit_venue(venue_id):
+    form = VenueForm()
+    venue = Venue.query.options(with_shows(Venue)).get(venue_id)
+    form.genres.data = venue.genre_names
+
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    # TODO: take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+    form = VenueForm(request.form)
+
+    try:
+        venue = Venue.query.options(with_shows(Venue)).get(venue_id)
+
+        venue.name = request.form['name']
+        venue.city = request.form['city']
+        venue.state = request.form['state']
+        venue.address = request.form['address']
+        venue.phone = request.form['phone']
+        venue.genres = genres_by_name(request.form.getlist('genres'))
+        # genres live in another table, so bump the version explicitly
+        venue.updated_at = datetime.utcnow()
+        venue.facebook_link = request.form['facebook_link']
+        venue.image_link = request.form['image_link']
+        venue.seeking_talent = request.form['seeking_talent']
+        venue.seeking_description = request.form['seeking_description']
+        venue.website_link = request.form['website_link']
+
+        db.session.add(venue)
+        after_commit(invalidate_partner_pages, Venue, venue_id)
+        after_commit_audit('edit', 'venue', venue_id)
+        db.session.commit()
+        cache.invalidate(venue_key(venue_id))
+
+        flash("Venue " + form.name.data + " edited successfully")
+
+    except Exception:
+        db.session.rollback()
+        flash("Venue was not edited successfully.")
+    finally:
+        db.session.close()
+
+    return redirect(url_for('.show_venue', venue_id=venue_id))
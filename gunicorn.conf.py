@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+
+#----------------------------------------------------------------------------#
+# Gunicorn settings. Every value can be overridden from the environment.
+#----------------------------------------------------------------------------#
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Pre-fork workers, each serving THREADS requests at once. The database
+# pool of each worker is sized from GUNICORN_THREADS (see config.py); keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the database's
+# max_connections.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import the app once in the master so workers share its memory through
+# copy-on-write. With preloading, SIGHUP restarts the workers gracefully
+# but keeps the code loaded in the master; deploy new code with USR2
+# (start a new master) followed by QUIT to the old one.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Recycle each worker after about MAX_REQUESTS requests to cap memory
+# growth; the jitter keeps workers from restarting all at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while preloading must not be shared
+    # with the workers; each worker opens its own.
+    from fyyurapp import db
+    from fyyurapp.replicas import dispose_engines
+    dispose_engines(db, server.app.wsgi())
+
+
+def worker_exit(server, worker):
+    # Give the background jobs queued by the last requests time to finish.
+    from fyyurapp.jobs import get_executor
+    get_executor(server.app.wsgi()).shutdown()
+
+
+def on_reload(server):
+    server.log.info('SIGHUP: reloading configuration and restarting workers gracefully')
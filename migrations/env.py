@@ -71,13 +71,29 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # Show partitions and archived months are managed by `flask fyyur
+    # partitions`, not by the models; keep autogenerate from dropping them.
+    def include_name(name, type_, parent_names):
+        if type_ == 'table':
+            return name == 'Show' or not name.startswith('Show_')
+        return True
+
     connectable = current_app.extensions['migrate'].db.get_engine()
 
+    # The pg_trgm GIN indexes declared on the models only exist on
+    # PostgreSQL (see migration aa304bc61f4d).
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'index' and connectable.dialect.name != 'postgresql':
+            return object.dialect_options['postgresql'].get('using') != 'gin'
+        return True
+
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_name=include_name,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
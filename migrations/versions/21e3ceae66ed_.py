@@ -0,0 +1,99 @@
+"""normalize genres into Genre and association tables
+
+Revision ID: 21e3ceae66ed
+Revises: f7add7f03652
+Create Date: 2026-10-18 18:45:12.104233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '21e3ceae66ed'
+down_revision = 'f7add7f03652'
+branch_labels = None
+depends_on = None
+
+# (entity table, association table, association foreign key)
+GENRE_LINKS = [
+    ('Venue', 'venue_genres', 'venue_id'),
+    ('Artist', 'artist_genres', 'artist_id'),
+]
+
+
+def genre_names(value):
+    # Genre names in a comma-joined genres string. The old views stored
+    # ','.join() of the first selected genre, a string, so a single genre
+    # came out one character per part ("J,a,z,z", "R,&,B", or
+    # "M,u,s,i,c,a,l, ,T,h,e,a,t,r,e"); such values are joined back into
+    # one name before splitting.
+    parts = (value or '').split(',')
+    if len(parts) > 1 and all(len(part) <= 1 for part in parts):
+        parts = [''.join(parts)]
+    return [name.strip() for name in parts if name.strip()]
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for entity, link, key in GENRE_LINKS:
+        op.create_table(link,
+        sa.Column(key, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([key], [f'{entity}.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(key, 'genre_id')
+        )
+        op.create_index(f'ix_{link}_genre_id_{key}', link, ['genre_id', key])
+
+    # Backfill from the comma-joined genre strings.
+    conn = op.get_bind()
+    genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    entity_genres = {}
+    for entity, link, key in GENRE_LINKS:
+        rows = conn.execute(sa.text(f'SELECT id, genres FROM "{entity}"')).fetchall()
+        entity_genres[entity] = [(row[0], genre_names(row[1])) for row in rows]
+
+    names = sorted({name for rows in entity_genres.values() for _, genres in rows for name in genres})
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in names])
+    genre_ids = dict((row[1], row[0]) for row in conn.execute(sa.select(genre.c.id, genre.c.name)))
+
+    for entity, link, key in GENRE_LINKS:
+        link_table = sa.table(link, sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer))
+        links = [
+            {key: entity_id, 'genre_id': genre_ids[name]}
+            for entity_id, genres in entity_genres[entity]
+            for name in dict.fromkeys(genres)
+        ]
+        if links:
+            op.bulk_insert(link_table, links)
+        op.drop_column(entity, 'genres')
+
+
+def downgrade():
+    conn = op.get_bind()
+    for entity, link, key in GENRE_LINKS:
+        length = 120 if entity == 'Artist' else None
+        op.add_column(entity, sa.Column('genres', sa.String(length=length), nullable=True))
+        rows = conn.execute(sa.text(
+            f'SELECT l.{key}, g.name FROM {link} l JOIN "Genre" g ON g.id = l.genre_id '
+            f'ORDER BY l.{key}, g.name')).fetchall()
+        genres = {}
+        for entity_id, name in rows:
+            genres.setdefault(entity_id, []).append(name)
+        entity_table = sa.table(entity, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        conn.execute(entity_table.update().values(genres=''))
+        for entity_id, names in genres.items():
+            conn.execute(entity_table.update().where(
+                entity_table.c.id == entity_id).values(genres=','.join(names)))
+        with op.batch_alter_table(entity) as batch_op:
+            batch_op.alter_column('genres', existing_type=sa.String(length=length), nullable=False)
+        op.drop_index(f'ix_{link}_genre_id_{key}', table_name=link)
+        op.drop_table(link)
+    op.drop_table('Genre')
@@ -0,0 +1,37 @@
+"""add updated_at to Venue, Artist and Show
+
+Revision ID: 43b711795a7e
+Revises: aa304bc61f4d
+Create Date: 2026-10-18 19:31:08.274412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '43b711795a7e'
+down_revision = 'aa304bc61f4d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Backfill existing rows with their creation time where it is known.
+    op.execute('UPDATE "Venue" SET updated_at = created_at')
+    op.execute('UPDATE "Artist" SET updated_at = created_at')
+    op.execute('UPDATE "Show" SET updated_at = CURRENT_TIMESTAMP')
+
+    for table in ('Venue', 'Artist', 'Show'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,52 @@
+"""composite indexes for show lookups and listings
+
+Revision ID: 81799ec69316
+Revises: a79040e48a6a
+Create Date: 2026-10-18 20:26:37.640158
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '81799ec69316'
+down_revision = 'a79040e48a6a'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, covered columns)
+INDEXES = [
+    ('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], ['artist_id']),
+    ('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], ['venue_id']),
+    ('ix_Show_start_time_id', 'Show', ['start_time', 'id'], []),
+    ('ix_Venue_city_state_name_id', 'Venue', ['city', 'state', 'name', 'id'], []),
+    ('ix_Venue_created_at', 'Venue', ['created_at'], []),
+    ('ix_Artist_name_id', 'Artist', ['name', 'id'], []),
+    ('ix_Artist_created_at', 'Artist', ['created_at'], []),
+]
+
+
+def upgrade():
+    # On PostgreSQL the indexes are built CONCURRENTLY so the tables stay
+    # writable; that cannot run inside the migration transaction.
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns, include in INDEXES:
+                op.create_index(name, table, columns, unique=False,
+                                postgresql_include=include,
+                                postgresql_concurrently=True)
+    else:
+        for name, table, columns, include in INDEXES:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns, include in reversed(INDEXES):
+                op.drop_index(name, table_name=table,
+                              postgresql_concurrently=True)
+    else:
+        for name, table, columns, include in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,42 @@
+"""add upcoming/past show counters to Venue and Artist
+
+Revision ID: a79040e48a6a
+Revises: 43b711795a7e
+Create Date: 2026-10-18 20:04:55.918302
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a79040e48a6a'
+down_revision = '43b711795a7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+
+    # Backfill the counters from the existing shows.
+    now = datetime.now()
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.get_bind().execute(sa.text(
+            f'UPDATE "{table}" SET '
+            f'upcoming_shows_count = (SELECT count(*) FROM "Show" '
+            f'WHERE "Show".{key} = "{table}".id AND "Show".start_time > :now), '
+            f'past_shows_count = (SELECT count(*) FROM "Show" '
+            f'WHERE "Show".{key} = "{table}".id AND "Show".start_time <= :now)'
+        ), {'now': now})
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
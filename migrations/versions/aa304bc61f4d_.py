@@ -0,0 +1,41 @@
+"""pg_trgm GIN indexes for venue and artist search
+
+Revision ID: aa304bc61f4d
+Revises: 21e3ceae66ed
+Create Date: 2026-10-18 19:02:41.553710
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'aa304bc61f4d'
+down_revision = '21e3ceae66ed'
+branch_labels = None
+depends_on = None
+
+# Columns searched by search.SEARCH_FIELDS.
+SEARCH_COLUMNS = [
+    ('Venue', 'name'), ('Venue', 'city'), ('Venue', 'state'),
+    ('Artist', 'name'), ('Artist', 'city'), ('Artist', 'state'),
+]
+
+
+def upgrade():
+    # Trigram indexes only exist on PostgreSQL; other databases use the
+    # in-process search backend.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in SEARCH_COLUMNS:
+        op.create_index(f'ix_{table.lower()}_{column}_trgm', table, [column],
+                        postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column in SEARCH_COLUMNS:
+        op.drop_index(f'ix_{table.lower()}_{column}_trgm', table_name=table)
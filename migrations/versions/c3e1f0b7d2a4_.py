@@ -0,0 +1,67 @@
+"""show end times and no overlapping bookings
+
+Revision ID: c3e1f0b7d2a4
+Revises: 81799ec69316
+Create Date: 2026-10-18 23:12:05.318270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e1f0b7d2a4'
+down_revision = '81799ec69316'
+branch_labels = None
+depends_on = None
+
+# Minutes given to the shows listed before end times existed.
+DEFAULT_DURATION = 120
+
+EXCLUSIONS = ['venue_id', 'artist_id']
+
+# (column, show id, overlapping show id) of the first few overlaps.
+OVERLAPS = '''
+    SELECT '{column}', a.id, b.id FROM "Show" a JOIN "Show" b
+        ON a.{column} = b.{column} AND a.id < b.id
+        AND tsrange(a.start_time, a.end_time) && tsrange(b.start_time, b.end_time)
+    LIMIT 10
+'''
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    if bind.dialect.name == 'postgresql':
+        op.execute(f'''UPDATE "Show" SET end_time = start_time + interval '{DEFAULT_DURATION} minutes' ''')
+    else:
+        # SQLite stores datetimes as text; keep the microseconds SQLAlchemy writes.
+        op.execute(f'''UPDATE "Show" SET end_time = strftime('%Y-%m-%d %H:%M:%S', start_time,
+                       '+{DEFAULT_DURATION} minutes') || substr(start_time, 20)''')
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('ck_Show_end_after_start', 'end_time > start_time')
+
+    if bind.dialect.name == 'postgresql':
+        # Needs a role allowed to create extensions (or btree_gist installed).
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        overlaps = [row for column in EXCLUSIONS
+                    for row in bind.execute(sa.text(OVERLAPS.format(column=column)))]
+        if overlaps:
+            raise RuntimeError(
+                'Existing shows overlap, e.g. '
+                + ', '.join(f'{column} of shows {a} and {b}' for column, a, b in overlaps)
+                + '. List them all with `flask fyyur show-conflicts` and fix them first.')
+        for column in EXCLUSIONS:
+            op.execute(f'ALTER TABLE "Show" ADD CONSTRAINT "Show_{column}_no_overlap" '
+                       f'EXCLUDE USING gist ({column} WITH =, '
+                       f'tsrange(start_time, end_time) WITH &&)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in reversed(EXCLUSIONS):
+            op.drop_constraint(f'Show_{column}_no_overlap', 'Show')
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_Show_end_after_start', type_='check')
+        batch_op.drop_column('end_time')
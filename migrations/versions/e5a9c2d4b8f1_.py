@@ -0,0 +1,113 @@
+"""partition Show by month on PostgreSQL
+
+Revision ID: e5a9c2d4b8f1
+Revises: c3e1f0b7d2a4
+Create Date: 2026-10-18 23:48:51.902117
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c2d4b8f1'
+down_revision = 'c3e1f0b7d2a4'
+branch_labels = None
+depends_on = None
+
+# Months partitioned ahead of the current one; `flask fyyur partitions`
+# keeps it that way afterwards.
+AHEAD = 3
+
+COLUMNS = 'id, artist_id, venue_id, start_time, updated_at, end_time'
+
+# (name, columns, covered columns)
+INDEXES = [
+    ('ix_Show_updated_at', ['updated_at'], []),
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time'], ['artist_id']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time'], ['venue_id']),
+    ('ix_Show_start_time_id', ['start_time', 'id'], []),
+]
+
+OVERLAP_COLUMNS = ['venue_id', 'artist_id']
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def add_overlap_constraints(table, prefix):
+    for column in OVERLAP_COLUMNS:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{prefix}_{column}_no_overlap" '
+                   f'EXCLUDE USING gist ({column} WITH =, tsrange(start_time, end_time) WITH &&)')
+
+
+def replace_table(new_table):
+    # Copies "Show" into `new_table` and puts it in its place. The id
+    # sequence is detached first so it survives dropping the old table.
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+    op.execute(f'INSERT INTO "{new_table}" ({COLUMNS}) SELECT {COLUMNS} FROM "Show"')
+    op.drop_table('Show')
+    op.rename_table(new_table, 'Show')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+
+
+def add_keys_and_indexes(primary_key):
+    op.create_primary_key('Show_pkey', 'Show', primary_key)
+    op.create_foreign_key('Show_artist_id_fkey', 'Show', 'Artist', ['artist_id'], ['id'])
+    op.create_foreign_key('Show_venue_id_fkey', 'Show', 'Venue', ['venue_id'], ['id'])
+    for name, columns, include in INDEXES:
+        op.create_index(name, 'Show', columns, unique=False, postgresql_include=include)
+
+
+def upgrade():
+    # SQLite has no partitioning; the table stays as it is there.
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # The primary key of a partitioned table must hold the partition key.
+    # Keys and indexes are added after the copy, which is faster than
+    # maintaining them row by row. The table is locked until the end.
+    op.execute(f'''CREATE TABLE "Show_partitioned" (
+        id integer NOT NULL DEFAULT nextval('"Show_id_seq"'),
+        artist_id integer NOT NULL,
+        venue_id integer NOT NULL,
+        start_time timestamp without time zone NOT NULL,
+        updated_at timestamp without time zone NOT NULL,
+        end_time timestamp without time zone NOT NULL,
+        CONSTRAINT "ck_Show_end_after_start" CHECK (end_time > start_time)
+    ) PARTITION BY RANGE (start_time)''')
+    op.execute('CREATE TABLE "Show_default" PARTITION OF "Show_partitioned" DEFAULT')
+
+    # One partition per month from the first show to the last one, or
+    # AHEAD months from now if that is later.
+    first, last = bind.execute(sa.text('SELECT min(start_time), max(start_time) FROM "Show"')).one()
+    now = datetime.now()
+    month = datetime((first or now).year, (first or now).month, 1)
+    last = max(last or now, add_months(datetime(now.year, now.month, 1), AHEAD))
+    partitions = ['Show_default']
+    while month <= last:
+        name = f'Show_p{month:%Y_%m}'
+        op.execute(f'''CREATE TABLE "{name}" PARTITION OF "Show_partitioned"
+                       FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')''')
+        partitions.append(name)
+        month = add_months(month, 1)
+
+    replace_table('Show_partitioned')
+    add_keys_and_indexes(['id', 'start_time'])
+    for name in partitions:
+        add_overlap_constraints(name, name)
+
+
+def downgrade():
+    # Shows of archived (detached) partitions are not brought back.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE TABLE "Show_plain" (LIKE "Show" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    replace_table('Show_plain')
+    add_keys_and_indexes(['id'])
+    add_overlap_constraints('Show', 'Show')
@@ -1,4 +1,6 @@
-from fyyurapp import app
+from fyyurapp import create_app
+
+app = create_app()
 
 # Default port:
 if __name__ == '__main__':
@@ -0,0 +1,63 @@
+import re
+from datetime import datetime, timedelta
+import pytest
+from fyyurapp import create_app, db
+from fyyurapp.models import Venue, Artist, Show, Genre
+from fyyurapp.counters import roll_show_counts
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'WTF_CSRF_ENABLED': False,
+        'LOG_FILE': str(tmp_path / 'fyyur.log'),
+        # jobs run right away, so tests see their effects
+        'JOBS_WORKERS': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def sample(app):
+    # Three venues and two artists with past and upcoming shows.
+    now = datetime.now()
+    jazz = Genre(name='Jazz')
+    venues = [
+        Venue(name='The Musical Hop', city='San Francisco', state='CA', address='1 st',
+              phone='4155550100', genres=[jazz, Genre(name='Folk')]),
+        Venue(name='Park Square', city='San Francisco', state='CA', address='2 st', genres=[]),
+        Venue(name='Dueling Pianos', city='New York', state='NY', address='3 st', genres=[jazz]),
+    ]
+    artists = [
+        Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=[jazz]),
+        Artist(name='The Wild Sax Band', city='New York', state='NY', genres=[]),
+    ]
+    db.session.add_all(venues + artists)
+    db.session.commit()
+    shows = [
+        Show(venue_id=venues[0].id, artist_id=artists[0].id, start_time=now + timedelta(days=3)),
+        Show(venue_id=venues[0].id, artist_id=artists[1].id, start_time=now - timedelta(days=3)),
+        Show(venue_id=venues[2].id, artist_id=artists[1].id, start_time=now + timedelta(days=5)),
+    ]
+    db.session.add_all(shows)
+    db.session.commit()
+    roll_show_counts()
+    db.session.commit()
+    return {'venues': [venue.id for venue in venues], 'artists': [artist.id for artist in artists],
+            'shows': [show.id for show in shows]}
+
+
+def query_count(response):
+    # Queries the request ran, as reported in its Server-Timing header.
+    return int(re.search(r'desc="(\d+) queries"', response.headers['Server-Timing']).group(1))
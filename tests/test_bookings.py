@@ -0,0 +1,122 @@
+import io
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from fyyurapp import db
+from fyyurapp.models import Show
+from fyyurapp.bookings import IntervalIndex, free_slots, show_end_time
+from fyyurapp.bulk import import_rows, read_rows
+
+DAY = datetime(2030, 1, 1)
+
+
+def hours(start, end):
+    return DAY + timedelta(hours=start), DAY + timedelta(hours=end)
+
+
+def test_interval_index_overlapping():
+    index = IntervalIndex([(*hours(10, 12), 'a'), (*hours(20, 22), 'c')])
+    index.add(*hours(14, 16), 'b')
+    assert len(index) == 3
+    assert [key for _, _, key in index.overlapping(*hours(11, 15))] == ['a', 'b']
+    # intervals are half-open: touching ends do not overlap
+    assert index.overlapping(*hours(12, 14)) == []
+    assert [key for _, _, key in index.overlapping(*hours(0, 24))] == ['a', 'b', 'c']
+
+
+def test_interval_index_finds_long_intervals():
+    # starts long before the window, so only max_length reaches it
+    index = IntervalIndex([(*hours(0, 11), 'long')], max_length=timedelta(hours=1))
+    index.add(*hours(9, 10), 'short')
+    assert [key for _, _, key in index.overlapping(*hours(10, 12))] == ['long']
+
+
+def test_interval_index_gaps():
+    index = IntervalIndex([(*hours(10, 12), 'a'), (*hours(11, 13), 'b'), (*hours(15, 16), 'c')])
+    assert index.gaps(*hours(8, 18)) == [hours(8, 10), hours(13, 15), hours(16, 18)]
+    assert index.gaps(*hours(8, 18), timedelta(hours=2)) == [hours(8, 10), hours(13, 15),
+                                                             hours(16, 18)]
+    assert index.gaps(*hours(8, 18), timedelta(hours=3)) == []
+    assert IntervalIndex().gaps(*hours(8, 18)) == [hours(8, 18)]
+
+
+def test_show_end_time():
+    start = DAY
+    assert show_end_time(start, DAY + timedelta(hours=3)) == DAY + timedelta(hours=3)
+    assert show_end_time(start, duration=90) == DAY + timedelta(minutes=90)
+    assert show_end_time(start) == DAY + timedelta(hours=2)
+
+
+def book(sample, start, end, venue=1):
+    show = Show(venue_id=sample['venues'][venue], artist_id=sample['artists'][0],
+                start_time=DAY + timedelta(hours=start), end_time=DAY + timedelta(hours=end))
+    db.session.add(show)
+    db.session.commit()
+    return show
+
+
+def test_free_slots(app, sample):
+    book(sample, 12, 14)
+    book(sample, 18, 21)
+    book(sample, 15, 16, venue=2)
+    venue_id = sample['venues'][1]
+    assert free_slots(venue_id, *hours(10, 22)) == [hours(10, 12), hours(14, 18)]
+    assert free_slots(venue_id, *hours(10, 22), timedelta(hours=3)) == [hours(14, 18)]
+
+
+def availability(client, venue_id, **args):
+    return client.get(f'/api/v1/venues/{venue_id}/availability?{urlencode(args)}')
+
+
+def test_availability_endpoint(client, sample):
+    book(sample, 12, 14)
+    response = availability(client, sample['venues'][1], start='2030-01-01T10:00:00',
+                            end='2030-01-01T22:00:00', min_minutes=60)
+    assert response.status_code == 200
+    assert response.get_json() == {'venue_id': sample['venues'][1], 'free': [
+        {'start': '2030-01-01T10:00:00', 'end': '2030-01-01T12:00:00'},
+        {'start': '2030-01-01T14:00:00', 'end': '2030-01-01T22:00:00'}]}
+
+
+def test_availability_converts_aware_datetimes(client, sample):
+    start = datetime(2030, 1, 1, 10).astimezone()
+    response = availability(client, sample['venues'][1], start=start.isoformat(),
+                            end=(start + timedelta(hours=2)).isoformat())
+    assert response.status_code == 200
+    assert response.get_json()['free'] == [
+        {'start': '2030-01-01T10:00:00', 'end': '2030-01-01T12:00:00'}]
+
+
+def test_availability_rejects_bad_arguments(client, sample):
+    venue_id = sample['venues'][1]
+    valid = {'start': '2030-01-01', 'end': '2030-01-02'}
+    for args, message in [
+            ({'start': '2030-01-01'}, 'start and end must be ISO dates or datetimes'),
+            (dict(valid, end='tomorrow'), 'start and end must be ISO dates or datetimes'),
+            (dict(valid, min_minutes='abc'), 'min_minutes must be an integer'),
+            (dict(valid, min_minutes='0'), 'min_minutes must be positive'),
+            (dict(valid, end='2029-12-31'), 'end must be after start')]:
+        response = availability(client, venue_id, **args)
+        assert response.status_code == 400
+        assert response.get_json()['error'].startswith(message)
+    assert availability(client, 999, **valid).status_code == 404
+
+
+def test_bulk_import_rejects_overlapping_shows(app, sample):
+    book(sample, 20, 22)
+    venue_id, artist_id, other_artist = sample['venues'][1], sample['artists'][0], sample['artists'][1]
+    rows = ''.join(f'{{"venue_id": {venue}, "artist_id": {artist}, "start_time": "{start}"}}\n'
+                   for venue, artist, start in [
+                       # clashes with the show in the database
+                       (venue_id, other_artist, '2030-01-01 21:00:00'),
+                       (venue_id, other_artist, '2030-01-02 20:00:00'),
+                       # clashes with the row above
+                       (venue_id, other_artist, '2030-01-02 21:00:00'),
+                       (sample['venues'][2], artist_id, '2030-01-03 20:00:00')])
+    errors = []
+    imported, rejected = import_rows('shows', read_rows(io.StringIO(rows), 'ndjson'),
+                                     report=lambda line_no, message: errors.append((line_no, message)))
+    assert (imported, rejected) == (2, 2)
+    assert [line_no for line_no, _ in errors] == [1, 3]
+    assert errors[0][1].startswith(f'venue_id: {venue_id} is booked by show ')
+    assert errors[1][1] == f'venue_id: {venue_id} is booked by line 2; ' \
+                           f'artist_id: {other_artist} is booked by line 2'
@@ -0,0 +1,104 @@
+import io
+import pytest
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from werkzeug.datastructures import MultiDict
+from fyyurapp.bulk import export_rows, write_rows, read_rows, import_rows, BulkVenueForm
+from fyyurapp.forms import VenueForm
+from fyyurapp.synthetic import generate
+
+KINDS = ['venues', 'artists', 'shows']
+
+
+def export(kind, format):
+    stream = io.StringIO()
+    write_rows(export_rows(kind), stream, kind, format)
+    return stream.getvalue()
+
+
+def import_(kind, text, format):
+    errors = []
+    imported, rejected = import_rows(kind, read_rows(io.StringIO(text), format),
+                                     report=lambda line_no, message: errors.append((line_no, message)))
+    return imported, errors
+
+
+def clear():
+    for model in (Show, Venue, Artist):
+        for entity in model.query.all():
+            db.session.delete(entity)
+    db.session.commit()
+
+
+@pytest.mark.parametrize('format', ['csv', 'ndjson'])
+def test_export_import_round_trip(app, format):
+    generate(300)
+    # entities without the optional fields
+    for model in (Venue, Artist):
+        entity = model.query.first()
+        entity.image_link = entity.facebook_link = entity.website_link = None
+        entity.phone = entity.seeking_description = None
+    db.session.commit()
+
+    exported = {kind: export(kind, format) for kind in KINDS}
+    clear()
+    for kind in KINDS:
+        assert import_(kind, exported[kind], format) == (
+            exported[kind].count('\n') - (format == 'csv'), [])
+    assert {kind: export(kind, format) for kind in KINDS} == exported
+
+
+def test_import_still_rejects_bad_links(app):
+    row = '{"name": "Hop", "city": "SF", "state": "CA", "address": "1 st", "phone": "4155550100", ' \
+          '"genres": ["Jazz"], "website_link": "not a url"}\n'
+    imported, errors = import_('venues', row, 'ndjson')
+    assert imported == 0
+    assert errors == [(1, 'website_link: Invalid URL.')]
+
+
+def bookings():
+    return sorted((show.start_time, show.venues.name, show.artists.name) for show in Show.query)
+
+
+@pytest.mark.parametrize('format', ['csv', 'ndjson'])
+def test_round_trip_keeps_ids_with_gaps(app, format):
+    generate(300)
+    # gaps at the start of the id ranges, which a fresh table would fill
+    for model in (Venue, Artist):
+        entity = db.session.get(model, 1)
+        Show.query.filter(getattr(Show, f'{model.__tablename__.lower()}_id') == 1).delete()
+        db.session.delete(entity)
+    db.session.commit()
+    before = bookings()
+
+    exported = {kind: export(kind, format) for kind in KINDS}
+    clear()
+    for kind in KINDS:
+        assert import_(kind, exported[kind], format)[1] == []
+    assert bookings() == before
+    assert db.session.get(Venue, 1) is None
+
+    # rows created afterwards get fresh ids
+    venue = Venue(name='New', city='SF', state='CA', address='1 st', genres=[])
+    db.session.add(venue)
+    db.session.commit()
+    assert venue.id > max(row[0] for row in db.session.query(Venue.id).filter(Venue.id != venue.id))
+
+
+def test_import_rejects_taken_ids(app, sample):
+    row = f'{{"id": {sample["venues"][0]}, "name": "Hop", "city": "SF", "state": "CA", ' \
+          '"address": "1 st", "phone": "4155550100", "genres": ["Jazz"]}\n'
+    imported, errors = import_('venues', row + row.replace(str(sample['venues'][0]), '99'), 'ndjson')
+    assert imported == 1
+    assert errors == [(1, f'id: {sample["venues"][0]} already exists')]
+    assert db.session.get(Venue, 99).name == 'Hop'
+
+
+def test_links_are_only_optional_on_import(app):
+    formdata = MultiDict({'name': 'Hop', 'city': 'SF', 'state': 'CA', 'address': '1 st',
+                          'phone': '4155550100', 'genres': 'Jazz', 'image_link': '',
+                          'facebook_link': '', 'website_link': ''})
+    assert BulkVenueForm(formdata=formdata, meta={'csrf': False}).validate()
+    form = VenueForm(formdata=formdata, meta={'csrf': False})
+    assert not form.validate()
+    assert 'website_link' in form.errors
@@ -0,0 +1,143 @@
+import fnmatch
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from fyyurapp import db, cache as cache_module
+from fyyurapp.models import Show
+from fyyurapp.cache import Cache, MemoryBackend, RedisBackend, NullBackend, cache, venue_key
+
+
+class FakeRedis:
+    # The part of redis.Redis the Redis backend uses, with a settable clock.
+
+    def __init__(self):
+        self.now = 0.0
+        self.values = {}
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.now:
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None, px=None):
+        ttl = ex if ex is not None else px / 1000 if px is not None else None
+        self.values[key] = (value, None if ttl is None else self.now + ttl)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        return [key for key in list(self.values) if fnmatch.fnmatchcase(key, match)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_memory_backend_expires_and_evicts(clock):
+    backend = MemoryBackend(maxsize=2, ttl=10)
+    backend.set('a', 1)
+    backend.set('b', 2, ttl=5)
+    assert backend.get('a') == 1
+    backend.set('c', 3)
+    # 'b' was the least recently used
+    assert backend.get('b') is None
+    clock[0] += 10.5
+    assert backend.get('a') is None
+    assert backend.get('c') is None
+
+
+def test_memory_backend_ttl_never_exceeds_default(clock):
+    backend = MemoryBackend(ttl=10)
+    backend.set('a', 1, ttl=60)
+    clock[0] += 10.5
+    assert backend.get('a') is None
+
+
+def test_redis_backend():
+    client = FakeRedis()
+    backend = RedisBackend(client, ttl=10)
+    backend.set('venue:1', {'name': 'Hop'})
+    backend.set('venue:2', {'name': 'Park'}, ttl=2.5)
+    client.set('other:1', b'kept')
+    assert backend.get('venue:1') == {'name': 'Hop'}
+    client.now = 2.5
+    assert backend.get('venue:2') is None
+    backend.delete('venue:1')
+    assert backend.get('venue:1') is None
+    backend.set('venue:3', [1, 2])
+    backend.clear()
+    assert backend.get('venue:3') is None
+    assert client.get('other:1') == b'kept'
+
+
+def test_null_backend_stores_nothing():
+    backend = NullBackend()
+    backend.set('a', 1)
+    assert backend.get('a') is None
+
+
+def test_get_or_set_counts_hits_and_misses():
+    store = Cache()
+    store.backend = MemoryBackend()
+    builds = []
+    for _ in range(3):
+        assert store.get_or_set('a', lambda: builds.append(1) or 'value') == 'value'
+    assert builds == [1]
+    assert store.get_or_set('missing', lambda: None) is None
+    assert store.get_or_set('missing', lambda: None) is None
+    # entries given no time are not stored
+    assert store.get_or_set('past', lambda: 'value', ttl=lambda value: 0) == 'value'
+    assert store.backend.get('past') is None
+    assert store.stats() == {'hits': 2, 'misses': 4}
+
+
+def test_counters_are_thread_safe():
+    store = Cache()
+    store.backend = MemoryBackend()
+
+    def work():
+        for index in range(2000):
+            store.get_or_set(str(index % 10), lambda: 'value')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.hits + store.misses == 16000
+
+
+def test_detail_page_is_invalidated_on_write(client, sample):
+    venue_id, artist_id = sample['venues'][0], sample['artists'][1]
+    assert client.get(f'/api/v1/venues/{venue_id}').get_json()['upcoming_shows_count'] == 1
+    assert cache.backend.get(venue_key(venue_id)) is not None
+    client.post('/shows/create', data={
+        'venue_id': venue_id, 'artist_id': artist_id,
+        'start_time': f'{datetime.now() + timedelta(days=10):%Y-%m-%d %H:%M:%S}'})
+    assert cache.backend.get(venue_key(venue_id)) is None
+    assert client.get(f'/api/v1/venues/{venue_id}').get_json()['upcoming_shows_count'] == 2
+
+
+def test_detail_page_expires_when_its_next_show_starts(client, sample):
+    venue_id, artist_id = sample['venues'][1], sample['artists'][0]
+    db.session.add(Show(venue_id=venue_id, artist_id=artist_id,
+                        start_time=datetime.now() + timedelta(seconds=.5)))
+    db.session.commit()
+    first = client.get(f'/api/v1/venues/{venue_id}')
+    assert len(first.get_json()['upcoming_shows']) == 1
+    _, expires_at = cache.backend.entries[venue_key(venue_id)]
+    assert expires_at - time.monotonic() <= .5
+
+    time.sleep(.6)
+    second = client.get(f'/api/v1/venues/{venue_id}')
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.get_json()['upcoming_shows'] == []
+    assert len(second.get_json()['past_shows']) == 1
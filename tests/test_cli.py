@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+import click
+from fyyurapp.cli import LazyGroup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_serving_does_not_import_cli_modules():
+    # in a fresh interpreter, as the test session has imported them all
+    code = ('import sys; from fyyurapp import create_app; '
+            "create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}); "
+            "print(*[name for name in ('fyyurapp.bulk', 'fyyurapp.synthetic', "
+            "'fyyurapp.partitions', 'flask_migrate', 'alembic') if name in sys.modules])")
+    result = subprocess.run([sys.executable, '-W', 'error::DeprecationWarning', '-c', code],
+                            capture_output=True, text=True, check=True, cwd=ROOT)
+    assert result.stdout.strip() == ''
+
+
+def test_fyyur_group_loads_its_commands(app):
+    group = app.cli.commands['fyyur']
+    assert isinstance(group, LazyGroup) and isinstance(group, click.Group)
+    result = app.test_cli_runner().invoke(args=['fyyur', '--help'])
+    assert result.exit_code == 0, result.output
+    for command in ('compile-templates', 'export', 'generate', 'import', 'partitions',
+                    'show-conflicts'):
+        assert command in result.output
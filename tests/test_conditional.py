@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+import pytest
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from fyyurapp.counters import roll_show_counts
+from fyyurapp.queries import VENUE_LISTING_ORDER
+
+
+@pytest.fixture
+def shows(app, sample):
+    # 30 upcoming shows after the sample ones, two hours apart.
+    start = datetime.now() + timedelta(days=30)
+    shows = [Show(venue_id=sample['venues'][1], artist_id=sample['artists'][0],
+                  start_time=start + timedelta(hours=2 * index)) for index in range(30)]
+    db.session.add_all(shows)
+    db.session.commit()
+    roll_show_counts()
+    db.session.commit()
+    return [show.id for show in shows]
+
+
+def etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    return response.headers['ETag']
+
+
+def touch(show_id):
+    show = Show.query.get(show_id)
+    show.end_time = show.end_time + timedelta(minutes=15)
+    db.session.commit()
+
+
+def test_venue_listing_ignores_show_changes(client, shows):
+    before = etag(client, '/venues')
+    touch(shows[0])
+    assert etag(client, '/venues') == before
+
+
+def test_venue_listing_changes_with_upcoming_counts(client, sample, shows):
+    before = etag(client, '/venues')
+    client.post('/shows/create', data={
+        'artist_id': sample['artists'][1], 'venue_id': sample['venues'][1],
+        'start_time': f'{datetime.now() + timedelta(days=400):%Y-%m-%d %H:%M:%S}'},
+        follow_redirects=True)
+    assert Venue.query.get(sample['venues'][1]).upcoming_shows_count == 31
+    assert etag(client, '/venues') != before
+
+
+def test_venue_listing_only_checks_its_own_venues(client, sample):
+    first, last = Venue.query.order_by(*VENUE_LISTING_ORDER).all()[::2]
+    before = etag(client, '/venues?per_page=1')
+    last.phone = '5125550199'
+    db.session.commit()
+    assert etag(client, '/venues?per_page=1') == before
+    first.phone = '5125550199'
+    db.session.commit()
+    assert etag(client, '/venues?per_page=1') != before
+
+
+def test_show_listing_ignores_shows_on_other_pages(client, shows):
+    before = etag(client, '/shows?per_page=5')
+    touch(shows[-1])
+    assert etag(client, '/shows?per_page=5') == before
+
+
+def test_show_listing_changes_with_its_own_shows(client, sample, shows):
+    # the sample's upcoming shows come first
+    before = etag(client, '/shows?per_page=5')
+    touch(shows[0])
+    assert etag(client, '/shows?per_page=5') != before
+
+
+def test_show_listing_changes_when_a_show_leaves_its_range(client, shows):
+    before = etag(client, '/shows?per_page=5')
+    db.session.delete(Show.query.get(shows[1]))
+    db.session.commit()
+    assert etag(client, '/shows?per_page=5') != before
+
+
+def test_show_listing_changes_with_its_venues_and_artists(client, sample, shows):
+    before = etag(client, '/shows?per_page=5')
+    Artist.query.get(sample['artists'][0]).image_link = 'https://example.com/a.jpg'
+    db.session.commit()
+    assert etag(client, '/shows?per_page=5') != before
+
+
+def test_deeper_show_pages_have_their_own_range(client, shows):
+    cursor = client.get('/api/v1/shows?per_page=10').get_json()['next']
+    url = f'/shows?per_page=5&after={cursor}'
+    before = etag(client, url)
+    touch(shows[0])
+    assert etag(client, url) == before
+    touch(shows[12])
+    assert etag(client, url) != before
+
+
+def test_api_pages_only_check_their_own_rows(client, sample, shows):
+    before = {url: etag(client, url) for url in
+              ('/api/v1/shows?per_page=5', '/api/v1/shows', '/api/v1/venues?per_page=1')}
+    touch(shows[-1])
+    assert etag(client, '/api/v1/shows?per_page=5') == before['/api/v1/shows?per_page=5']
+    # the whole collection changed
+    assert etag(client, '/api/v1/shows') != before['/api/v1/shows']
+
+    first, last = Venue.query.order_by(*VENUE_LISTING_ORDER).all()[::2]
+    last.phone = '5125550199'
+    db.session.commit()
+    assert etag(client, '/api/v1/venues?per_page=1') == before['/api/v1/venues?per_page=1']
+    first.phone = '5125550199'
+    db.session.commit()
+    assert etag(client, '/api/v1/venues?per_page=1') != before['/api/v1/venues?per_page=1']
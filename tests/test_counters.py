@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from fyyurapp.counters import record_show, refresh_show_counts, roll_show_counts
+
+
+def counts(model, entity_id):
+    # (upcoming, past) as stored, not as cached by the session
+    db.session.expire_all()
+    entity = db.session.get(model, entity_id)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def recounted(model, entity_id, now=None):
+    now = now or datetime.now()
+    column = Show.venue_id if model is Venue else Show.artist_id
+    shows = Show.query.filter(column == entity_id)
+    return (shows.filter(Show.start_time > now).count(),
+            shows.filter(Show.start_time <= now).count())
+
+
+def test_sample_counters_match_shows(app, sample):
+    for model, key in ((Venue, 'venues'), (Artist, 'artists')):
+        for entity_id in sample[key]:
+            assert counts(model, entity_id) == recounted(model, entity_id)
+    assert counts(Venue, sample['venues'][0]) == (1, 1)
+
+
+def test_created_shows_are_counted(client, sample):
+    venue_id, artist_id = sample['venues'][1], sample['artists'][0]
+    for days in (10, -10, 20):
+        client.post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': f'{datetime.now() + timedelta(days=days):%Y-%m-%d %H:%M:%S}'})
+    assert counts(Venue, venue_id) == (2, 1)
+    assert counts(Artist, artist_id) == (3, 1)
+    assert counts(Artist, artist_id) == recounted(Artist, artist_id)
+
+
+def test_record_show_counts_against_now(app, sample):
+    now = datetime(2030, 1, 1)
+    venue_id, artist_id = sample['venues'][1], sample['artists'][1]
+    before = counts(Venue, venue_id), counts(Artist, artist_id)
+    for start_time in (now, now + timedelta(seconds=1)):
+        record_show(Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time), now)
+    db.session.commit()
+    # a show starting at `now` has started
+    assert counts(Venue, venue_id) == (before[0][0] + 1, before[0][1] + 1)
+    assert counts(Artist, artist_id) == (before[1][0] + 1, before[1][1] + 1)
+
+
+def test_deleted_venue_is_uncounted_on_its_artists(client, sample):
+    venue_id, artist_id = sample['venues'][0], sample['artists'][0]
+    assert counts(Artist, artist_id) == (1, 0)
+    client.delete(f'/venues/{venue_id}')
+    assert db.session.get(Venue, venue_id) is None
+    # refreshed by a job once the delete commits
+    assert counts(Artist, artist_id) == (0, 0)
+    assert counts(Artist, sample['artists'][1]) == (1, 0)
+
+
+def test_deleted_and_moved_shows_are_recounted(app, sample):
+    now = datetime.now()
+    venues, artists = sample['venues'], sample['artists']
+    upcoming, past, elsewhere = [db.session.get(Show, id) for id in sample['shows']]
+
+    db.session.delete(past)
+    # to another venue, and into the past
+    upcoming.venue_id = venues[1]
+    upcoming.start_time = now - timedelta(days=1)
+    db.session.commit()
+    assert refresh_show_counts(Venue, [venues[0], venues[1]], now) == 2
+    assert refresh_show_counts(Artist, artists, now) == 2
+    db.session.commit()
+
+    assert counts(Venue, venues[0]) == (0, 0)
+    assert counts(Venue, venues[1]) == (0, 1)
+    assert counts(Venue, venues[2]) == (1, 0)
+    assert counts(Artist, artists[0]) == (0, 1)
+    assert counts(Artist, artists[1]) == (1, 0)
+    assert elsewhere.venue_id == venues[2]
+
+
+def test_roll_moves_started_shows_to_past(app, sample):
+    now = datetime.now()
+    venue_id, artist_id = sample['venues'][1], sample['artists'][1]
+    show = Show(venue_id=venue_id, artist_id=artist_id, start_time=now + timedelta(hours=1))
+    db.session.add(show)
+    record_show(show, now)
+    db.session.commit()
+    assert counts(Venue, venue_id) == (1, 0)
+
+    # nothing started yet
+    assert roll_show_counts(since=now, now=now + timedelta(minutes=30)) == 0
+    later = now + timedelta(hours=2)
+    # only the venue and artist of the show that started are refreshed
+    assert roll_show_counts(since=now, now=later) == 2
+    db.session.commit()
+    assert counts(Venue, venue_id) == (0, 1)
+    assert counts(Artist, artist_id) == recounted(Artist, artist_id, later)
+    # the other venues are left for a full roll
+    assert counts(Venue, sample['venues'][0]) == (1, 1)
+    assert roll_show_counts(now=later) == 5
+
+
+def test_refresh_show_counts_command(app, sample):
+    venue_id = sample['venues'][1]
+    db.session.add(Show(venue_id=venue_id, artist_id=sample['artists'][0],
+                        start_time=datetime.now() - timedelta(minutes=5)))
+    # stale: still counted as upcoming
+    db.session.query(Venue).filter(Venue.id == venue_id).update({'upcoming_shows_count': 1})
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['refresh-show-counts', '--since-minutes', '30'])
+    assert result.exit_code == 0, result.output
+    assert 'Refreshed show counters for 2 venues and artists.' in result.output
+    assert counts(Venue, venue_id) == (0, 1)
+
+    result = runner.invoke(args=['refresh-show-counts'])
+    assert 'Refreshed show counters for 5 venues and artists.' in result.output
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+import babel.dates
+import pytest
+from fyyurapp import DATETIME_FORMATS, datetime_formatter, format_datetime
+
+NAIVE = [datetime(2030, 1, 1, 20), datetime(2030, 7, 4, 9, 5, 30), datetime(2031, 12, 31, 23, 59)]
+ZONES = [timezone.utc, timezone(timedelta(hours=5, minutes=30)), timezone(timedelta(hours=-8))]
+AWARE = [value.replace(tzinfo=zone) for value in NAIVE for zone in ZONES]
+FORMATS = ['full', 'medium', 'yyyy-MM-dd HH:mm zzzz', "EEE d MMM 'at' HH:mm xxx"]
+
+
+def babel_format(value, format, locale):
+    return babel.dates.format_datetime(value, DATETIME_FORMATS.get(format, format), locale=locale)
+
+
+@pytest.mark.parametrize('locale', ['en_US', 'de_DE', 'fr_FR'])
+@pytest.mark.parametrize('format', FORMATS)
+def test_filter_matches_babel(app, format, locale):
+    datetime_formatter.cache_clear()
+    for value in NAIVE + AWARE:
+        expected = babel_format(value, format, locale)
+        # cold, then memoized
+        assert format_datetime(value, format, locale) == expected
+        assert format_datetime(value, format, locale) == expected
+
+
+def test_same_instant_in_other_zones_is_not_mixed_up(app):
+    value = datetime(2030, 1, 1, 20, tzinfo=timezone.utc)
+    shifted = value.astimezone(timezone(timedelta(hours=5, minutes=30)))
+    assert value == shifted
+    format = 'yyyy-MM-dd HH:mm xxx'
+    assert format_datetime(value, format, 'en_US') == '2030-01-01 20:00 +00:00'
+    assert format_datetime(shifted, format, 'en_US') == '2030-01-02 01:30 +05:30'
+
+
+def test_filter_takes_iso_strings_and_the_configured_locale(app):
+    value = datetime(2030, 1, 1, 20)
+    assert format_datetime(value.isoformat()) == babel_format(value, 'medium', 'en_US')
+    app.config['DATETIME_LOCALE'] = 'de_DE'
+    with app.test_request_context():
+        assert format_datetime(value, 'full') == babel_format(value, 'full', 'de_DE')
+
+
+def test_template_filter(app):
+    value = datetime(2030, 1, 1, 20)
+    with app.test_request_context():
+        rendered = app.jinja_env.from_string("{{ value|datetime('full') }}").render(value=value)
+    assert rendered == babel_format(value, 'full', 'en_US') == 'Tuesday January, 1, 2030 at 8:00PM'
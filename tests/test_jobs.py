@@ -0,0 +1,158 @@
+import threading
+import pytest
+from fyyurapp import db
+from fyyurapp.jobs import Executor, Job, after_commit, get_executor
+from fyyurapp.metrics import registry
+
+
+class Clock:
+    # Stands in for Executor.stopping: records the backoff waits instead
+    # of sleeping through them.
+
+    def __init__(self):
+        self.waits = []
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        return False
+
+    def set(self):
+        pass
+
+
+@pytest.fixture
+def metrics():
+    registry.reset()
+    yield lambda name, labels: registry.collect().counters.get((name, labels), 0)
+    registry.reset()
+
+
+@pytest.fixture
+def executor(app):
+    app.config.update(JOBS_MAX_RETRIES=3, JOBS_RETRY_BACKOFF=.5)
+    executor = Executor(app)
+    executor.stopping = Clock()
+    return executor
+
+
+def flaky(failures):
+    # A job failing its first `failures` calls.
+    calls = []
+
+    def job():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise RuntimeError('try again')
+
+    job.calls = calls
+    return job
+
+
+def test_failed_job_is_retried_with_backoff(executor, metrics):
+    job = flaky(2)
+    executor.run(Job(job, (), {}, 0))
+    assert len(job.calls) == 3
+    assert executor.stopping.waits == [.5, 1]
+    assert metrics('fyyur_job_retries_total', ('job',)) == 2
+    assert metrics('fyyur_jobs_finished_total', ('job', 'ok')) == 1
+    assert executor.running == 0
+
+
+def test_retries_stop_after_max_retries(executor, metrics):
+    job = flaky(10)
+    executor.run(Job(job, (), {}, 0))
+    assert len(job.calls) == 4
+    assert executor.stopping.waits == [.5, 1, 2]
+    assert metrics('fyyur_job_retries_total', ('job',)) == 3
+    assert metrics('fyyur_jobs_finished_total', ('job', 'failed')) == 1
+    assert executor.running == 0
+
+
+def test_job_runs_after_commit(app, sample):
+    calls = []
+    after_commit(calls.append, 'committed')
+    db.session.execute(db.text('SELECT 1'))
+    assert calls == []
+    db.session.commit()
+    assert calls == ['committed']
+
+
+def test_rolled_back_job_never_runs(app, sample):
+    calls = []
+    after_commit(calls.append, 'rolled back')
+    db.session.rollback()
+    # a later transaction does not pick it up
+    after_commit(calls.append, 'committed')
+    db.session.commit()
+    db.session.commit()
+    assert calls == ['committed']
+    assert get_executor(app).stats()['queued'] == 0
+
+
+def blocking_executor(app, workers=1, queue_size=10):
+    app.config.update(JOBS_WORKERS=workers, JOBS_QUEUE_SIZE=queue_size)
+    executor = Executor(app)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    return executor, block, started, release
+
+
+def test_drain_waits_for_running_jobs(app):
+    executor, block, started, release = blocking_executor(app)
+    done = []
+    executor.submit(block)
+    executor.submit(done.append, 'queued')
+    assert started.wait(5)
+
+    result = []
+    drain = threading.Thread(target=lambda: result.append(executor.shutdown(timeout=5)))
+    drain.start()
+    drain.join(.2)
+    # still waiting for the running job
+    assert drain.is_alive()
+    release.set()
+    drain.join(5)
+    assert result == [0]
+    assert done == ['queued']
+    # closed: later jobs run in the caller
+    executor.submit(done.append, 'inline')
+    assert done == ['queued', 'inline']
+
+
+def test_drain_gives_up_after_timeout(app):
+    executor, block, started, release = blocking_executor(app)
+    executor.submit(block)
+    assert started.wait(5)
+    assert executor.shutdown(timeout=.1) == 1
+    release.set()
+
+
+def test_queue_depth_metrics(app, client, metrics):
+    executor, block, started, release = blocking_executor(app, queue_size=2)
+    app.extensions['jobs'] = executor
+    done = []
+    executor.submit(block)
+    assert started.wait(5)
+    executor.submit(done.append, 1)
+    executor.submit(done.append, 2)
+    assert executor.stats() == {'queued': 2, 'running': 1, 'workers': 1, 'queue_size': 2}
+    page = client.get('/metrics').get_data(as_text=True)
+    assert 'fyyur_jobs_queued 2\n' in page
+    assert 'fyyur_jobs_running 1\n' in page
+    assert 'fyyur_jobs_queue_size 2\n' in page
+
+    # the queue is full, so this one runs in the caller
+    executor.submit(done.append, 3)
+    assert done == [3]
+    assert metrics('fyyur_jobs_inline_total', ('append',)) == 1
+    assert metrics('fyyur_jobs_submitted_total', ('append',)) == 3
+
+    release.set()
+    assert executor.shutdown(timeout=5) == 0
+    assert sorted(done) == [1, 2, 3]
+    assert executor.stats()['queued'] == executor.stats()['running'] == 0
@@ -0,0 +1,110 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from fyyurapp import db
+from fyyurapp.models import Show
+from fyyurapp.api import LISTING_FIELDS
+
+
+@pytest.fixture
+def shows(sample):
+    # Ten shows in all, four sharing a start time, so chunks break inside
+    # runs of equal start times.
+    start = datetime(2030, 1, 1, 20)
+    db.session.add_all([Show(venue_id=sample['venues'][index % 3],
+                             artist_id=sample['artists'][index % 2],
+                             start_time=start + timedelta(days=index // 4))
+                        for index in range(7)])
+    db.session.commit()
+    return [show.id for show in Show.query.order_by(Show.start_time, Show.id)]
+
+
+@pytest.fixture
+def chunk_reads(app):
+    # SELECTs reading a chunk of a listing (not the version check).
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT') and 'LIMIT' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def walk(client, url):
+    # Every item of a listing, read page by page.
+    items, cursor = [], {}
+    while True:
+        body = client.get(url, query_string=dict(per_page=3, **cursor)).get_json()
+        items += body['data']
+        if not body['next']:
+            return items
+        cursor = {'after': body['next']}
+
+
+@pytest.mark.parametrize('kind', ['venues', 'artists', 'shows'])
+def test_collection_is_streamed_as_json_array(client, shows, kind):
+    response = client.get(f'/api/v1/{kind}')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/json'
+    items = json.loads(response.get_data(as_text=True))
+    assert items == walk(client, f'/api/v1/{kind}')
+    assert all(tuple(item) == LISTING_FIELDS[kind] for item in items)
+
+
+@pytest.mark.parametrize('request_args', [
+    {'query_string': {'format': 'ndjson'}},
+    {'headers': {'Accept': 'application/x-ndjson'}},
+])
+def test_collection_is_streamed_as_ndjson(client, shows, request_args):
+    response = client.get('/api/v1/shows', **request_args)
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n')
+    items = [json.loads(line) for line in body.splitlines()]
+    assert [item['id'] for item in items] == shows
+    assert items == client.get('/api/v1/shows').get_json()
+
+
+def test_browsers_still_get_a_json_array(client, shows):
+    response = client.get('/api/v1/shows', headers={
+        'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8'})
+    assert response.mimetype == 'application/json'
+
+
+@pytest.mark.parametrize('chunk_size, statements', [(1, 11), (3, 4), (5, 3), (10, 2), (1000, 1)])
+def test_stream_reads_in_keyset_chunks(app, client, shows, chunk_reads, chunk_size, statements):
+    app.config['API_STREAM_CHUNK_SIZE'] = chunk_size
+    del chunk_reads[:]
+    response = client.get('/api/v1/shows?format=ndjson')
+    ids = [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+    # each item once, in order, whichever chunk it came in
+    assert ids == shows
+    # a full last chunk costs one more (empty) read
+    assert len(chunk_reads) == statements
+
+
+def test_empty_collection(client, app):
+    assert client.get('/api/v1/shows').get_data(as_text=True) == '[]'
+    assert client.get('/api/v1/shows?format=ndjson').get_data(as_text=True) == ''
+
+
+def test_fields_narrow_items(client, shows):
+    items = client.get('/api/v1/shows?fields=id, start_time').get_json()
+    assert [tuple(item) for item in items] == [('id', 'start_time')] * len(shows)
+    assert items[-1] == {'id': shows[-1], 'start_time': '2030-01-02T20:00:00'}
+    page = client.get('/api/v1/venues?fields=name&per_page=2').get_json()
+    assert [tuple(item) for item in page['data']] == [('name',), ('name',)]
+
+
+@pytest.mark.parametrize('query', ['fields=id,nope,zip', 'fields=id,nope,zip&per_page=2',
+                                   'fields=nope,zip&format=ndjson'])
+def test_unknown_fields_are_rejected(client, shows, query):
+    response = client.get(f'/api/v1/shows?{query}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unknown fields: nope, zip'}
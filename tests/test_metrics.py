@@ -0,0 +1,107 @@
+import gc
+import re
+import threading
+import pytest
+from fyyurapp.metrics import registry, LATENCY_BUCKETS
+
+SAMPLE = re.compile(r'^(\w+)(\{.*\})? (\S+)$')
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    # collected first, so no thread of an earlier test retires into it
+    gc.collect()
+    registry.reset()
+    yield
+    gc.collect()
+    registry.reset()
+
+
+def scrape(client):
+    # {(name, labels): value} of a /metrics page
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, labels, value = SAMPLE.match(line).groups()
+            samples[name, labels or ''] = float(value)
+    return samples
+
+
+def buckets(samples, name, labels):
+    # The cumulative bucket counts of a histogram, ending with +Inf.
+    return [samples[f'{name}_bucket', '{' + labels + f',le="{bound}"' + '}']
+            for bound in LATENCY_BUCKETS + ('+Inf',)]
+
+
+def test_requests_are_counted(client, sample):
+    for url in ('/venues', '/venues', '/nope'):
+        client.get(url)
+    samples = scrape(client)
+
+    assert samples['fyyur_responses_total', '{endpoint="venues.index",status="200"}'] == 2
+    assert samples['fyyur_responses_total', '{endpoint="none",status="404"}'] == 1
+    labels = 'endpoint="venues.index",method="GET"'
+    counts = buckets(samples, 'fyyur_request_duration_seconds', labels)
+    assert counts == sorted(counts)
+    assert counts[-1] == samples['fyyur_request_duration_seconds_count', '{' + labels + '}'] == 2
+    assert samples['fyyur_request_duration_seconds_sum', '{' + labels + '}'] > 0
+    assert samples['fyyur_template_render_seconds_count', '{template="pages/venues.html"}'] == 2
+    # the scrape itself is still in flight
+    assert samples['fyyur_requests_started_total', ''] == 4
+    assert samples['fyyur_requests_finished_total', ''] == 3
+    assert samples['fyyur_requests_in_flight', ''] == 1
+
+
+def test_requests_from_many_threads_are_merged(app):
+    def work():
+        client = app.test_client()
+        for _ in range(25):
+            client.get('/nope')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    samples = scrape(app.test_client())
+    assert samples['fyyur_responses_total', '{endpoint="none",status="404"}'] == 200
+    assert samples['fyyur_request_duration_seconds_count', '{endpoint="none",method="GET"}'] == 200
+
+
+def test_live_and_finished_shards_are_merged(client):
+    release = threading.Event()
+    recorded = threading.Barrier(7)
+
+    def work(wait):
+        registry.inc('fyyur_errors_total', ('500',), 2)
+        registry.observe('fyyur_job_wait_seconds', .003, ('audit',))
+        registry.observe('fyyur_job_wait_seconds', 3, ('audit',))
+        recorded.wait(5)
+        if wait:
+            release.wait(5)
+
+    waiting = [threading.Thread(target=work, args=(True,)) for _ in range(3)]
+    finished = [threading.Thread(target=work, args=(False,)) for _ in range(3)]
+    for thread in waiting + finished:
+        thread.start()
+    recorded.wait(5)
+    for thread in finished:
+        thread.join()
+    # gone threads have their shards folded into `retired`
+    del finished, thread
+    gc.collect()
+    assert registry.retired.counters == {('fyyur_errors_total', ('500',)): 6}
+
+    samples = scrape(client)
+    assert samples['fyyur_errors_total', '{status="500"}'] == 12
+    counts = buckets(samples, 'fyyur_job_wait_seconds', 'job="audit"')
+    assert counts[0] == 6 and counts[-2] == counts[-1] == 12
+    assert samples['fyyur_job_wait_seconds_sum', '{job="audit"}'] == pytest.approx(6 * 3.003)
+
+    release.set()
+    for thread in waiting:
+        thread.join()
+    assert scrape(client)['fyyur_errors_total', '{status="500"}'] == 12
@@ -0,0 +1,68 @@
+import importlib.util
+import pathlib
+from datetime import datetime
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+VERSIONS = pathlib.Path(__file__).resolve().parent.parent / 'migrations' / 'versions'
+
+
+def migration(revision):
+    spec = importlib.util.spec_from_file_location(f'migration_{revision}',
+                                                  VERSIONS / f'{revision}_.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(conn, revision, step='upgrade'):
+    with Operations.context(MigrationContext.configure(conn)):
+        getattr(migration(revision), step)()
+
+
+@pytest.mark.parametrize('value, names', [
+    ('Jazz,Folk', ['Jazz', 'Folk']),
+    (' Jazz , Folk ,', ['Jazz', 'Folk']),
+    ('Jazz', ['Jazz']),
+    ('J,a,z,z', ['Jazz']),
+    ('R,&,B', ['R&B']),
+    ('M,u,s,i,c,a,l, ,T,h,e,a,t,r,e', ['Musical Theatre']),
+    ('', []),
+    (None, []),
+])
+def test_genre_names(value, names):
+    assert migration('21e3ceae66ed').genre_names(value) == names
+
+
+def legacy_row(index, genres, **extra):
+    return dict(id=index, name=f'Legacy {index}', city='Austin', state='TX', genres=genres,
+                created_at=datetime(2022, 1, 1), **extra)
+
+
+def test_upgrade_backfills_legacy_genres():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as conn:
+        run(conn, 'f7add7f03652')
+        metadata = sa.MetaData()
+        venue = sa.Table('Venue', metadata, autoload_with=conn)
+        artist = sa.Table('Artist', metadata, autoload_with=conn)
+        conn.execute(venue.insert(), [
+            legacy_row(index, genres, address='1 st', seeking_talent=False)
+            for index, genres in enumerate(['Jazz,Folk', 'J,a,z,z', 'R,&,B'], 1)])
+        conn.execute(artist.insert(), [
+            legacy_row(index, genres, seeking_venue=False)
+            for index, genres in enumerate(['H,i,p,-,H,o,p', 'Folk,Jazz,Folk'], 1)])
+        run(conn, '21e3ceae66ed')
+
+        def genres(link, key):
+            return conn.execute(sa.text(
+                f'SELECT l.{key}, g.name FROM {link} l JOIN "Genre" g ON g.id = l.genre_id '
+                f'ORDER BY l.{key}, g.name')).fetchall()
+
+        assert sorted(name for name, in conn.execute(sa.text('SELECT name FROM "Genre"'))) == [
+            'Folk', 'Hip-Hop', 'Jazz', 'R&B']
+        assert genres('venue_genres', 'venue_id') == [
+            (1, 'Folk'), (1, 'Jazz'), (2, 'Jazz'), (3, 'R&B')]
+        assert genres('artist_genres', 'artist_id') == [(1, 'Hip-Hop'), (2, 'Folk'), (2, 'Jazz')]
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+import pytest
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from fyyurapp.queries import show_listing_query, SHOW_LISTING_ORDER
+from fyyurapp.pagination import keyset_page, iter_keyset, encode_cursor, decode_cursor
+from tests.conftest import query_count
+
+START = datetime(2030, 1, 1, 20)
+
+
+@pytest.fixture
+def listings(app):
+    # Rows sharing sort keys (venue names and cities, artist names, show
+    # start times), so pages break inside runs of equal values.
+    venues = [Venue(name=f'Venue {index % 4}', city=['Austin', 'Boston'][index % 2], state='TX',
+                    address='1 st', genres=[]) for index in range(23)]
+    artists = [Artist(name=f'Artist {index % 3}', city='Austin', state='TX', genres=[])
+               for index in range(23)]
+    db.session.add_all(venues + artists)
+    db.session.commit()
+    db.session.add_all([Show(venue_id=venues[index].id, artist_id=artists[index].id,
+                             start_time=START + timedelta(days=index // 5))
+                        for index in range(23)])
+    db.session.commit()
+
+
+def walk(client, url, per_page, direction='next'):
+    # Follows the cursors of /api/v1 listing pages, returning their items.
+    pages = []
+    cursor = {}
+    while True:
+        body = client.get(url, query_string=dict(per_page=per_page, **cursor)).get_json()
+        pages.append(body['data'])
+        if not body[direction]:
+            return pages
+        cursor = {'after' if direction == 'next' else 'before': body[direction]}
+
+
+@pytest.mark.parametrize('kind', ['venues', 'artists', 'shows'])
+@pytest.mark.parametrize('per_page', [1, 5, 7, 23, 100])
+def test_pages_cover_listing_once(client, listings, kind, per_page):
+    everything = client.get(f'/api/v1/{kind}').get_json()
+    pages = walk(client, f'/api/v1/{kind}', per_page)
+
+    assert [len(page) for page in pages[:-1]] == [per_page] * (len(pages) - 1)
+    assert 0 < len(pages[-1]) <= per_page
+    ids = [item['id'] for page in pages for item in page]
+    assert ids == [item['id'] for item in everything]
+    assert len(ids) == len(set(ids)) == 23
+
+
+def test_prev_cursors_walk_back(client, listings):
+    pages = walk(client, '/api/v1/shows', 5)
+    last = client.get('/api/v1/shows', query_string={'per_page': 5, 'after': client.get(
+        '/api/v1/shows', query_string={'per_page': 20}).get_json()['next']}).get_json()
+    assert last['data'] == pages[-1]
+
+    back = [last['data']]
+    cursor = last['prev']
+    while cursor:
+        body = client.get('/api/v1/shows', query_string={'per_page': 5, 'before': cursor}).get_json()
+        back.append(body['data'])
+        cursor = body['prev']
+    ids = [item['id'] for page in reversed(back) for item in page]
+    assert ids == [item['id'] for page in pages for item in page]
+
+
+def test_page_size_is_capped(app, client, listings):
+    app.config['MAX_PAGE_SIZE'] = 10
+    assert len(client.get('/api/v1/venues?per_page=500').get_json()['data']) == 10
+    assert len(client.get('/api/v1/venues?per_page=0').get_json()['data']) == 10
+    app.config['PAGE_SIZE'] = 4
+    assert len(client.get('/api/v1/venues?after=').get_json()['data']) == 4
+
+
+def test_invalid_cursor_starts_over(client, listings):
+    first = client.get('/api/v1/shows?per_page=3').get_json()
+    assert client.get('/api/v1/shows?per_page=3&after=not-a-cursor').get_json() == first
+
+
+def test_decode_cursor_checks_value_types(app):
+    columns = SHOW_LISTING_ORDER
+    start = START.isoformat()
+    assert decode_cursor(encode_cursor([START, 7]), columns) == [START, 7]
+    for values in [[{'a': 1}, 1], [start, 'a'], [start, 1.5], [start, True], [1, 1], [start]]:
+        assert decode_cursor(encode_cursor(values), columns) is None, values
+
+
+@pytest.mark.parametrize('kind', ['venues', 'artists', 'shows'])
+def test_forged_cursor_starts_over(client, listings, kind):
+    first = client.get(f'/api/v1/{kind}?per_page=3').get_json()
+    for values in [[{'a': 1}, 1, 'a', 1], [[1], 'a'], ['a', 'b', 'c', 'd']]:
+        for direction in ('after', 'before'):
+            response = client.get(f'/api/v1/{kind}', query_string={
+                'per_page': 3, direction: encode_cursor(values)})
+            assert response.status_code == 200
+            assert response.get_json() == first
+
+
+def test_keyset_page_across_equal_start_times(app, listings):
+    seen = []
+    page = keyset_page(show_listing_query(), SHOW_LISTING_ORDER, per_page=3)
+    while True:
+        seen.extend(row.id for row in page.items)
+        if not page.next:
+            break
+        page = keyset_page(show_listing_query(), SHOW_LISTING_ORDER, after=page.next, per_page=3)
+    assert seen == [row.id for row in iter_keyset(show_listing_query(), SHOW_LISTING_ORDER, 4)]
+    assert sorted(seen) == sorted(set(seen)) and len(seen) == 23
+
+
+@pytest.mark.parametrize('url', ['/venues', '/artists', '/shows'])
+def test_listing_pages_cost_the_same_deep_down(client, listings, url):
+    first = client.get(url, query_string={'per_page': 5})
+    cursor = client.get(f'/api/v1{url}', query_string={'per_page': 20}).get_json()['next']
+    deep = client.get(url, query_string={'per_page': 5, 'after': cursor})
+    assert first.status_code == deep.status_code == 200
+    assert query_count(first) == query_count(deep)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from fyyurapp import db
+from fyyurapp.models import Venue, Show
+from fyyurapp.partitions import (add_months, month_start, partition_name, archive_rows,
+                                 is_partitioned, ARCHIVED_PREFIX, ARCHIVE_TABLE)
+
+
+def test_add_months():
+    assert add_months(datetime(2026, 1, 1), 1) == datetime(2026, 2, 1)
+    assert add_months(datetime(2026, 11, 1), 3) == datetime(2027, 2, 1)
+    assert add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+    assert add_months(datetime(2026, 3, 1), -27) == datetime(2023, 12, 1)
+    assert add_months(datetime(2026, 3, 1), 0) == datetime(2026, 3, 1)
+
+
+def test_month_start_and_partition_name():
+    assert month_start(datetime(2026, 7, 31, 23, 59)) == datetime(2026, 7, 1)
+    assert partition_name(datetime(2026, 7, 1)) == 'Show_p2026_07'
+    assert partition_name(datetime(2026, 7, 1), ARCHIVED_PREFIX) == 'Show_archived_2026_07'
+
+
+def archived_count():
+    return db.session.execute(db.text(f'SELECT count(*) FROM "{ARCHIVE_TABLE}"')).scalar()
+
+
+def add_old_shows(sample, count=3):
+    start = datetime.now() - timedelta(days=120)
+    db.session.add_all([Show(venue_id=sample['venues'][0], artist_id=sample['artists'][0],
+                             start_time=start + timedelta(days=index)) for index in range(count)])
+    db.session.commit()
+
+
+def test_archive_rows_moves_old_shows(app, sample):
+    add_old_shows(sample)
+    assert not is_partitioned()
+    before = datetime.now() - timedelta(days=30)
+    assert archive_rows(before) == 3
+    assert archived_count() == 3
+    assert Show.query.filter(Show.start_time < before).count() == 0
+    assert Show.query.count() == 3
+    # nothing left to move
+    assert archive_rows(before) == 0
+    assert archived_count() == 3
+
+
+def test_partitions_command_archives_on_sqlite(app, sample):
+    add_old_shows(sample)
+    assert Venue.query.get(sample['venues'][0]).past_shows_count == 1
+    db.session.query(Venue).update({'past_shows_count': 4})
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['fyyur', 'partitions', '--retention', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Show is not partitioned' in result.output
+    assert 'Archived 3 shows before' in result.output
+    assert archived_count() == 3
+    # archived shows no longer count as past shows
+    assert Venue.query.get(sample['venues'][0]).past_shows_count == 1
+
+
+def test_partitions_command_keeps_everything_by_default(app, sample):
+    add_old_shows(sample)
+    result = app.test_cli_runner().invoke(args=['fyyur', 'partitions'])
+    assert result.exit_code == 0, result.output
+    assert 'Archived' not in result.output
+    assert Show.query.count() == 6
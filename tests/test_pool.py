@@ -0,0 +1,44 @@
+import logging
+import pytest
+from sqlalchemy import create_engine, exc
+from fyyurapp.pool import TimedQueuePool, pool_stats
+
+
+@pytest.fixture
+def stats():
+    pool_stats.reset()
+    yield pool_stats
+    pool_stats.reset()
+
+
+def timed_engine(tmp_path, name, **options):
+    return create_engine(f'sqlite:///{tmp_path / name}.db', poolclass=TimedQueuePool,
+                         pool_size=1, max_overflow=0, pool_timeout=.1, **options)
+
+
+def test_slow_waits_are_logged_per_engine(tmp_path, caplog, stats):
+    logs = logging.getLogger('fyyur.test.slow'), logging.getLogger('fyyur.test.other')
+    slow = timed_engine(tmp_path, 'slow', slow_wait=0, wait_logger=logs[0], log_interval=0)
+    other = timed_engine(tmp_path, 'other', slow_wait=60, wait_logger=logs[1])
+    assert slow.pool.slow_wait == 0 and other.pool.slow_wait == 60
+
+    with caplog.at_level(logging.WARNING):
+        for engine in (slow, other):
+            engine.connect().close()
+    assert [record.name for record in caplog.records] == ['fyyur.test.slow']
+    assert caplog.records[0].getMessage().startswith('db pool wait')
+    assert stats.snapshot()['checkouts'] == 2
+
+    # kept when the pool is recreated, e.g. by Engine.dispose()
+    slow.dispose()
+    assert (slow.pool.slow_wait, slow.pool.wait_logger) == (0, logs[0])
+
+
+def test_exhausted_pool_is_logged(tmp_path, caplog, stats):
+    engine = timed_engine(tmp_path, 'busy', wait_logger=logging.getLogger('fyyur.test.busy'))
+    with engine.connect(), caplog.at_level(logging.ERROR):
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    assert [record.getMessage().split(':')[0] for record in caplog.records] == [
+        'db pool exhausted']
+    assert stats.snapshot()['timeouts'] == 1
@@ -0,0 +1,89 @@
+import os
+import pytest
+from sqlalchemy import event
+from fyyurapp import create_app, db
+from fyyurapp.models import Show
+from fyyurapp.synthetic import generate
+
+# These run against a scratch PostgreSQL database named by
+# TEST_DATABASE_URL (its tables are dropped and recreated), with the
+# pg_trgm and btree_gist extensions available.
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+
+@pytest.fixture(scope='module')
+def pg_app(tmp_path_factory):
+    pytest.importorskip('psycopg2')
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL,
+        'LOG_FILE': str(tmp_path_factory.mktemp('log') / 'fyyur.log'),
+        'CACHE_BACKEND': 'null',
+        'JOBS_WORKERS': 0,
+    })
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(5000)
+        db.session.commit()
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def busiest(column):
+    return db.session.query(column).group_by(column).order_by(db.func.count().desc()).limit(1).scalar()
+
+
+def query_plans(client, method, url, data=None):
+    # Runs the request, then EXPLAINs every SELECT it sent. Sequential
+    # scans are turned off for the EXPLAIN: on a table this small the
+    # planner would rather read it whole, and the point is whether an
+    # index can serve the query.
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = getattr(client, method)(url, data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert response.status_code == 200
+
+    plans = []
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql('SET enable_seqscan = off')
+        for statement, parameters in statements:
+            plans.append('\n'.join(row[0] for row in conn.exec_driver_sql(
+                'EXPLAIN ' + statement, parameters)))
+    return plans
+
+
+# (method, url, indexes of which one must serve the page). The shows of a
+# venue or an artist may also be found through the GiST index behind its
+# no-overlap constraint.
+PAGES = [
+    ('get', '/venues', ['ix_Venue_city_state_name_id']),
+    ('get', '/artists', ['ix_Artist_name_id']),
+    ('get', '/shows', ['ix_Show_start_time_id']),
+    ('get', '/venues/{venue}', ['ix_Show_venue_id_start_time', 'Show_venue_id_no_overlap']),
+    ('get', '/artists/{artist}', ['ix_Show_artist_id_start_time', 'Show_artist_id_no_overlap']),
+    ('post', '/venues/search', ['ix_venue_name_trgm']),
+    ('post', '/artists/search', ['ix_artist_name_trgm']),
+]
+
+
+@pytest.mark.parametrize('method, url, indexes', PAGES)
+def test_pages_use_indexes(pg_app, method, url, indexes):
+    url = url.format(venue=busiest(Show.venue_id), artist=busiest(Show.artist_id))
+    plans = query_plans(pg_app.test_client(), method, url, data={'search_term': 'velvet'})
+    report = '\n\n'.join(plans)
+    assert any(index in plan for plan in plans for index in indexes), report
+    assert not any('Seq Scan' in plan for plan in plans), report
@@ -0,0 +1,45 @@
+import json
+import pytest
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist
+from fyyurapp.profiling import QueryBudgetExceeded, query_budget
+from tests.conftest import query_count
+
+
+def add_view(app, budget):
+    @app.route('/two-queries')
+    @query_budget(budget)
+    def two_queries():
+        Venue.query.count()
+        Artist.query.count()
+        return 'ok'
+
+
+def test_view_within_budget(app, client):
+    add_view(app, 2)
+    response = client.get('/two-queries')
+    assert response.status_code == 200
+    assert query_count(response) == 2
+
+
+def test_view_over_budget_raises_under_testing(app, client):
+    add_view(app, 1)
+    with pytest.raises(QueryBudgetExceeded, match='ran 2 queries, over its budget of 1'):
+        client.get('/two-queries')
+
+
+def test_view_over_budget_logs_when_not_strict(app, client, caplog):
+    app.config['QUERY_BUDGET_STRICT'] = False
+    add_view(app, 1)
+    response = client.get('/two-queries')
+    assert response.status_code == 200
+    assert 'over its budget of 1' in caplog.text
+
+
+def test_requests_are_logged_as_json(app, client, sample):
+    client.get('/venues')
+    with open(app.config['LOG_FILE']) as log:
+        records = [json.loads(line) for line in log]
+    record = next(record for record in records if record.get('path') == '/venues')
+    assert record['status'] == 200
+    assert record['queries'] >= 1
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show, Genre
+from fyyurapp.counters import roll_show_counts
+from tests.conftest import query_count
+
+
+def add_shows(sample, count):
+    # More venues, artists and shows around the sample venue and artist,
+    # to check that page costs do not grow with them.
+    now = datetime.now()
+    genre = Genre.query.first()
+    venues = [Venue(name=f'Venue {index}', city='Austin', state='TX', address='1 st',
+                    genres=[genre]) for index in range(count)]
+    artists = [Artist(name=f'Artist {index}', city='Austin', state='TX', genres=[genre])
+               for index in range(count)]
+    db.session.add_all(venues + artists)
+    db.session.flush()
+    for index, (venue, artist) in enumerate(zip(venues, artists)):
+        when = now + timedelta(days=index - count // 2, hours=1)
+        db.session.add_all([
+            Show(venue_id=sample['venues'][0], artist_id=artist.id, start_time=when),
+            Show(venue_id=venue.id, artist_id=sample['artists'][1], start_time=when),
+        ])
+    db.session.commit()
+    roll_show_counts()
+    db.session.commit()
+
+
+# (url, queries): the conditional GET version check, the page's data and,
+# for detail pages, the entity's genres
+PAGES = [
+    ('/venues', 2),
+    ('/artists', 2),
+    ('/shows', 2),
+    ('/venues/{venue}', 3),
+    ('/artists/{artist}', 3),
+]
+
+
+def page_url(url, sample):
+    return url.format(venue=sample['venues'][0], artist=sample['artists'][1])
+
+
+@pytest.mark.parametrize('url, queries', PAGES)
+def test_page_queries(client, sample, url, queries):
+    response = client.get(page_url(url, sample))
+    assert response.status_code == 200
+    assert query_count(response) == queries
+
+
+@pytest.mark.parametrize('url, queries', PAGES)
+def test_page_queries_do_not_grow_with_shows(client, sample, url, queries):
+    add_shows(sample, 30)
+    response = client.get(page_url(url, sample))
+    assert response.status_code == 200
+    assert query_count(response) == queries
+
+
+@pytest.mark.parametrize('url', ['/venues/{venue}', '/artists/{artist}'])
+def test_cached_detail_page_only_checks_version(client, sample, url):
+    client.get(page_url(url, sample))
+    assert query_count(client.get(page_url(url, sample))) == 1
+
+
+@pytest.fixture
+def rows_fetched():
+    # Rows each ORM SELECT returned, in order.
+    rows = []
+
+    def count(state):
+        if not state.is_select:
+            return None
+        result = state.invoke_statement().freeze()
+        rows.append(len(result().all()))
+        return result()
+
+    event.listen(Session, 'do_orm_execute', count)
+    yield rows
+    event.remove(Session, 'do_orm_execute', count)
+
+
+@pytest.mark.parametrize('url, limit', [
+    ('/venues/{venue}', 'DETAIL_SHOWS_LIMIT'),
+    ('/artists/{artist}', 'DETAIL_SHOWS_LIMIT'),
+    ('/venues/{venue}?all_shows=1', 'DETAIL_ALL_SHOWS_LIMIT'),
+    ('/artists/{artist}?all_shows=1', 'DETAIL_ALL_SHOWS_LIMIT'),
+])
+def test_detail_page_rows_do_not_grow_with_shows(app, client, sample, rows_fetched, url, limit):
+    add_shows(sample, 30)
+    app.config[limit] = 5
+    del rows_fetched[:]
+    response = client.get(page_url(url, sample))
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert page.count('<h6>') == 10
+    assert ('See all shows' in page) == ('all_shows' not in url)
+    # the version check, 5 past and 5 upcoming shows, and up to two genres
+    assert sum(rows_fetched) <= 13
+
+
+def test_venue_page_lists_shows(client, sample):
+    add_shows(sample, 4)
+    page = client.get(f"/venues/{sample['venues'][0]}").get_data(as_text=True)
+    assert 'Guns N Petals' in page
+    assert 'Artist 0' in page and 'Artist 3' in page
+
+
+@pytest.mark.parametrize('url', ['/venues/search', '/artists/search'])
+def test_search_counts_come_with_the_rows(client, sample, url):
+    add_shows(sample, 30)
+    response = client.post(url, data={'search_term': 'a'})
+    assert response.status_code == 200
+    assert query_count(response) == 1
+
+
+def test_search_upcoming_show_counts(client, sample):
+    results = client.get('/api/v1/venues/search?q=hop').get_json()
+    assert [(item['name'], item['num_upcoming_shows']) for item in results['data']] == [
+        ('The Musical Hop', 1)]
+    results = client.get('/api/v1/artists/search?q=sax').get_json()
+    assert [(item['name'], item['num_upcoming_shows']) for item in results['data']] == [
+        ('The Wild Sax Band', 1)]
@@ -0,0 +1,77 @@
+import threading
+import pytest
+from fyyurapp import create_app, db
+from fyyurapp.models import Venue
+from fyyurapp.replicas import ReplicaSet, get_replicas
+
+
+@pytest.fixture
+def app(tmp_path):
+    # The primary is in memory; the replica is a SQLite file holding one
+    # venue the primary does not have.
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'WTF_CSRF_ENABLED': False,
+        'LOG_FILE': str(tmp_path / 'fyyur.log'),
+        'JOBS_WORKERS': 0,
+        'DB_REPLICA_URLS': [f'sqlite:///{tmp_path / "replica.db"}'],
+    })
+    with app.app_context():
+        db.create_all()
+        replica = get_replicas(db, app).replicas[0]
+        db.metadata.create_all(replica.engine)
+        with replica.engine.begin() as connection:
+            connection.execute(Venue.__table__.insert(), {
+                'name': 'Replica Hall', 'city': 'Austin', 'state': 'TX', 'address': '1 st'})
+        yield app
+        db.session.remove()
+
+
+def venue_names(client):
+    return [venue['name'] for venue in client.get('/api/v1/venues').get_json()]
+
+
+def test_reads_go_to_the_replica(client):
+    assert venue_names(client) == ['Replica Hall']
+
+
+def test_writes_and_reads_after_them_go_to_the_primary(client):
+    client.post('/venues/create', data={
+        'name': 'Primary Hall', 'city': 'Austin', 'state': 'TX', 'address': '2 st',
+        'phone': '5125550100', 'genres': 'Jazz', 'facebook_link': '', 'image_link': '',
+        'seeking_description': '', 'website_link': ''})
+    assert venue_names(client) == ['Primary Hall']
+
+
+def test_replica_is_picked_once_per_request(app, client, monkeypatch):
+    picks = []
+    pick = ReplicaSet.pick
+    monkeypatch.setattr(ReplicaSet, 'pick', lambda self: picks.append(1) or pick(self))
+    response = client.get('/venues')
+    assert response.status_code == 200
+    assert 'Replica Hall' in response.get_data(as_text=True)
+    assert len(picks) == 1
+
+
+def test_health_checks_do_not_block_requests(app, client, monkeypatch):
+    replicas = get_replicas(db, app)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_check(replica):
+        started.set()
+        release.wait(5)
+        replicas.mark(replica, False)
+
+    monkeypatch.setattr(replicas, 'check', slow_check)
+    # the check runs in the background while the request keeps the
+    # replica that was healthy when it was last checked
+    assert venue_names(client) == ['Replica Hall']
+    assert started.wait(5)
+    assert venue_names(client) == ['Replica Hall']
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == 'fyyur-replica-check':
+            thread.join(5)
+    # once it is found unhealthy, reads fall back to the primary
+    assert venue_names(client) == []
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import event
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Genre
+from fyyurapp.search import (SearchBackend, SimpleSearchBackend, TrigramSearchBackend,
+                             search_results)
+
+
+@pytest.fixture
+def venues(app):
+    # name, city, state
+    rows = [('Hall', 'Austin', 'TX'), ('Hall of Fame', 'Austin', 'TX'),
+            ('The Music Hall', 'Austin', 'TX'), ('Zed', 'Halls Gap', 'VI'),
+            ('Apex', 'Marshall', 'TX'), ('100% Live', 'Boston', 'MA'),
+            ('Park Square', 'San Francisco', 'CA')]
+    db.session.add_all([Venue(name=name, city=city, state=state, address='1 st', genres=[])
+                        for name, city, state in rows])
+    db.session.commit()
+
+
+@pytest.fixture
+def statements(app):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    yield captured
+    event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def names(page):
+    return [item.name for item in page.items]
+
+
+def test_backend_must_implement_search():
+    with pytest.raises(TypeError):
+        SearchBackend()
+
+
+def test_simple_ranking(venues):
+    page = SimpleSearchBackend().search(Venue, 'hall')
+    # exact, then prefix, then substring of the name; then matches in the city
+    assert names(page) == ['Hall', 'Hall of Fame', 'The Music Hall', 'Zed', 'Apex']
+    assert page.count == 5
+
+
+def test_simple_search_pages_in_sql(venues, statements):
+    backend = SimpleSearchBackend()
+    pages = [backend.search(Venue, 'hall', page=page, per_page=2) for page in (1, 2, 3)]
+    assert [names(page) for page in pages] == [
+        ['Hall', 'Hall of Fame'], ['The Music Hall', 'Zed'], ['Apex']]
+    assert [page.count for page in pages] == [5, 5, 5]
+    # one statement per page, limited in the database
+    assert len(statements) == 3
+    assert all('LIMIT' in statement for statement in statements)
+
+
+def test_page_past_the_end_still_counts(venues):
+    page = SimpleSearchBackend().search(Venue, 'hall', page=9, per_page=2)
+    assert (page.items, page.count) == ([], 5)
+    assert SimpleSearchBackend().search(Venue, 'nothing like it').count == 0
+
+
+def test_like_wildcards_rank_literally(venues):
+    assert names(SimpleSearchBackend().search(Venue, '100%'))[0] == '100% Live'
+
+
+def test_trigram_backend_hands_short_terms_to_simple_ranking(venues):
+    # SQLite has no similarity(), so only the fallback can answer
+    page = TrigramSearchBackend().search(Venue, 'ha')
+    assert page == SimpleSearchBackend().search(Venue, 'ha')
+    assert names(page)[:2] == ['Hall', 'Hall of Fame']
+
+
+def test_search_results_filter_by_genre(app, venues):
+    apex = Venue.query.filter_by(name='Apex').one()
+    apex.genres.append(Genre(name='Jazz'))
+    db.session.commit()
+    assert search_results(Venue, 'hall', 'Jazz') == {
+        'count': 1, 'page': 1, 'pages': 1,
+        'data': [{'id': apex.id, 'name': 'Apex', 'num_upcoming_shows': 0}]}
+    assert search_results(Artist, 'hall')['count'] == 0
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from fyyurapp.models import Show
+
+
+def show_form(sample, start, **fields):
+    return dict({'artist_id': sample['artists'][0], 'venue_id': sample['venues'][1],
+                 'start_time': f'{start:%Y-%m-%d %H:%M:%S}'}, **fields)
+
+
+def test_create_show_with_duration(client, sample):
+    start = datetime(2030, 1, 1, 20)
+    client.post('/shows/create', data=show_form(sample, start, duration='90'))
+    show = Show.query.filter_by(start_time=start).one()
+    assert show.end_time == start + timedelta(minutes=90)
+
+
+def test_create_show_with_end_time(client, sample):
+    start = datetime(2030, 1, 1, 20)
+    client.post('/shows/create', data=show_form(
+        sample, start, end_time=f'{start + timedelta(hours=3):%Y-%m-%d %H:%M:%S}'))
+    assert Show.query.filter_by(start_time=start).one().duration == timedelta(hours=3)
+
+
+def test_create_show_rejects_invalid_duration(client, sample):
+    start = datetime(2030, 1, 1, 20)
+    response = client.post('/shows/create', data=show_form(sample, start, duration='100000'),
+                           follow_redirects=True)
+    assert 'duration: Number must be between 15 and 720.' in response.get_data(as_text=True)
+    assert Show.query.filter_by(start_time=start).count() == 0
+
+
+def test_create_show_rejects_end_before_start(client, sample):
+    start = datetime(2030, 1, 1, 20)
+    response = client.post('/shows/create', data=show_form(
+        sample, start, end_time=f'{start - timedelta(hours=1):%Y-%m-%d %H:%M:%S}'),
+        follow_redirects=True)
+    assert 'End time must be after the start time' in response.get_data(as_text=True)
+    assert Show.query.filter_by(start_time=start).count() == 0
+
+
+def test_create_show_rejects_overlap(client, sample):
+    start = datetime(2030, 1, 1, 20)
+    client.post('/shows/create', data=show_form(sample, start))
+    response = client.post('/shows/create', data=show_form(sample, start + timedelta(hours=1)),
+                           follow_redirects=True)
+    assert 'the venue is booked from' in response.get_data(as_text=True)
+    assert Show.query.filter_by(venue_id=sample['venues'][1]).count() == 1
+
+
+def test_new_show_form_has_end_time(client):
+    assert 'name="end_time"' in client.get('/shows/create').get_data(as_text=True)
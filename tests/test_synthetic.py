@@ -0,0 +1,28 @@
+import re
+from fyyurapp import db
+from fyyurapp.models import Venue, Artist, Show
+from fyyurapp.synthetic import generate
+
+
+def test_generate_counts(app):
+    assert generate(500) == (10, 25, 500)
+    assert (Venue.query.count(), Artist.query.count(), Show.query.count()) == (10, 25, 500)
+
+
+def test_generate_venue_count(app):
+    assert generate(500, venues=100) == (100, 25, 500)
+
+
+def test_generated_phones_are_digits(app):
+    generate(200)
+    phones = [phone for model in (Venue, Artist) for phone, in db.session.query(model.phone)]
+    assert phones and all(re.fullmatch(r'[0-9]{10}', phone) for phone in phones)
+
+
+def test_generated_shows_do_not_overlap(app):
+    generate(500)
+    for column in (Show.venue_id, Show.artist_id):
+        shows = Show.query.order_by(column, Show.start_time).all()
+        for previous, show in zip(shows, shows[1:]):
+            if getattr(previous, column.key) == getattr(show, column.key):
+                assert previous.end_time <= show.start_time
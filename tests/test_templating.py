@@ -0,0 +1,81 @@
+import pytest
+from jinja2 import FileSystemLoader
+from fyyurapp import create_app
+from fyyurapp.templating import precompile_templates
+
+
+def make_app(cache_dir, **config):
+    return create_app(dict({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+                            'TEMPLATE_CACHE_DIR': str(cache_dir)}, **config))
+
+
+def count_compiles(app):
+    # Counts the templates compiled from source by the app's environment.
+    compiled = []
+    compile = app.jinja_env.compile
+
+    def counting(source, name=None, *args, **kwargs):
+        compiled.append(name)
+        return compile(source, name, *args, **kwargs)
+
+    app.jinja_env.compile = counting
+    return compiled
+
+
+def cache_files(cache_dir):
+    return sorted(path.name for path in cache_dir.glob('__jinja2_*.cache'))
+
+
+def test_precompile_writes_bytecode_that_workers_reuse(tmp_path):
+    first = make_app(tmp_path)
+    compiled = count_compiles(first)
+    names = precompile_templates(first)
+    assert 'pages/venues.html' in names
+    assert sorted(compiled) == sorted(names)
+    files = cache_files(tmp_path)
+    assert len(files) == len(names)
+
+    # a new process (or worker) loads the bytecode instead of compiling
+    second = make_app(tmp_path)
+    compiled = count_compiles(second)
+    assert precompile_templates(second) == names
+    assert compiled == []
+    assert cache_files(tmp_path) == files
+
+
+def test_changed_template_is_compiled_again(tmp_path):
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    source = templates / 'probe.html'
+    source.write_text('one {{ value }}')
+
+    def render(cache_dir):
+        app = make_app(cache_dir)
+        app.jinja_env.loader = FileSystemLoader(str(templates))
+        compiled = count_compiles(app)
+        return app.jinja_env.get_template('probe.html').render(value=1), compiled
+
+    assert render(tmp_path) == ('one 1', ['probe.html'])
+    assert render(tmp_path) == ('one 1', [])
+    source.write_text('two {{ value }}')
+    assert render(tmp_path) == ('two 1', ['probe.html'])
+
+
+def test_bytecode_cache_can_be_disabled(tmp_path):
+    app = make_app(tmp_path, TEMPLATE_BYTECODE_CACHE='none')
+    assert app.jinja_env.bytecode_cache is None
+    precompile_templates(app)
+    assert cache_files(tmp_path) == []
+
+
+@pytest.mark.parametrize('debug, reload', [(False, False), (True, True)])
+def test_templates_reload_only_in_debug(tmp_path, debug, reload):
+    assert make_app(tmp_path, DEBUG=debug).jinja_env.auto_reload is reload
+    assert make_app(tmp_path, DEBUG=debug, TEMPLATES_AUTO_RELOAD=True).jinja_env.auto_reload
+
+
+def test_compile_templates_command(tmp_path):
+    app = make_app(tmp_path)
+    result = app.test_cli_runner().invoke(args=['fyyur', 'compile-templates'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith(f'Compiled {len(cache_files(tmp_path))} templates in ')
@@ -0,0 +1,11 @@
+# Production entry point: `gunicorn -c gunicorn.conf.py wsgi:app`.
+# run.py starts the single-process development server instead.
+from fyyurapp import create_app
+from fyyurapp.templating import precompile_templates
+
+app = create_app()
+
+# With preload_app this runs once in the gunicorn master, so every worker
+# starts with all templates compiled.
+if app.config['PRECOMPILE_TEMPLATES']:
+    precompile_templates(app)